@@ -1,5 +1,5 @@
 '''
-    This module holds the unique actions enumerations.
+    This module holds the unique actions and action classes enumerations.
 '''
 from enum import Enum, unique
 
@@ -24,3 +24,13 @@ class Action(Enum):
     RELEASED = 14
     REPORT = 15
     CALIBRATE = 16
+
+@unique
+class ActionClass(Enum):
+    '''
+        This class holds the action classes used by the scheduler. Motion and posture actions move the legs and
+        run one at a time, system actions run immediately, also while the legs are moving.
+    '''
+    MOTION = 1
+    POSTURE = 2
+    SYSTEM = 3
@@ -1,35 +1,70 @@
 '''
     This module contains all the action related stuff.
 '''
-import logging
 import asyncio
-from action import Action
+import time
+from action import Action, ActionClass
+from latency import LatencyTracer
+from span_tracer import spans
+from log_pipeline import get_logger
 
-logging.getLogger('asyncio').setLevel(logging.WARNING)
+logger = get_logger('actions')
 
 class ActionController():
     '''
         This class takes care of the action execution, registering and state.
+
+        The action controller schedules the actions by class and priority:
+        - system actions (modes, speed, reports, shutdown) run immediately, also while the legs are moving
+        - motion and posture actions move the legs, so only one of them runs at a time as a task
+        - a motion or posture action that arrives while the legs are moving waits, only the latest action per class
+          is kept and the pending action with the highest priority starts first
+        - a repeated request of the running motion merges into the running gait instead of restarting it
+        - an action registered to preempt cancels a running action with a lower priority
     '''
     def __init__(self):
         self._actions = {}
         self._action_events = {}
-        self._current_action = None
-        self._proposed_action = None
+        self._action_policies = {}
         self._last_action = None
         self._released = True
-        self._current_action_function = None
-        self._event_handler = None
+        self._event_handlers = []
         self.last_event = None
-        self._is_busy = False
+        self.last_event_time = None
         self._repeat_action = False
+        self._loop = None
+        self._wakeup = None
+        self._error = None
+        self._system_action = None
+        self._motion_action = None
+        self._motion_code = None
+        self._motion_task = None
+        self._motion_started = 0
+        self._pending = {}
+        self._held_codes = set()
+        self.started = 0
+        self.merged = 0
+        self.replaced = 0
+        self.preempted = 0
+        self.action_runs = {}
+        self.action_seconds = {}
+        self.tracer = LatencyTracer()
 
     def register_event_handler(self, function):
         '''
-            This function registers the update function to get the event from the controller
-            during a running action.
+            This function registers the function to get the next queued event from an input source, like the game
+            controller or the remote control. The function returns a queued event with the event and its timestamp,
+            or None when there are no pending events. More input sources can be registered.
+        '''
+        self._event_handlers.append(function)
+
+    def notify(self):
+        '''
+            This function wakes up the action loop, because a new event is available. It is safe to call from
+            any thread.
         '''
-        self._event_handler = function
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
 
     def update(self) -> bool:
         '''
@@ -37,7 +72,8 @@ class ActionController():
         '''
         pass
 
-    def register(self, action:Action, function, event:int):
+    def register(self, action:Action, function, event:int, action_class = ActionClass.SYSTEM, priority = 0,
+                 preempt = False):
         '''
             This function registers the action to a external function and event maps
 
@@ -45,11 +81,15 @@ class ActionController():
             : function - the external function to which the action is registered and
               is called when an action occurs
             : event - event number or enum
+            : action_class - scheduling class of the action
+            : priority - a higher priority starts first when actions are pending
+            : preempt - cancel a running action with a lower priority
         '''
         self._actions[action] = function
         self._action_events[event] = action
+        self._action_policies[action] = (action_class, priority, preempt)
 
-    def process_event(self, event) -> Action:
+    def process_event(self, event, code = None) -> Action:
         '''
             This function processes the event based on an action.
         '''
@@ -58,53 +98,216 @@ class ActionController():
         elif event.name == "RELEASED":
             self._released = True
             self._last_action = None
+            self._held_codes.discard(code)
             return self._action_events[event]
         else:
             self._released = False
+            self._held_codes.add(code)
             return self._action_events[event]
 
+    def is_busy(self):
+        '''
+            This function returns whether a motion or posture action is moving the legs.
+        '''
+        return self._motion_task is not None and not self._motion_task.done()
+
     def execute(self):
         '''
-            This function executes the action using the registered external function
+            This function takes one event from the queue and schedules its action. Returns true when an event was
+            taken.
+        '''
+        self.last_event = None
+
+        queued = None
+        for event_handler in self._event_handlers:
+            queued = event_handler()
+            if queued is not None:
+                break
+
+        if queued is None:
+            return False
+
+        self.last_event = queued.event
+        self.last_event_time = queued.timestamp
+        trace = self.tracer.begin(queued.timestamp)
+
+        action = self.process_event(queued.event, queued.code)
+        self.tracer.mark(trace, 'dispatch')
+
+        if action is not None:
+            self.schedule(action, queued.code, trace)
+
+        return True
+
+    def schedule(self, action, code = None, trace = None):
+        '''
+            This function runs, merges, queues or preempts the action according to its class and priority. The
+            latency trace of the event travels with the action.
+        '''
+        action_class, priority, preempt = self._action_policies[action]
+
+        if action_class == ActionClass.SYSTEM:
+            self.run_system_action(action, trace)
+            return
+
+        if not self.is_busy():
+            self.start(action, code, trace)
+            return
+
+        if action == self._motion_action:
+            # the running gait repeats as long as the key is held, so there is nothing to restart
+            self._motion_code = code
+            self.merged += 1
+            return
+
+        if action_class in self._pending:
+            self.replaced += 1
+        self._pending[action_class] = (priority, action, code, trace)
+
+        running_priority = self._action_policies[self._motion_action][1] if self._motion_action is not None else 0
+        if preempt and priority > running_priority:
+            logger.debug("Action preempted: %s by %s", self._motion_action, action)
+            self.preempted += 1
+            self._motion_task.cancel()
+
+    def run_system_action(self, action, trace = None):
+        '''
+            This function runs a system action immediately.
+        '''
+        self._system_action = action
+        self.tracer.mark(trace, 'start')
+        logger.debug("Action started: %s", action)
+        started = time.perf_counter_ns()
+        try:
+            self._actions[action]()
+        finally:
+            self._system_action = None
+            self.record_action(action.name, started)
+
+    def start(self, action, code = None, trace = None):
+        '''
+            This function starts a motion or posture action. Action sequences are coroutine functions and run as
+            task, so the action loop keeps handling events while the legs are moving.
+        '''
+        self._motion_action = action
+        self._motion_code = code
+        self._repeat_action = False
+        self.started += 1
+        self.tracer.mark(trace, 'start')
+        self.tracer.activate(trace)
+        logger.debug("Action started: %s", action)
+        self._motion_started = time.perf_counter_ns()
+
+        result = self._actions[action]()
+
+        if asyncio.iscoroutine(result):
+            self._motion_task = self._loop.create_task(result, name=action.name)
+            self._motion_task.add_done_callback(self.action_done)
+        else:
+            self.record_action(action.name, self._motion_started)
+            if self._motion_action == action:
+                self._motion_action = None
+
+    def record_action(self, name, started, args = None):
+        '''
+            This function counts a finished action and its duration, and records its span. The counters are only
+            written by the event loop, so other threads read them without locking.
+        '''
+        finished = time.perf_counter_ns()
+        spans.add(name, 'action', started, finished, args)
+        self.action_runs[name] = self.action_runs.get(name, 0) + 1
+        self.action_seconds[name] = self.action_seconds.get(name, 0.0) + (finished - started) / 1e9
+
+    def pending_count(self):
+        '''
+            This function returns the number of actions waiting for the legs.
+        '''
+        return len(self._pending)
+
+    def action_done(self, task):
+        '''
+            This function is called when a motion or posture task is finished, cancelled or failed.
         '''
-        self._proposed_action = None
+        self.record_action(task.get_name(), self._motion_started, {'cancelled': True} if task.cancelled() else None)
+
+        if task.cancelled():
+            logger.debug("Action cancelled: %s", self._motion_action)
+            self._motion_action = None
+            self._repeat_action = False
+        elif task.exception() is not None:
+            self._error = task.exception()
 
-        self.last_event = self._event_handler()
+        self._wakeup.set()
 
-        if(self.last_event != None):
-            self._proposed_action = self.process_event(self.last_event)
-        elif(self.last_event == None and self._repeat_action):
-            self._proposed_action = self._last_action
-    
-        #logging.debug(f"proposed action: {self._proposed_action} repeat {self._repeat_action} last {self._last_action} busy {self._is_busy}")
-        if self._proposed_action != None and not self._is_busy:               
-            self._current_action_function = self._actions[self._proposed_action]           
-            self._current_action = self._proposed_action  
-            self._is_busy = True               
-            logging.debug(f"Action started: {self._current_action}")
-            self._current_action_function()    
+    def start_next(self):
+        '''
+            This function starts the pending action with the highest priority, or repeats the last action. Returns
+            true when an action was started.
+        '''
+        if self.is_busy():
+            return False
+
+        if self._pending:
+            action_class = max(self._pending, key=lambda pending_class: self._pending[pending_class][0])
+            _, action, code, trace = self._pending.pop(action_class)
+            self.start(action, code, trace)
+            return True
+
+        if self._repeat_action and self._last_action is not None:
+            self.start(self._last_action, self._motion_code)
+            return True
+
+        return False
+
+    async def run(self):
+        '''
+            This function is the action loop. It sleeps until an event is notified or an action has finished,
+            handles the queued events one by one and starts the next action when the legs are free.
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set() # handle events that arrived before the loop started
+
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+
+                if self._error is not None:
+                    raise self._error
+
+                if self.execute():
+                    self._wakeup.set()
+
+                self.start_next()
+        finally:
+            if self._motion_task is not None:
+                self._motion_task.cancel()
 
     def is_repeating(self):
         '''
             This function checks whether the last action is equal to the current action, hence a repeating action.
         '''
-        if self._current_action == self._last_action:
+        current_action = self._system_action if self._system_action is not None else self._motion_action
+
+        if current_action == self._last_action:
             return True
 
-        return False   
+        return False
 
     def end_action(self, repeat = False):
         '''
-            This function ends an action that is running, or set it to an repeating action.
+            This function ends an action that is running, or set it to an repeating action. A motion only repeats
+            as long as the key that started it is held.
         '''
-        self._last_action = self._current_action
-        self._is_busy = False
+        if self._system_action is not None:
+            self._last_action = self._system_action
+            logger.debug("Action ended: %s", self._system_action)
+            return
 
-        logging.debug(f"Action ended: {self._current_action}")
-        
-        self._current_action = None
-        
-        if not repeat:
-            self._repeat_action = False
-        else:
-            self._repeat_action = True
+        self._last_action = self._motion_action
+
+        logger.debug("Action ended: %s", self._motion_action)
+
+        self._motion_action = None
+        self._repeat_action = repeat and self._motion_code in self._held_codes
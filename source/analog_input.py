@@ -0,0 +1,179 @@
+'''
+    This module contains the analog input stage of the game controller.
+
+    The sticks and triggers emit EV_ABS events at several hundred Hz. Instead of queueing every event, the analog
+    input stage normalizes each axis with the range of the device, applies a deadzone and a low-pass filter and
+    publishes the latest stick state at most at the control rate. The motion code reads the latest stick state,
+    so it gets clean commands at a bounded rate.
+'''
+import time
+from constants import ANALOG_DEADZONE, ANALOG_SMOOTHING, ANALOG_RATE
+
+class StickState():
+    '''
+        This class holds the latest filtered stick and trigger values. The sticks are in the range -1 to 1 with
+        the evdev direction, so up and left are negative. The triggers are in the range 0 to 1.
+    '''
+    AXES = ('left_x', 'left_y', 'right_x', 'right_y', 'left_trigger', 'right_trigger')
+
+    __slots__ = AXES + ('sequence', 'timestamp')
+
+    def __init__(self):
+        self.left_x = 0.0
+        self.left_y = 0.0
+        self.right_x = 0.0
+        self.right_y = 0.0
+        self.left_trigger = 0.0
+        self.right_trigger = 0.0
+        self.sequence = 0
+        self.timestamp = 0.0
+
+    def __repr__(self):
+        return (f"StickState(left=({self.left_x:0.2f}, {self.left_y:0.2f}), "
+                f"right=({self.right_x:0.2f}, {self.right_y:0.2f}), "
+                f"triggers=({self.left_trigger:0.2f}, {self.right_trigger:0.2f}), sequence={self.sequence})")
+
+class AxisFilter():
+    '''
+        This class normalizes, deadzones and low-pass filters the values of one axis. The filter steps once per
+        control period, so a released stick settles at the center even when the device sends no more events.
+    '''
+    __slots__ = ('name', 'is_trigger', 'center', 'scale', 'deadzone', 'smoothing', 'target', 'value')
+
+    def __init__(self, name, is_trigger, deadzone, smoothing):
+        self.name = name
+        self.is_trigger = is_trigger
+        self.deadzone = deadzone
+        self.smoothing = smoothing
+        self.target = 0.0
+        self.value = 0.0
+        self.configure(0, 255, 0)
+
+    def configure(self, minimum, maximum, flat):
+        '''
+            This function sets the range of the axis as reported by the device. The flat range of the device
+            widens the deadzone when it is larger.
+        '''
+        if maximum <= minimum:
+            maximum = minimum + 1
+
+        if self.is_trigger:
+            self.center = minimum
+            self.scale = maximum - minimum
+        else:
+            self.center = (minimum + maximum) / 2
+            self.scale = (maximum - minimum) / 2
+
+        self.deadzone = max(self.deadzone, flat / self.scale)
+
+    def update(self, raw):
+        '''
+            This function normalizes a raw value and applies the deadzone. Returns the new target of the filter.
+        '''
+        value = (raw - self.center) / self.scale
+        magnitude = abs(value)
+
+        if magnitude <= self.deadzone:
+            value = 0.0
+        else:
+            value = min(1.0, (magnitude - self.deadzone) / (1.0 - self.deadzone))
+            if raw < self.center:
+                value = -value
+
+        self.target = value
+        return value
+
+    def step(self):
+        '''
+            This function moves the filtered value one control period towards the target and returns it.
+        '''
+        value = self.value + self.smoothing * (self.target - self.value)
+        if abs(self.target - value) < 0.001:
+            value = self.target
+        self.value = value
+        return value
+
+class AnalogInput():
+    '''
+        This class filters the analog axes of the controller and publishes the latest stick state. The axes of the
+        profile are mapped in order to the left stick, the right stick and the triggers.
+    '''
+    def __init__(self, axes, deadzone = ANALOG_DEADZONE, smoothing = ANALOG_SMOOTHING, rate = ANALOG_RATE):
+        '''
+            This function initializes this class.
+
+            : axes - the evdev codes of the forwarded axes in the order of StickState.AXES
+            : deadzone - the part of the range around the center that is ignored
+            : smoothing - the weight of a new value in the low-pass filter, 1 means no filtering
+            : rate - the maximum number of stick state updates per second
+        '''
+        self._filters = {}
+        for index, code in enumerate(axes[:len(StickState.AXES)]):
+            self._filters[code] = AxisFilter(StickState.AXES[index], index >= 4, deadzone, smoothing)
+
+        self._period = 1 / rate
+        self._state = StickState()
+        self._dirty = False
+        self._last_publish = 0.0
+        self.updates = 0
+
+    def __contains__(self, code):
+        return code in self._filters
+
+    def configure(self, device):
+        '''
+            This function reads the range of the axes from the device.
+        '''
+        for code, axis_filter in self._filters.items():
+            try:
+                info = device.absinfo(code)
+            except (OSError, AttributeError):
+                continue
+            axis_filter.configure(info.min, info.max, info.flat)
+
+    def update(self, code, raw, timestamp):
+        '''
+            This function takes an axis event and publishes the stick state when the control period has passed.
+        '''
+        self._filters[code].update(raw)
+        self.updates += 1
+        self._dirty = True
+
+        if timestamp - self._last_publish >= self._period:
+            self.publish(timestamp)
+
+    def publish(self, timestamp):
+        '''
+            This function steps the filters and copies the filtered values to the stick state.
+        '''
+        state = self._state
+        settled = True
+        for axis_filter in self._filters.values():
+            setattr(state, axis_filter.name, axis_filter.step())
+            settled = settled and axis_filter.value == axis_filter.target
+
+        state.sequence += 1
+        state.timestamp = timestamp
+        self._last_publish = timestamp
+        self._dirty = not settled
+
+    def get_state(self):
+        '''
+            This function returns the latest stick state. While the filters have not settled, the stick state is
+            published first when the control period has passed, so the caller polls it at the control rate.
+        '''
+        if self._dirty:
+            now = time.time()
+            if now - self._last_publish >= self._period:
+                self.publish(now)
+
+        return self._state
+
+    def reset(self):
+        '''
+            This function centers all axes, for example after the controller was disconnected.
+        '''
+        for axis_filter in self._filters.values():
+            axis_filter.target = 0.0
+            axis_filter.value = 0.0
+        self.publish(time.time())
@@ -0,0 +1,132 @@
+'''
+    This module contains the backend registry for the hardware dependent modules.
+
+    The power (PiJuice), servo (PCA9685 on the Servo PWM Pi) and input (evdev) backends have a real and a stand-in
+    implementation. The modules of a backend are only imported when the backend is used, so the program starts
+    without the hardware packages, for example in STUB mode on any Linux machine. The backends are selected once at
+    startup, before the robot is created:
+
+        backends.select('power', 'stub')
+        backends.select('input', 'evdev', fallback='none')
+
+    A backend is loaded on first use with backends.load(kind).
+'''
+from exceptions import BackendException
+from log_pipeline import get_logger
+
+logger = get_logger('startup')
+
+def load_pijuice():
+    '''
+        This function returns the PiJuice interface on I2C bus 1, address 0x14.
+    '''
+    from pijuice import PiJuice # pylint: disable=import-outside-toplevel, import-error
+    return PiJuice(1, 0x14)
+
+def load_pijuice_stub():
+    '''
+        This function returns the stand-in of the PiJuice interface.
+    '''
+    from pijuice_stub import PiJuiceStub # pylint: disable=import-outside-toplevel
+    return PiJuiceStub()
+
+def load_servo_pi():
+    '''
+        This function returns the servo controller class of the Servo PWM Pi.
+    '''
+    from servo_pi import ServoController # pylint: disable=import-outside-toplevel
+    return ServoController
+
+def load_servo_stub():
+    '''
+        This function returns the stand-in servo controller class.
+    '''
+    from servo_stub_controller import ServoStubController # pylint: disable=import-outside-toplevel
+    return ServoStubController
+
+def load_evdev():
+    '''
+        This function returns the evdev module.
+    '''
+    import evdev # pylint: disable=import-outside-toplevel, import-error
+    return evdev
+
+def load_input_stub():
+    '''
+        This function returns the stand-in of the evdev module, without input devices.
+    '''
+    import input_stub # pylint: disable=import-outside-toplevel
+    return input_stub
+
+class BackendRegistry():
+    '''
+        This class registers, selects and lazily loads the backends.
+    '''
+    def __init__(self):
+        self._loaders = {}
+        self._selected = {}
+        self._fallbacks = {}
+        self._loaded = {}
+
+    def register(self, kind, name, loader, default = False):
+        '''
+            This function registers the loader of a backend implementation.
+        '''
+        self._loaders.setdefault(kind, {})[name] = loader
+        if default:
+            self._selected.setdefault(kind, name)
+
+    def select(self, kind, name, fallback = None):
+        '''
+            This function selects the implementation of a backend. The fallback is loaded instead when the
+            selected implementation cannot be imported.
+        '''
+        loaders = self._loaders.get(kind, {})
+        for backend_name in (name, fallback):
+            if backend_name is not None and backend_name not in loaders:
+                raise BackendException(f"Unknown {kind} backend: {backend_name}")
+
+        self._selected[kind] = name
+        self._fallbacks[kind] = fallback
+        self._loaded = {key: backend for key, backend in self._loaded.items() if key[0] != kind}
+
+    def selected(self, kind):
+        '''
+            This function returns the name of the selected implementation of a backend.
+        '''
+        return self._selected.get(kind)
+
+    def load(self, kind, name = None):
+        '''
+            This function returns the selected implementation of a backend, or the named one. An implementation
+            is loaded once.
+        '''
+        name = name if name is not None else self._selected.get(kind)
+        key = (kind, name)
+        if key in self._loaded:
+            return self._loaded[key]
+
+        try:
+            loader = self._loaders[kind][name]
+        except KeyError as exception:
+            raise BackendException(f"Unknown {kind} backend: {name}") from exception
+
+        try:
+            backend = loader()
+        except ImportError as exception:
+            fallback = self._fallbacks.get(kind)
+            if fallback is None or name == fallback:
+                raise
+            logger.info("Backend %s %s not available (%s), using %s", kind, name, exception, fallback)
+            backend = self.load(kind, fallback)
+
+        self._loaded[key] = backend
+        return backend
+
+backends = BackendRegistry()
+backends.register('power', 'pijuice', load_pijuice, default=True)
+backends.register('power', 'stub', load_pijuice_stub)
+backends.register('servo', 'pca9685', load_servo_pi, default=True)
+backends.register('servo', 'stub', load_servo_stub)
+backends.register('input', 'evdev', load_evdev, default=True)
+backends.register('input', 'none', load_input_stub)
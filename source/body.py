@@ -1,11 +1,20 @@
 '''
     This module contains the body class and its parts.
 '''
-import logging
+import time
+from array import array
 from leg import Leg
+from leg_state import LegState, AXES, LEG_STATE_SIZE
+from joint_transform import JointTransform
+from calibration import Calibration
 from exceptions import ServoControllerInitializeException
 from calculations import cartesian_to_polar
-from constants import z_ground
+from constants import z_ground, SERVO_LOW_LIMIT, SERVO_HIGH_LIMIT, SERVO_FREQUENCY, SERVO_STEPS
+from backends import backends
+from span_tracer import spans
+from log_pipeline import get_logger
+
+logger = get_logger('servo')
 
 class Body():
     '''
@@ -21,61 +30,115 @@ class Body():
         '''
         self._is_stubbed = is_stubbed
         self._online = False
+        self.state = LegState()
+        self.joints = JointTransform()
+        self.angles = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.servo_angles = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.pwm_low = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.pwm_scale = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.bus_time = 0.0
+        self.calibration = None
+        self.calibration_angles = None
         self.initialize()
-        self.default_stance()
-        self.calculate_error()
+        self.create_legs()
+        self.apply_calibration(Calibration.load())
+
+    def apply_calibration(self, calibration):
+        '''
+            This function loads the calibration into the joint offset table and the pulse limits of the servo
+            controller, and solves the calibration pose once.
+        '''
+        self.calibration = calibration
+        errors = calibration.errors
+        for leg in self.legs:
+            base = leg.index * AXES
+            leg.set_error(errors[base], errors[base + 1], errors[base + 2])
+
+        for channel, (low_limit, high_limit) in enumerate(calibration.limits, 1):
+            self._servo_controller.set_low_limit(low_limit, channel)
+            self._servo_controller.set_high_limit(high_limit, channel)
+
+        for joint in range(LEG_STATE_SIZE):
+            self.update_pwm_table(joint)
+
+        self.calibration_angles = cartesian_to_polar(*calibration.pose)
+
+    def adjust_error(self, joint, delta):
+        '''
+            This function changes the calibration error of a joint, 0 to 11 in leg order alpha,beta,gamma, and
+            returns the new error.
+        '''
+        error = self.calibration.adjust_error(joint, delta)
+        leg = self.legs[joint // AXES]
+        errors = self.calibration.errors
+        base = leg.index * AXES
+        leg.set_error(errors[base], errors[base + 1], errors[base + 2])
+        return error
+
+    def adjust_limits(self, joint, low_delta, high_delta):
+        '''
+            This function changes the pulse limits of the servo of a joint and returns the new limits.
+        '''
+        channel = Body.joint_channel(joint)
+        low_limit, high_limit = self.calibration.adjust_limit(channel, low_delta, high_delta)
+        self._servo_controller.set_low_limit(low_limit, channel)
+        self._servo_controller.set_high_limit(high_limit, channel)
+        self.update_pwm_table(joint)
+        return low_limit, high_limit
 
-    def calculate_error(self):
+    def update_pwm_table(self, joint):
         '''
-            This function calculates and sets the error per leg.
+            This function precomputes the pwm count of a joint servo at angle 0 and per degree from the pulse limits
+            of its channel, like the servo controller computes them.
         '''
-        alpha_expected, beta_expected, gamma_expected = cartesian_to_polar(100, 80, 28)
+        low_limit, high_limit = self.calibration.limits[Body.joint_channel(joint) - 1]
+        low = int(4096 * (low_limit / 1000) * SERVO_FREQUENCY)
+        high = int(4096 * (high_limit / 1000) * SERVO_FREQUENCY)
+        self.pwm_low[joint] = low
+        self.pwm_scale[joint] = (high - low) / SERVO_STEPS
 
-        # leg 1
-        alpha_measured, beta_measured, gamma_measured = cartesian_to_polar(110,70,30)
-        self.right_front_leg.set_error(alpha_expected - alpha_measured, beta_expected - beta_measured, gamma_expected - gamma_measured)
-        
-        # leg 2
-        alpha_measured, beta_measured, gamma_measured = cartesian_to_polar(105,65,30)
-        self.right_back_leg.set_error(alpha_expected - alpha_measured, beta_expected - beta_measured, gamma_expected - gamma_measured)
-    
-        # leg 3
-        alpha_measured, beta_measured, gamma_measured = cartesian_to_polar(90,80,50)
-        self.left_front_leg.set_error(alpha_expected - alpha_measured, beta_expected - beta_measured, gamma_expected - gamma_measured)
+    @staticmethod
+    def joint_channel(joint):
+        '''
+            This function returns the servo channel of a joint: alpha is the femur, beta the tibia and gamma the
+            coxa servo of the leg.
+        '''
+        leg_index, axis = divmod(joint, AXES)
+        return (Leg.FEMUR, Leg.TIBIA, Leg.COXA)[axis] + leg_index * AXES
 
-        # leg 4
-        alpha_measured, beta_measured, gamma_measured = cartesian_to_polar(110,60,30)
-        self.left_back_leg.set_error(alpha_expected - alpha_measured, beta_expected - beta_measured, gamma_expected - gamma_measured)        
+    def create_legs(self):
+        '''
+            This function creates the legs and their servos once. The legs start in the default stance.
+        '''
+        self.right_front_leg = Leg(0, self._servo_controller, Body.x_default, Body.y_default, Body.z_default, self.state, self.joints)
+        self.right_back_leg = Leg(1, self._servo_controller, Body.x_default, Body.y_default, Body.z_default, self.state, self.joints)
+        self.left_front_leg = Leg(2, self._servo_controller, Body.x_default, Body.y_default, Body.z_default, self.state, self.joints)
+        self.left_back_leg = Leg(3, self._servo_controller, Body.x_default, Body.y_default, Body.z_default, self.state, self.joints)
+        self.legs = (self.right_front_leg, self.right_back_leg, self.left_front_leg, self.left_back_leg)
 
     def default_stance(self):
         '''
-            This function initializes the body in a default stance.
+            This function resets the body to the default stance. The leg state is rewritten in place, the legs,
+            their servos and the calibration are kept.
         '''
-        self.right_front_leg = Leg(0, self._servo_controller, Body.x_default, Body.y_default, Body.z_default)
-        self.right_back_leg = Leg(1, self._servo_controller, Body.x_default, Body.y_default, Body.z_default)
-        self.left_front_leg = Leg(2, self._servo_controller, Body.x_default, Body.y_default, Body.z_default)
-        self.left_back_leg = Leg(3, self._servo_controller, Body.x_default, Body.y_default, Body.z_default)
+        self.state.reset((Body.x_default, Body.y_default, Body.z_default), Leg.TARGET_DEFAULT, Leg.SPEED_DEFAULT)
 
     def initialize(self):
         '''
             This function initializes additional the servo controller.
         '''
         try:
-            if not self._is_stubbed:
-                from servo_pi import ServoController # pylint: disable=import-outside-toplevel
+            # the stub of the servo class is for testing purposes, otherwise the selected servo backend is used
+            servo_class = backends.load('servo', 'stub' if self._is_stubbed else None)
 
-                # create an instance of the servo class on I2C address 0x40
-                self._servo_controller = ServoController(0x40)
-                self._online = True
-            else:
-                from servo_stub_controller import ServoStubController # pylint: disable=import-outside-toplevel
-                # create stub of the servo class for testing purposes
-                self._servo_controller = ServoStubController(0x40)
+            # create an instance of the servo class on I2C address 0x40
+            self._servo_controller = servo_class(0x40)
+            self._online = not self._is_stubbed
 
             # set the servo minimum and maximum limits in milliseconds
             # the limits for a servo are typically between 1ms and 2ms.
-            self._servo_controller.set_low_limit(0.8)
-            self._servo_controller.set_high_limit(2.3)
+            self._servo_controller.set_low_limit(SERVO_LOW_LIMIT)
+            self._servo_controller.set_high_limit(SERVO_HIGH_LIMIT)
 
             # Enable the outputs
             self._servo_controller.output_enable()
@@ -89,7 +152,7 @@ class Body():
         '''
         self._servo_controller.output_disable()
         self._servo_controller.sleep()
-        logging.info("ServoController sleeping!")
+        logger.info("ServoController sleeping!")
 
     def wake_up_mode(self):
         '''
@@ -97,19 +160,43 @@ class Body():
         '''
         self._servo_controller.output_enable()
         self._servo_controller.wake()
-        logging.info("ServoController awake!")
+        logger.info("ServoController awake!")
+
+    def get_bus_statistics(self):
+        '''
+            This function returns the number of I2C transactions and failed transactions of the servo controller.
+        '''
+        return self._servo_controller.get_bus_statistics()
 
     def get_leg(self, index) -> Leg:
         '''
             This function returns the leg based on the index.
         '''
-        if index == 0:
-            return self.right_front_leg
-        if index == 1:
-            return self.right_back_leg
-        if index == 2:
-            return self.left_front_leg
-        if index == 3:
-            return self.left_back_leg
+        if 0 <= index < len(self.legs):
+            return self.legs[index]
         return None
-            
\ No newline at end of file
+
+    def update_leg(self, leg: Leg, calibrate_mode = False):
+        '''
+            This function moves the leg endpoint one step towards its target position and writes the joint angles
+            to the servos. In calibrate mode all legs are pinned to the calibration pose, which is solved once.
+        '''
+        index = leg.index
+        self.state.step(index)
+
+        base = index * AXES
+        angles = self.angles
+        if calibrate_mode:
+            angles[base], angles[base + 1], angles[base + 2] = self.calibration_angles
+        else:
+            started = spans.begin()
+            angles[base], angles[base + 1], angles[base + 2] = cartesian_to_polar(*self.state.get_current(index))
+            spans.end('ik', 'servo', started)
+
+        self.joints.apply(angles, self.servo_angles, index)
+
+        started = time.perf_counter_ns()
+        leg.write(self.servo_angles)
+        finished = time.perf_counter_ns()
+        self.bus_time = (finished - started) / 1e9
+        spans.add('bus', 'servo', started, finished)
@@ -4,16 +4,24 @@ from constants import coxa_len, length_side, y_start, y_step, x_range
 from constants import tibia_len
 from constants import femur_len
 
-temp_a = math.sqrt(pow(2 * x_range + length_side, 2) + pow(y_step, 2))
-temp_b = 2 * (y_start + y_step) + length_side
-temp_c = math.sqrt(pow(2 * x_range + length_side, 2) + pow(2 * y_start + y_step + length_side, 2))
-temp_alpha = math.acos((pow(temp_a, 2) + pow(temp_b, 2) - pow(temp_c, 2)) / 2 / temp_a / temp_b)
-
-# site for turn
-turn_x1 = (temp_a - length_side) / 2
-turn_y1 = y_start + y_step / 2
-turn_x0 = turn_x1 - temp_b * math.cos(temp_alpha)
-turn_y0 = temp_b * math.sin(temp_alpha) - turn_y1 - length_side
+def turn_sites(x_range, y_start, y_step, length_side):
+    '''
+        This function returns the sites for turn (turn_x0, turn_y0, turn_x1, turn_y1) of the gait geometry.
+    '''
+    temp_a = math.sqrt(pow(2 * x_range + length_side, 2) + pow(y_step, 2))
+    temp_b = 2 * (y_start + y_step) + length_side
+    temp_c = math.sqrt(pow(2 * x_range + length_side, 2) + pow(2 * y_start + y_step + length_side, 2))
+    temp_alpha = math.acos((pow(temp_a, 2) + pow(temp_b, 2) - pow(temp_c, 2)) / 2 / temp_a / temp_b)
+
+    turn_x1 = (temp_a - length_side) / 2
+    turn_y1 = y_start + y_step / 2
+    turn_x0 = turn_x1 - temp_b * math.cos(temp_alpha)
+    turn_y0 = temp_b * math.sin(temp_alpha) - turn_y1 - length_side
+
+    return turn_x0, turn_y0, turn_x1, turn_y1
+
+# site for turn of the default geometry
+turn_x0, turn_y0, turn_x1, turn_y1 = turn_sites(x_range, y_start, y_step, length_side)
 
 def cartesian_to_polar(x, y, z):
     '''
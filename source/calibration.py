@@ -0,0 +1,145 @@
+'''
+    This module contains the persisted calibration of the legs.
+
+    The calibration holds per joint the angle error, which is added to the joint angle before it is mapped to the
+    servo angle, and per servo channel the low and high pulse limits. It is adjusted live from the controller in
+    calibration mode and saved to a versioned json file, which is loaded at startup straight into the joint offset
+    table of the body and the pulse limits of the servo controller. Without a file the errors are computed once from
+    the measured foot positions of the calibration pose. The file looks like:
+
+        {
+            "version": 1,
+            "pose": [100, 80, 28],
+            "errors": [[alpha, beta, gamma], ...],
+            "limits": [[low, high], ...]
+        }
+
+    The errors are in degrees, four legs in leg order, the limits in milliseconds, twelve channels in channel order.
+'''
+import json
+import math
+import os
+
+from calculations import cartesian_to_polar
+from exceptions import CalibrationException
+from leg_state import LEG_COUNT, AXES, LEG_STATE_SIZE
+from constants import CALIBRATION_FILE, CALIBRATION_LIMIT_MIN, CALIBRATION_LIMIT_MAX, SERVO_LOW_LIMIT, SERVO_HIGH_LIMIT
+from log_pipeline import get_logger
+
+logger = get_logger('servo')
+
+CALIBRATION_VERSION = 1
+CALIBRATION_POSE = (100, 80, 28)
+
+# the foot positions measured per leg with the legs pinned to the calibration pose
+MEASURED_POSITIONS = ((110, 70, 30), (105, 65, 30), (90, 80, 50), (110, 60, 30))
+
+class Calibration():
+    '''
+        This class holds the joint errors and servo pulse limits of the legs.
+    '''
+    def __init__(self, errors, limits, pose = CALIBRATION_POSE):
+        '''
+            This function initializes this class.
+
+            : errors - the 4x3 joint errors in degrees, in leg order alpha,beta,gamma
+            : limits - the (low, high) pulse limits in milliseconds of the 12 servo channels, they are kept
+                       within the safe range and in order
+            : pose - the foot position x,y,z of the legs in calibration mode
+        '''
+        self.errors = [float(error) for error in errors]
+        limits = [(float(low), float(high)) for low, high in limits]
+        self.pose = tuple(pose)
+
+        if len(self.errors) != LEG_STATE_SIZE or len(limits) != LEG_STATE_SIZE:
+            raise CalibrationException(f"Calibration needs {LEG_STATE_SIZE} joint errors and channel limits")
+        if not all(math.isfinite(value) for value in self.errors + [limit for pair in limits for limit in pair]):
+            raise CalibrationException("Calibration values must be finite numbers")
+
+        self.limits = [sorted(min(max(limit, CALIBRATION_LIMIT_MIN), CALIBRATION_LIMIT_MAX) for limit in pair)
+                       for pair in limits]
+
+    @classmethod
+    def default(cls):
+        '''
+            This function returns the calibration computed from the measured foot positions.
+        '''
+        expected = cartesian_to_polar(*CALIBRATION_POSE)
+        errors = []
+        for position in MEASURED_POSITIONS:
+            measured = cartesian_to_polar(*position)
+            errors.extend(expected[axis] - measured[axis] for axis in range(AXES))
+
+        return cls(errors, [(SERVO_LOW_LIMIT, SERVO_HIGH_LIMIT)] * LEG_STATE_SIZE)
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+            This function creates the calibration from the content of a calibration file.
+        '''
+        if not isinstance(data, dict):
+            raise CalibrationException(f"Calibration is not an object: {type(data).__name__}")
+        if data.get('version') != CALIBRATION_VERSION:
+            raise CalibrationException(f"Unsupported calibration version: {data.get('version')}")
+
+        try:
+            errors = [error for leg_errors in data['errors'] for error in leg_errors]
+            return cls(errors, data['limits'], data.get('pose', CALIBRATION_POSE))
+        except (KeyError, TypeError, ValueError, AttributeError) as exception:
+            raise CalibrationException(f"Invalid calibration: {exception}") from exception
+
+    def to_dict(self):
+        '''
+            This function returns the content of the calibration file.
+        '''
+        return {
+            'version': CALIBRATION_VERSION,
+            'pose': list(self.pose),
+            'errors': [self.errors[leg * AXES:leg * AXES + AXES] for leg in range(LEG_COUNT)],
+            'limits': self.limits,
+        }
+
+    @classmethod
+    def load(cls, path = CALIBRATION_FILE):
+        '''
+            This function loads the calibration file, or returns the default calibration when there is no file or
+            the file cannot be used.
+        '''
+        try:
+            with open(path, encoding='utf-8') as calibration_file:
+                return cls.from_dict(json.load(calibration_file))
+        except FileNotFoundError:
+            return cls.default()
+        except (OSError, ValueError, CalibrationException) as exception:
+            logger.info("Calibration %s not used: %s", path, exception)
+            return cls.default()
+
+    def save(self, path = CALIBRATION_FILE):
+        '''
+            This function saves the calibration. The file is replaced at once, so a crash never leaves half a file.
+        '''
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as calibration_file:
+                json.dump(self.to_dict(), calibration_file, indent=4)
+            os.replace(path + '.tmp', path)
+            logger.info("Calibration saved to %s", path)
+        except OSError as exception:
+            logger.info("Cannot save calibration: %s", exception)
+
+    def adjust_error(self, joint, delta):
+        '''
+            This function changes the error of a joint and returns the new error.
+        '''
+        self.errors[joint] += delta
+        return self.errors[joint]
+
+    def adjust_limit(self, channel, low_delta, high_delta):
+        '''
+            This function changes the pulse limits of a servo channel within the safe range and returns them. The
+            channel is 1 to 12.
+        '''
+        limits = self.limits[channel - 1]
+        limits[0] = round(min(max(limits[0] + low_delta, CALIBRATION_LIMIT_MIN), limits[1]), 3)
+        limits[1] = round(max(min(limits[1] + high_delta, CALIBRATION_LIMIT_MAX), limits[0]), 3)
+        return limits
@@ -30,3 +30,83 @@ z_range = -50
 
 y_step = 45
 z_up = -30
+
+# servo pulse limits and calibration
+SERVO_LOW_LIMIT = 0.8 # default low pulse limit in milliseconds
+SERVO_HIGH_LIMIT = 2.3 # default high pulse limit in milliseconds
+SERVO_FREQUENCY = 50 # pwm frequency of the servo controller in Hz
+SERVO_STEPS = 180 # servo angle steps between the low and high pulse limit
+CALIBRATION_FILE = '/var/tmp/t-trex/calibration.json' # calibration saved when calibration mode is left
+CALIBRATION_STEP = 0.5 # degrees a joint error changes per button press
+CALIBRATION_LIMIT_STEP = 0.01 # milliseconds a pulse limit changes per button press
+CALIBRATION_LIMIT_MIN = 0.5 # lowest pulse limit in milliseconds that can be calibrated
+CALIBRATION_LIMIT_MAX = 2.5 # highest pulse limit in milliseconds that can be calibrated
+
+# runtime parameters
+PARAMETER_HISTORY = 100 # parameter changes kept
+PARAMETER_STEP = 2 # millimeters the stance width or step length changes per button press
+
+# logging
+LOG_LEVEL = 'DEBUG' # level of the root logger
+LOG_LEVELS = {} # levels per subsystem, for example {'input': 'INFO', 'servo': 'WARNING'}
+LOG_LIBRARY_LEVELS = {'asyncio': 'WARNING'} # levels of the loggers of libraries
+LOG_QUEUE_SIZE = 10000 # queued log records before records are dropped
+LOG_FORMAT = '%(asctime)s - %(message)s'
+
+# trace recording
+TRACE_FILE = '/var/tmp/t-trex/trace.bin' # memory mapped ring file of the servo tick records
+TRACE_RECORDS = 65536 # records in the ring, about two minutes of servo ticks
+SPAN_FILE = '/var/tmp/t-trex/spans.json' # chrome trace json of the span tracing
+SPAN_BUFFER = 200000 # spans kept in memory, the oldest spans are dropped first
+
+# runtime settings
+SERVO_TICK_INTERVAL = 0.002 # seconds between servo frames @ 200 kHz i2c
+TELEMETRY_POLL_INTERVAL = 2 # seconds between PiJuice telemetry snapshots
+TELEMETRY_HISTORY = 300 # telemetry snapshots kept in the history
+LOW_CHARGE_LEVEL = 10 # percentage
+
+# power governor levels from high to low:
+#   (name, minimum charge %, minimum battery mV, move speed cap, acceleration per move or None, moving legs)
+POWER_LEVELS = (
+    ('normal', 30, 3700, MOVE_SPEED * 4, None, 4),
+    ('reduced', 15, 3550, MOVE_SPEED * 1.5, 4, 4),
+    ('low', 5, 3450, MOVE_SPEED, 2, 2),
+    ('critical', 0, 0, MOVE_SPEED / 2, 1, 1),
+)
+POWER_SPEED_STEP = 2 # maximum change of the speed cap per telemetry snapshot
+POWER_HYSTERESIS = 5 # charge % above a threshold before a higher power level is selected
+POWER_IDLE_TIME = 0.5 # seconds without moves before a leg accelerates from standstill
+POWER_INTERVENTIONS = 100 # governor interventions kept
+EVENT_QUEUE_SIZE = 16 # pending controller events before events are dropped
+
+# game controller discovery
+ANALOG_DEADZONE = 0.1 # part of the stick range around the center that is ignored
+ANALOG_SMOOTHING = 0.5 # weight of a new stick value in the low-pass filter, 1 means no filtering
+ANALOG_RATE = 50 # maximum stick state updates per second
+ANALOG_SPEED_MIN = 0.25 # part of the leg speed at the smallest stick deflection
+CONTROLLER_PROFILE = 'ps4' # name of the profile in source/profiles, or path to a profile file
+CONTROLLER_CACHE_FILE = '/var/tmp/t-trex/controller' # device path of the controller found last time
+CONTROLLER_RETRY_INTERVAL = 5 # seconds between discovery retries when hotplug watching is not available
+
+# remote control
+REMOTE_HOST = '0.0.0.0' # address the remote control server listens on
+REMOTE_PORT = 5005 # udp port of the remote control server
+REMOTE_TIMEOUT = 0.5 # seconds without packets before the remote control releases all buttons
+REMOTE_DIRECTION_THRESHOLD = 0.5 # velocity above which the remote control presses a direction
+
+# live telemetry stream
+STREAM_PORT = 5006 # udp port the telemetry frames are sent to
+STREAM_RATE = 50 # telemetry frames per second, a fraction of the servo tick rate
+STREAM_QUEUE_SIZE = 64 # frames waiting for the sender thread before frames are dropped
+
+# metrics endpoint
+METRICS_HOST = '127.0.0.1' # address the metrics endpoint listens on, local only by default
+METRICS_PORT = 9105 # http port of the metrics endpoint
+CPU_TEMPERATURE_FILE = '/sys/class/thermal/thermal_zone0/temp' # CPU temperature in millidegrees Celsius
+
+# synthetic event injection
+INJECT_COUNT = 1000 # key presses of a generated script
+INJECT_RATE = 20 # mean key presses per second
+INJECT_BURST_EVERY = 50 # every n-th press starts a burst, 0 for no bursts
+INJECT_BURST_SIZE = 10 # key presses of a burst without delay
+INJECT_HOLD = 0.3 # maximum seconds a key is held
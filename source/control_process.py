@@ -0,0 +1,259 @@
+'''
+    This module runs the servo and kinematics loop in a separate process.
+
+    The main process and the control process exchange the leg setpoints, the leg state and the loop telemetry
+    through shared memory blocks guarded by sequence locks, so nothing is pickled per frame. The servo timing is
+    no longer disturbed by the housekeeping of the main process, like the input handling, logging and PiJuice calls.
+'''
+import multiprocessing
+import os
+import signal
+import time
+from array import array
+
+from body import Body
+from leg_state import LEG_COUNT, LEG_STATE_SIZE, AXES
+from constants import SERVO_TICK_INTERVAL
+from exceptions import ServoControllerInitializeException
+from servo_ticker import ServoTicker
+from shared_state import SeqLockBlock
+from trace_recorder import TraceRecorder
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+# setpoint block layout: target x,y,z per leg, speed x,y,z per leg and the flags
+SETPOINT_TARGET = 0
+SETPOINT_SPEED = SETPOINT_TARGET + LEG_STATE_SIZE
+SETPOINT_CALIBRATE = SETPOINT_SPEED + LEG_STATE_SIZE
+SETPOINT_STOP = SETPOINT_CALIBRATE + 1
+SETPOINT_SIZE = SETPOINT_STOP + 1
+
+# state block layout: current x,y,z per leg
+STATE_SIZE = LEG_STATE_SIZE
+
+# telemetry block layout
+TELEMETRY_TICKS = 0
+TELEMETRY_TICK_TIME = 1
+TELEMETRY_MAX_TICK_TIME = 2
+TELEMETRY_OVERRUNS = 3
+TELEMETRY_BUS_TRANSACTIONS = 4
+TELEMETRY_BUS_ERRORS = 5
+TELEMETRY_SIZE = 6
+
+class ControlLoop():
+    '''
+        This class is the servo loop running inside the control process. It applies the published setpoints to
+        the body, moves one leg per tick and publishes the leg state and loop telemetry.
+    '''
+    def __init__(self, body, setpoints, state, telemetry, interval, recorder = None):
+        '''
+            This function initializes this class.
+        '''
+        self._body = body
+        self._setpoints = setpoints
+        self._state = state
+        self._telemetry = telemetry
+        self._interval = interval
+        self._recorder = recorder
+        self._parent_pid = os.getppid()
+        self._current_leg = 0
+        self._last_sequence = 0
+        self._last_tick = None
+        self._setpoint_values = array('d', bytes(8 * SETPOINT_SIZE))
+        self._state_values = array('d', bytes(8 * STATE_SIZE))
+        self._telemetry_values = array('d', bytes(8 * TELEMETRY_SIZE))
+
+    def apply_setpoints(self):
+        '''
+            This function copies the setpoints to the legs when the main process published new ones.
+        '''
+        values = self._setpoint_values
+        sequence = self._setpoints.read(values)
+
+        # sequence 0 means nothing was published yet, keep the default stance
+        if sequence == self._last_sequence:
+            return
+        self._last_sequence = sequence
+
+        state = self._body.state
+        state.target[:] = values[SETPOINT_TARGET:SETPOINT_TARGET + LEG_STATE_SIZE]
+        state.speed[:] = values[SETPOINT_SPEED:SETPOINT_SPEED + LEG_STATE_SIZE]
+
+    def publish_state(self):
+        '''
+            This function publishes the current leg positions.
+        '''
+        self._state.write(self._body.state.current)
+
+    def tick(self):
+        '''
+            This function is called by the servo ticker. Returns false when the loop must stop.
+        '''
+        started = time.monotonic()
+
+        self.apply_setpoints()
+        if self._setpoint_values[SETPOINT_STOP] or os.getppid() != self._parent_pid:
+            return False
+
+        calibrate_mode = self._setpoint_values[SETPOINT_CALIBRATE] != 0
+        if self._current_leg < 4:
+            leg = self._body.get_leg(self._current_leg)
+            self._body.update_leg(leg, calibrate_mode)
+
+            self.publish_state()
+
+            if self._recorder is not None:
+                self._recorder.record(self._body, self._current_leg, calibrate_mode)
+            self._current_leg += 1
+        else:
+            if self._recorder is not None:
+                self._recorder.record(self._body, -1, calibrate_mode)
+            self._current_leg = 0
+
+        telemetry = self._telemetry_values
+        if self._last_tick is not None and started - self._last_tick > 2 * self._interval:
+            telemetry[TELEMETRY_OVERRUNS] += 1
+        self._last_tick = started
+
+        tick_time = time.monotonic() - started
+        telemetry[TELEMETRY_TICKS] += 1
+        telemetry[TELEMETRY_TICK_TIME] = tick_time
+        if tick_time > telemetry[TELEMETRY_MAX_TICK_TIME]:
+            telemetry[TELEMETRY_MAX_TICK_TIME] = tick_time
+        telemetry[TELEMETRY_BUS_TRANSACTIONS], telemetry[TELEMETRY_BUS_ERRORS] = self._body.get_bus_statistics()
+        self._telemetry.write(telemetry)
+
+        return True
+
+def run_control_loop(setpoints, state, telemetry, is_stubbed, interval, trace_path = None):
+    '''
+        This function is the entry point of the control process. The main process owns the signals and stops
+        this process through the stop flag of the setpoints. With a trace path every servo tick is recorded.
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    body = Body(is_stubbed)
+    recorder = TraceRecorder(trace_path).open() if trace_path else None
+    loop = ControlLoop(body, setpoints, state, telemetry, interval, recorder)
+
+    # publish the default stance, so the main process starts from the real leg positions
+    loop.publish_state()
+
+    try:
+        ServoTicker(loop.tick, interval).run()
+    finally:
+        body.sleep_mode()
+        if recorder is not None:
+            recorder.close()
+
+class ControlProcess():
+    '''
+        This class starts and stops the control process and exchanges the leg data with it from the main process.
+        The process is forked, so it must be started before any other thread is started.
+    '''
+    def __init__(self, is_stubbed, interval = SERVO_TICK_INTERVAL, trace_path = None):
+        '''
+            This function initializes this class.
+
+            : trace_path - the trace file the control process records the servo ticks to, or None
+        '''
+        self._is_stubbed = is_stubbed
+        self._interval = interval
+        self._trace_path = trace_path
+        self._process = None
+        self._setpoints = SeqLockBlock(SETPOINT_SIZE)
+        self._state = SeqLockBlock(STATE_SIZE)
+        self._telemetry = SeqLockBlock(TELEMETRY_SIZE)
+        self._setpoint_values = array('d', bytes(8 * SETPOINT_SIZE))
+        self._published_values = array('d', bytes(8 * SETPOINT_SIZE))
+        self._state_values = array('d', bytes(8 * STATE_SIZE))
+        self._telemetry_values = array('d', bytes(8 * TELEMETRY_SIZE))
+
+    def start(self):
+        '''
+            This function starts the control process.
+        '''
+        context = multiprocessing.get_context('fork')
+        self._process = context.Process(target=run_control_loop, name='control_loop', daemon=True,
+                                        args=(self._setpoints, self._state, self._telemetry, self._is_stubbed, self._interval,
+                                              self._trace_path))
+        self._process.start()
+        logger.info("Control process started with pid %s", self._process.pid)
+
+    def stop(self):
+        '''
+            This function stops the control process, which puts the servo controller to sleep, and releases the
+            shared memory.
+        '''
+        if self._process is None:
+            return
+
+        self._setpoint_values[SETPOINT_STOP] = 1
+        self._setpoints.write(self._setpoint_values)
+        self._process.join(timeout=1)
+
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+        for block in (self._setpoints, self._state, self._telemetry):
+            block.close(unlink=True)
+
+        logger.info("Control process stopped")
+
+    def is_running(self):
+        '''
+            This function returns whether the control process is alive.
+        '''
+        return self._process is not None and self._process.is_alive()
+
+    def exchange(self, body, calibrate_mode):
+        '''
+            This function publishes the leg targets and speeds of the body and copies the current leg positions
+            from the control process back into the body. Returns a bit mask of the legs that moved.
+        '''
+        if not self.is_running():
+            raise ServoControllerInitializeException("Control process stopped unexpectedly!")
+
+        values = self._setpoint_values
+        leg_state = body.state
+        values[SETPOINT_TARGET:SETPOINT_TARGET + LEG_STATE_SIZE] = leg_state.target
+        values[SETPOINT_SPEED:SETPOINT_SPEED + LEG_STATE_SIZE] = leg_state.speed
+        values[SETPOINT_CALIBRATE] = 1 if calibrate_mode else 0
+
+        if values != self._published_values:
+            self._setpoints.write(values)
+            self._published_values[:] = values
+
+        # sequence 0 means the control process is still initializing
+        if self._state.read(self._state_values) == 0:
+            return 0
+
+        moved = 0
+        state = self._state_values
+        current = leg_state.current
+        for index in range(0, LEG_COUNT):
+            base = index * AXES
+
+            if (current[base] != state[base] or current[base + 1] != state[base + 1] or
+                    current[base + 2] != state[base + 2]):
+                moved |= 1 << index
+        current[:] = state
+
+        return moved
+
+    def get_telemetry(self):
+        '''
+            This function returns the latest loop telemetry of the control process.
+        '''
+        self._telemetry.read(self._telemetry_values)
+        return {
+            'ticks': int(self._telemetry_values[TELEMETRY_TICKS]),
+            'tick_time': self._telemetry_values[TELEMETRY_TICK_TIME],
+            'max_tick_time': self._telemetry_values[TELEMETRY_MAX_TICK_TIME],
+            'overruns': int(self._telemetry_values[TELEMETRY_OVERRUNS]),
+            'bus_transactions': int(self._telemetry_values[TELEMETRY_BUS_TRANSACTIONS]),
+            'bus_errors': int(self._telemetry_values[TELEMETRY_BUS_ERRORS]),
+        }
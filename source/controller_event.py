@@ -0,0 +1,32 @@
+'''
+    This module holds the unique controller events enumerations.
+'''
+from enum import Enum, unique
+
+@unique
+class ControllerEvent(Enum):
+    '''
+        This class defines the unique Controller Events.
+    '''
+    LEFT_PRESSED = 0
+    RIGHT_PRESSED = 1
+    UP_PRESSED = 2
+    DOWN_PRESSED = 3
+    TRIANGLE_PRESSED = 4
+    CROSS_PRESSED = 5
+    SQUARE_PRESSED = 6
+    CIRCLE_PRESSED = 7
+    NO_EVENT = 8
+    MENU_PRESSED = 9
+    R2_PRESSED = 10 # change to R1/L1
+    L2_PRESSED = 11    
+    RELEASED = 12
+    PS_HOME = 13
+    PS_SHARE = 14
+
+# the directions are coalesced to the latest direction in the event queues
+DIRECTION_EVENTS = (ControllerEvent.UP_PRESSED, ControllerEvent.DOWN_PRESSED,
+                    ControllerEvent.LEFT_PRESSED, ControllerEvent.RIGHT_PRESSED)
+
+# the modes and shutdown are never dropped from the event queues
+PROTECTED_EVENTS = (ControllerEvent.L2_PRESSED, ControllerEvent.R2_PRESSED, ControllerEvent.MENU_PRESSED)
@@ -0,0 +1,123 @@
+'''
+    This module contains the controller profiles, which map the raw input events of a controller to controller events.
+
+    A profile is a table keyed on (type, code, value) of the input event, so an event is translated with one
+    dictionary lookup. The profiles are loaded from the json files in the profiles directory, so another controller
+    is supported by adding a file instead of code. A profile file looks like:
+
+        {
+            "name": "PS4",
+            "devices": {"names": ["Wireless Controller"], "ids": [["0x054c", "0x09cc"]]},
+            "bindings": [
+                {"type": "EV_ABS", "code": "ABS_HAT0Y", "value": -1, "event": "UP_PRESSED"},
+                {"type": "EV_KEY", "code": "BTN_SOUTH", "value": 0, "event": "RELEASED"}
+            ],
+            "axes": ["ABS_X", "ABS_Y"]
+        }
+
+    Types and codes are evdev names or numbers, ids are (vendor, product) pairs. A profile without names and ids
+    accepts every device that has the keys of the profile. The axes are the analog axes that are forwarded, in the
+    order left stick x and y, right stick x and y, left and right trigger.
+'''
+import json
+import os
+from controller_event import ControllerEvent
+from exceptions import ControllerProfileException
+from backends import backends
+
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+
+class ControllerProfile():
+    '''
+        This class holds the event table, the forwarded axes and the device identification of one controller.
+    '''
+    def __init__(self, name, bindings, axes = (), names = (), ids = ()):
+        '''
+            This function initializes this class.
+
+            : name - the name of the profile
+            : bindings - dictionary of (type, code, value) to controller event
+            : axes - the codes of the analog axes to forward, in the order of the stick state
+            : names - the device names of the controller
+            : ids - the (vendor, product) pairs of the controller
+        '''
+        self.name = name
+        self.bindings = dict(bindings)
+        self.axes = tuple(axes)
+        self.names = frozenset(names)
+        self.ids = frozenset(ids)
+        key_type = backends.load('input').ecodes.EV_KEY
+        self.keys = frozenset(code for event_type, code, _ in self.bindings if event_type == key_type)
+
+    def lookup(self, event_type, code, value):
+        '''
+            This function returns the controller event of a raw input event, or None when it is not mapped.
+        '''
+        return self.bindings.get((event_type, code, value))
+
+    def identifies(self, device):
+        '''
+            This function checks whether the input device is a controller of this profile. A controller can expose
+            more devices with the same ids, like the motion sensor and touchpad of the PS4 controller, so the device
+            must also have a key of the profile.
+        '''
+        if self.names or self.ids:
+            if device.name not in self.names and (device.info.vendor, device.info.product) not in self.ids:
+                return False
+
+        if not self.keys:
+            return True
+
+        keys = device.capabilities().get(backends.load('input').ecodes.EV_KEY, [])
+        return not self.keys.isdisjoint(keys)
+
+    @staticmethod
+    def resolve(value):
+        '''
+            This function returns the number of an evdev name like "ABS_HAT0Y", or the number itself.
+        '''
+        if isinstance(value, int):
+            return value
+
+        if isinstance(value, str):
+            if value.startswith('0x'):
+                return int(value, 16)
+            ecodes = backends.load('input').ecodes
+            if hasattr(ecodes, value):
+                return getattr(ecodes, value)
+
+        raise ControllerProfileException(f"Unknown input code in profile: {value}")
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+            This function creates a profile from the dictionary of a profile file.
+        '''
+        try:
+            bindings = {}
+            for binding in data['bindings']:
+                key = (cls.resolve(binding['type']), cls.resolve(binding['code']), int(binding['value']))
+                bindings[key] = ControllerEvent[binding['event']]
+
+            devices = data.get('devices', {})
+            ids = [(cls.resolve(vendor), cls.resolve(product)) for vendor, product in devices.get('ids', [])]
+
+            return cls(data['name'], bindings, [cls.resolve(axis) for axis in data.get('axes', [])],
+                       devices.get('names', []), ids)
+        except (KeyError, TypeError, ValueError) as exception:
+            raise ControllerProfileException(f"Invalid controller profile: {exception!r}") from exception
+
+    @classmethod
+    def load(cls, name):
+        '''
+            This function loads a profile by name from the profiles directory, or from a path to a json file.
+        '''
+        path = name if name.endswith('.json') else os.path.join(PROFILE_PATH, f"{name}.json")
+
+        try:
+            with open(path, encoding='utf-8') as profile_file:
+                data = json.load(profile_file)
+        except (OSError, ValueError) as exception:
+            raise ControllerProfileException(f"Cannot load controller profile {path}: {exception}") from exception
+
+        return cls.from_dict(data)
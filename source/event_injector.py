@@ -0,0 +1,264 @@
+'''
+    This module contains the synthetic event injector for soak and load testing without a physical game controller.
+
+    An event script is a replayable list of raw input events with the delay before each event. A script is
+    generated from the bindings of a controller profile with a seeded random generator, so the same seed gives the
+    same script, and it can be saved to and loaded from a json file. The script is played by a fake input device,
+    which the game controller reads like a real evdev device, or through a uinput device where the kernel supports
+    it. Combined with STUB mode, the action controller and the motion loop run for hours without hardware.
+'''
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import namedtuple
+
+from controller_event import ControllerEvent
+from constants import INJECT_COUNT, INJECT_RATE, INJECT_BURST_EVERY, INJECT_BURST_SIZE, INJECT_HOLD
+from log_pipeline import get_logger
+
+logger = get_logger('input')
+
+EV_KEY = 1
+EV_ABS = 3
+
+DeviceInfo = namedtuple('DeviceInfo', 'bustype vendor product version')
+AxisInfo = namedtuple('AxisInfo', 'value min max fuzz flat resolution')
+
+class InjectedEvent():
+    '''
+        This class is a raw input event with the interface of the evdev input event.
+    '''
+    __slots__ = ('sec', 'usec', 'type', 'code', 'value')
+
+    def __init__(self, event_type, code, value, timestamp):
+        self.sec = int(timestamp)
+        self.usec = int((timestamp - self.sec) * 1000000)
+        self.type = event_type
+        self.code = code
+        self.value = value
+
+    def timestamp(self):
+        '''
+            This function returns the time of the event in seconds.
+        '''
+        return self.sec + self.usec / 1000000
+
+class EventScript():
+    '''
+        This class holds the events of a script as (delay, type, code, value).
+    '''
+    def __init__(self, events):
+        self.events = list(events)
+
+    def __len__(self):
+        return len(self.events)
+
+    @classmethod
+    def generate(cls, profile, seed = 0, count = INJECT_COUNT, rate = INJECT_RATE, burst_every = INJECT_BURST_EVERY,
+                 burst_size = INJECT_BURST_SIZE, hold = INJECT_HOLD, axis_events = 0,
+                 excluded = (ControllerEvent.MENU_PRESSED, ControllerEvent.PS_SHARE)):
+        '''
+            This function generates a script of key presses and releases of the profile.
+
+            : seed - the seed of the random generator, the same seed gives the same script
+            : count - the number of presses
+            : rate - the mean number of presses per second
+            : burst_every - every n-th press starts a burst of presses without delay, 0 for no bursts
+            : burst_size - the number of presses of a burst
+            : hold - the maximum time a key is held
+            : axis_events - the number of analog axis events between the presses
+            : excluded - the events that are not pressed, shutdown and calibration by default
+        '''
+        generator = random.Random(seed)
+
+        releases = {}
+        presses = []
+        for (event_type, code, value), event in sorted(profile.bindings.items(), key=lambda item: item[0]):
+            if event == ControllerEvent.RELEASED:
+                releases[(event_type, code)] = value
+            elif event not in excluded:
+                presses.append((event_type, code, value))
+        presses = [press for press in presses if (press[0], press[1]) in releases]
+
+        if not presses:
+            return cls([])
+
+        events = []
+        burst = 0
+        for index in range(count):
+            if burst_every and index % burst_every == 0:
+                burst = burst_size
+
+            event_type, code, value = generator.choice(presses)
+            if burst > 0:
+                burst -= 1
+                events.append((0.0, event_type, code, value))
+                events.append((0.0, event_type, code, releases[(event_type, code)]))
+                continue
+
+            events.append((generator.expovariate(rate), event_type, code, value))
+            for _ in range(axis_events if profile.axes else 0):
+                events.append((0.004, EV_ABS, generator.choice(profile.axes), generator.randint(0, 255)))
+            events.append((generator.uniform(0, hold), event_type, code, releases[(event_type, code)]))
+
+        return cls(events)
+
+    @classmethod
+    def load(cls, path):
+        '''
+            This function loads a saved script.
+        '''
+        with open(path, encoding='utf-8') as script_file:
+            return cls(tuple(event) for event in json.load(script_file))
+
+    def save(self, path):
+        '''
+            This function saves the script, so it can be replayed.
+        '''
+        with open(path, 'w', encoding='utf-8') as script_file:
+            json.dump(self.events, script_file)
+
+class FakeInputDevice():
+    '''
+        This class plays an event script with the interface of the evdev input device, so the game controller reads
+        it like a real controller. After the script the device stays idle, or replays the script when repeat is set.
+    '''
+    def __init__(self, script, profile, repeat = False):
+        self.path = '/dev/input/injected'
+        self.name = sorted(profile.names)[0] if profile.names else f"Injected {profile.name}"
+        vendor, product = sorted(profile.ids)[0] if profile.ids else (0, 0)
+        self.info = DeviceInfo(0, vendor, product, 0)
+        self._script = script
+        self._profile = profile
+        self._repeat = repeat
+        self._closed = False
+        self.injected = 0
+        self.started = None
+        self.finished = None
+
+    def __str__(self):
+        return f"device {self.path}, name \"{self.name}\", {len(self._script)} scripted events"
+
+    def capabilities(self):
+        '''
+            This function returns the event types and codes of the script.
+        '''
+        capabilities = {EV_KEY: sorted(self._profile.keys)}
+        if self._profile.axes:
+            capabilities[EV_ABS] = list(self._profile.axes)
+        return capabilities
+
+    def absinfo(self, code): # pylint: disable=unused-argument
+        '''
+            This function returns the range of an analog axis.
+        '''
+        return AxisInfo(128, 0, 255, 0, 0, 0)
+
+    def grab(self):
+        pass
+
+    def ungrab(self):
+        pass
+
+    def close(self):
+        self._closed = True
+
+    def upload_effect(self, effect): # pylint: disable=unused-argument
+        return 0
+
+    def erase_effect(self, effect_id):
+        pass
+
+    def write(self, event_type, code, value):
+        pass
+
+    async def async_read_loop(self):
+        '''
+            This function yields the events of the script on the event loop, sleeping the delay before each event.
+        '''
+        self.started = time.time()
+        while not self._closed:
+            for delay, event_type, code, value in self._script.events:
+                # the events of a burst have no delay, sleep(0) only lets the other tasks run
+                await asyncio.sleep(delay)
+                if self._closed:
+                    return
+                self.injected += 1
+                yield InjectedEvent(event_type, code, value, time.time())
+
+            self.finished = time.time()
+            if not self._repeat:
+                while not self._closed:
+                    await asyncio.sleep(1)
+
+class UInputInjector():
+    '''
+        This class plays an event script through a uinput device, so the game controller discovers and reads a
+        kernel input device. It needs the uinput module and write access to /dev/uinput.
+    '''
+    def __init__(self, script, profile):
+        try:
+            from evdev import UInput, AbsInfo, ecodes # pylint: disable=import-outside-toplevel, import-error
+        except ImportError as exception:
+            raise OSError("uinput is not available without evdev") from exception
+
+        capabilities = {ecodes.EV_KEY: sorted(profile.keys)} # pylint: disable=no-member
+        axes = [(code, AbsInfo(value=0, min=-1, max=1, fuzz=0, flat=0, resolution=0))
+                for event_type, code, _ in profile.bindings if event_type == ecodes.EV_ABS] # pylint: disable=no-member
+        axes += [(code, AbsInfo(value=128, min=0, max=255, fuzz=0, flat=0, resolution=0)) for code in profile.axes]
+        if axes:
+            capabilities[ecodes.EV_ABS] = list(dict(axes).items()) # pylint: disable=no-member
+
+        vendor, product = sorted(profile.ids)[0] if profile.ids else (0, 0)
+        name = sorted(profile.names)[0] if profile.names else f"Injected {profile.name}"
+        self._device = UInput(capabilities, name=name, vendor=vendor, product=product)
+        self._script = script
+        self.injected = 0
+
+    async def run(self, repeat = False):
+        '''
+            This function writes the events of the script to the uinput device.
+        '''
+        try:
+            while True:
+                for delay, event_type, code, value in self._script.events:
+                    await asyncio.sleep(delay)
+                    self._device.write(event_type, code, value)
+                    self._device.syn()
+                    self.injected += 1
+                if not repeat:
+                    return
+        finally:
+            self._device.close()
+
+def log_injection_report(device, game_controller, action_controller):
+    '''
+        This function logs the statistics of an injection run: the injected events, the events dropped and coalesced
+        by the event queue, the scheduled actions and the input latency.
+    '''
+    statistics = game_controller.get_statistics()
+    elapsed = ((device.finished or time.time()) - device.started) if device.started else 0.0
+
+    logger.info("---------- Injection Report --------------------")
+    logger.info("Injected       :%s events in %0.1f s", device.injected, elapsed)
+    logger.info("Event queue    :queued %s dropped %s coalesced %s",
+                statistics['queued'], statistics['dropped'], statistics['coalesced'])
+    logger.info("Actions        :started %s merged %s replaced %s preempted %s", action_controller.started,
+                action_controller.merged, action_controller.replaced, action_controller.preempted)
+    action_controller.tracer.report()
+    logger.info("---------- Injection Report --------------------")
+
+if __name__ == "__main__":
+    # usage: python3 event_injector.py [seed] [profile]
+    #   plays a generated script through uinput, so a running t-trex discovers it as game controller
+    import sys
+    from controller_profile import ControllerProfile
+
+    logging.basicConfig(format='%(asctime)s - %(message)s', level=logging.INFO)
+    injector_seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    injector_profile = ControllerProfile.load(sys.argv[2] if len(sys.argv) > 2 else 'ps4')
+    injector = UInputInjector(EventScript.generate(injector_profile, injector_seed), injector_profile)
+    asyncio.run(injector.run())
+    logger.info("Injected %s events", injector.injected)
@@ -0,0 +1,175 @@
+'''
+    This module contains the thread safe event queue between the game controller and the action controller.
+'''
+import threading
+from collections import deque
+from enum import Enum, unique
+
+from constants import EVENT_QUEUE_SIZE
+
+@unique
+class EventKind(Enum):
+    '''
+        This class defines how an event is coalesced in the queue.
+    '''
+    DIRECTION = 0
+    BUTTON = 1
+    PROTECTED = 2
+
+class QueuedEvent():
+    '''
+        This class holds a controller event with the code of the key or axis and the time it was read.
+    '''
+    __slots__ = ('event', 'code', 'timestamp', 'kind')
+
+    def __init__(self, event, code, timestamp, kind):
+        self.event = event
+        self.code = code
+        self.timestamp = timestamp
+        self.kind = kind
+
+class EventQueue():
+    '''
+        This class is a bounded, timestamped event queue with a coalescing policy:
+        - a new direction replaces the pending press or release of the same axis, so only the latest direction of
+          an axis is kept and the release of another axis is never lost
+        - the press and release of modes and shutdown are never dropped, even when the queue is full
+        - a repeat of the last pending event is ignored
+        - a release is never dropped on its own, so a key that was delivered as pressed is always released
+        When the queue is full, the oldest press that is not protected is dropped together with its release. When
+        only protected presses and releases are pending, a new press is dropped with its release, protected presses
+        are still queued up to twice the size.
+    '''
+    def __init__(self, released, directions, protected, size = EVENT_QUEUE_SIZE):
+        '''
+            This function initializes this class.
+
+            : released - the event that releases a pressed key or axis
+            : directions - the events that are coalesced to the latest direction of their axis
+            : protected - the events whose press and release are never dropped
+            : size - the number of pending events before events are dropped
+        '''
+        self._released = released
+        self._directions = frozenset(directions)
+        self._protected = frozenset(protected)
+        self._size = size
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._pressed = {}
+        self._discarded = set()
+        self.queued = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def classify(self, event, code):
+        '''
+            This function returns the kind of the event. A release gets the kind of the press it belongs to.
+        '''
+        if event == self._released:
+            return self._pressed.pop(code, EventKind.BUTTON)
+
+        if event in self._directions:
+            kind = EventKind.DIRECTION
+        elif event in self._protected:
+            kind = EventKind.PROTECTED
+        else:
+            kind = EventKind.BUTTON
+
+        self._pressed[code] = kind
+        return kind
+
+    def put(self, event, code, timestamp):
+        '''
+            This function adds an event to the queue. Returns false when the event was coalesced into a pending one.
+        '''
+        with self._lock:
+            kind = self.classify(event, code)
+            events = self._events
+
+            if event == self._released and code in self._discarded:
+                # the press was dropped, so is its release
+                self._discarded.discard(code)
+                self.dropped += 1
+                return False
+
+            if events and events[-1].event == event and events[-1].code == code:
+                self.coalesced += 1
+                return False
+
+            if kind == EventKind.DIRECTION and event != self._released:
+                while events and events[-1].kind == EventKind.DIRECTION and events[-1].code == code:
+                    events.pop()
+                    self.coalesced += 1
+
+            if len(events) >= self._size and not self.drop_oldest():
+                if event != self._released and (kind != EventKind.PROTECTED or len(events) >= 2 * self._size):
+                    self._discarded.add(code)
+                    self.dropped += 1
+                    return False
+
+            events.append(QueuedEvent(event, code, timestamp, kind))
+            self.queued += 1
+            return True
+
+    def drop_oldest(self):
+        '''
+            This function drops the oldest press that is not protected together with its release, a release that
+            is not queued yet is dropped when it arrives. Returns false when there is no press to drop. Must be
+            called with the lock held.
+        '''
+        events = self._events
+        for index, queued in enumerate(events):
+            if queued.kind == EventKind.PROTECTED or queued.event == self._released:
+                continue
+
+            del events[index]
+            self.dropped += 1
+
+            for later in range(index, len(events)):
+                if events[later].code == queued.code:
+                    if events[later].event == self._released:
+                        del events[later]
+                        self.dropped += 1
+                    break
+            else:
+                if queued.code in self._pressed:
+                    self._discarded.add(queued.code)
+            return True
+
+        return False
+
+    def get(self):
+        '''
+            This function removes and returns the oldest event or None when the queue is empty.
+        '''
+        with self._lock:
+            if self._events:
+                return self._events.popleft()
+            return None
+
+    def release_all(self, timestamp):
+        '''
+            This function queues a release for every key or axis that is still pressed, for example after the
+            controller was disconnected. Returns the number of queued releases.
+        '''
+        with self._lock:
+            released = [(code, kind) for code, kind in self._pressed.items() if code not in self._discarded]
+            self._pressed.clear()
+            self._discarded.clear()
+
+            for code, kind in released:
+                self._events.append(QueuedEvent(self._released, code, timestamp, kind))
+
+            return len(released)
+
+    def clear(self):
+        '''
+            This function removes all pending events.
+        '''
+        with self._lock:
+            self._events.clear()
+            self._pressed.clear()
+            self._discarded.clear()
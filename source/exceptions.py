@@ -24,3 +24,23 @@ class PiJuiceInitializeException(Exception):
 class TimerError(Exception):
     """A custom exception used to report errors in use of Timer class"""
     pass
+
+class ControllerProfileException(Exception):
+    """A custom exception used to report that a controller profile cannot be loaded."""
+    pass
+
+class BackendException(Exception):
+    """A custom exception used to report an unknown hardware backend."""
+    pass
+
+class CalibrationException(Exception):
+    """A custom exception used to report that a calibration file cannot be used."""
+    pass
+
+class ParameterException(Exception):
+    """A custom exception used to report an unknown runtime parameter."""
+    pass
+
+class TraceException(Exception):
+    """A custom exception used to report that a trace file cannot be decoded."""
+    pass
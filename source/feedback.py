@@ -0,0 +1,119 @@
+'''
+    This module contains the feedback service for the status LED and the rumble of the game controller.
+
+    Feedback never blocks the caller. The LED state is written by the PiJuice worker thread, so the I2C writes do not
+    run in action code and do not interleave with the other PiJuice calls. Rapid LED updates are coalesced, only the
+    latest LED state is written. The rumble effects run as task on the event loop, a rumble that is requested while
+    another rumble is running is dropped.
+'''
+import threading
+from log_pipeline import get_logger
+
+logger = get_logger('feedback')
+
+class FeedbackService():
+    '''
+        This class queues the LED states and rumble effects and runs them asynchronously.
+    '''
+    def __init__(self, executor, write_led):
+        '''
+            This function initializes this class.
+
+            : executor - the executor that runs the LED writes, a single worker keeps them in order
+            : write_led - the function that writes an [r, g, b] LED state
+        '''
+        self._executor = executor
+        self._write_led = write_led
+        self._lock = threading.Lock()
+        self._led = None
+        self._written_led = None
+        self._led_scheduled = False
+        self._loop = None
+        self._game_controller = None
+        self._rumble_task = None
+        self.led_writes = 0
+        self.led_coalesced = 0
+        self.rumbles = 0
+        self.rumbles_dropped = 0
+
+    def attach(self, loop, game_controller):
+        '''
+            This function attaches the event loop and the game controller that run the rumble effects.
+        '''
+        self._loop = loop
+        self._game_controller = game_controller
+
+    def set_led(self, red, green, blue):
+        '''
+            This function requests a LED state. It returns immediately, a pending LED state is replaced.
+        '''
+        with self._lock:
+            self._led = (red, green, blue)
+            if self._led_scheduled:
+                self.led_coalesced += 1
+                return
+            self._led_scheduled = True
+
+        try:
+            self._executor.submit(self.write_led)
+        except RuntimeError:
+            # the executor is shut down, so the program is ending and the LED state is dropped
+            with self._lock:
+                self._led_scheduled = False
+            logger.debug("LED state dropped: %s", (red, green, blue))
+
+    def write_led(self):
+        '''
+            This function writes the latest LED state when it differs from the written one. It runs on the worker.
+        '''
+        with self._lock:
+            led = self._led
+            self._led_scheduled = False
+
+        if led == self._written_led:
+            return
+
+        try:
+            self._write_led(list(led))
+        except Exception as exception: # pylint: disable=broad-except
+            logger.info("LED state not written: %s", exception)
+            return
+
+        self._written_led = led
+        self.led_writes += 1
+
+    def rumble(self, duration_ms = 1000):
+        '''
+            This function requests a rumble effect of the game controller. It is safe to call from any thread.
+        '''
+        if self._loop is None or self._game_controller is None or self._loop.is_closed():
+            return
+
+        self._loop.call_soon_threadsafe(self.start_rumble, duration_ms)
+
+    def start_rumble(self, duration_ms):
+        '''
+            This function starts the rumble effect as task, unless a rumble effect is running.
+        '''
+        if self._rumble_task is not None and not self._rumble_task.done():
+            self.rumbles_dropped += 1
+            return
+
+        self.rumbles += 1
+        self._rumble_task = self._loop.create_task(self._game_controller.rumble(duration_ms), name='rumble')
+        self._rumble_task.add_done_callback(self.rumble_done)
+
+    def rumble_done(self, task):
+        '''
+            This function is called when a rumble effect is finished.
+        '''
+        if not task.cancelled() and task.exception() is not None:
+            logger.info("Rumble failed: %s", task.exception())
+
+    def close(self):
+        '''
+            This function cancels a running rumble effect. Pending LED states are still written by the worker.
+        '''
+        if self._rumble_task is not None and not self._rumble_task.done():
+            self._rumble_task.cancel()
+        self._rumble_task = None
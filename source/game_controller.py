@@ -8,165 +8,218 @@
     Documentation: https://python-evdev.readthedocs.io/en/stable/index.html
 
 '''
-import logging
+import asyncio
+import os
 import time
-from enum import Enum, unique
-from evdev import InputDevice, categorize, ecodes, ff # pylint: disable=import-error, unused-import
-from exceptions import NoJoystickConnectedException, JoystickDisconnectedException
+from event_queue import EventQueue
+from controller_event import ControllerEvent, DIRECTION_EVENTS, PROTECTED_EVENTS
+from controller_profile import ControllerProfile
+from analog_input import AnalogInput
+from hotplug import InotifyWatcher
+from backends import backends
+from constants import CONTROLLER_PROFILE, CONTROLLER_CACHE_FILE, CONTROLLER_RETRY_INTERVAL
+from log_pipeline import get_logger
 
-@unique
-class ControllerEvent(Enum):
-    '''
-        This class defines the unique Controller Events.
-    '''
-    LEFT_PRESSED = 0
-    RIGHT_PRESSED = 1
-    UP_PRESSED = 2
-    DOWN_PRESSED = 3
-    TRIANGLE_PRESSED = 4
-    CROSS_PRESSED = 5
-    SQUARE_PRESSED = 6
-    CIRCLE_PRESSED = 7
-    NO_EVENT = 8
-    MENU_PRESSED = 9
-    R2_PRESSED = 10 # change to R1/L1
-    L2_PRESSED = 11    
-    RELEASED = 12
-    PS_HOME = 13
-    PS_SHARE = 14
+logger = get_logger('input')
 
 class Ps4GameController():
     '''
         This class is responsible for the joystick readings and updates for 1 joystick only. This class is easily changed 
-        for use with another controller. Just add a new profile instead of read_ps4_profile for the button events.
+        for use with another controller. Just add a new profile file in source/profiles for the button events.
+
+        The controller is discovered by the name, vendor and product of the profile instead of a fixed device path. Connecting never
+        blocks: when no controller is found, the event reader waits for a device to appear in /dev/input and
+        reconnects, also after the bluetooth link dropped.
     '''
-    RETRIES = 30
+    INPUT_PATH = '/dev/input'
 
-    def __init__(self):
+    def __init__(self, profile = None, device = None):
+        '''
+            This function initializes this class. A given device is used instead of discovering the controller,
+            for example the fake input device of the event injector.
+        '''
         self._connected = False
-        self._event_profile = self.read_ps4_profile
-        self._retries = 0
+        self._evdev = backends.load('input')
+        self._abs_type = self._evdev.ecodes.EV_ABS
+        self._injected_device = device
+        self._profile = profile if profile is not None else ControllerProfile.load(CONTROLLER_PROFILE)
+        self._analog = AnalogInput(self._profile.axes)
         self._device = None
-        self._event = None 
+        self._device_path = self.read_cached_path()
+        self._watcher = None
         self._released = False
+        self._events = EventQueue(ControllerEvent.RELEASED, DIRECTION_EVENTS, PROTECTED_EVENTS)
 
         self.connect()
 
-    def read_ps4_profile(self, dpad, button_id):
+    def read_cached_path(self):
         '''
-            This function reads the report for the PS4 Controller Bluetooth
+            This function returns the device path of the controller found last time, or None.
+        '''
+        try:
+            with open(CONTROLLER_CACHE_FILE, encoding='utf-8') as cache:
+                return cache.read().strip() or None
+        except OSError:
+            return None
 
-            dpad determines pressed and released button too!
+    def write_cached_path(self, path):
         '''
-        #logging.debug(f"dapd {dpad} button id {button_id}")
-        self._released = False
+            This function stores the device path of the controller for the next start.
+        '''
+        try:
+            os.makedirs(os.path.dirname(CONTROLLER_CACHE_FILE), exist_ok=True)
+            with open(CONTROLLER_CACHE_FILE, 'w', encoding='utf-8') as cache:
+                cache.write(path)
+        except OSError as exception:
+            logger.debug("Cannot cache controller path: %s", exception)
 
-        if dpad == (17, -1):
-            return ControllerEvent.UP_PRESSED
-        elif dpad == (16, 1):
-            return ControllerEvent.RIGHT_PRESSED
-        elif dpad == (17, 1):
-            return ControllerEvent.DOWN_PRESSED
-        elif dpad == (16, -1):
-            return ControllerEvent.LEFT_PRESSED
-        elif dpad == (17, 0):
-            return ControllerEvent.RELEASED
-        elif dpad == (16, 0):
-            return ControllerEvent.RELEASED
-        elif dpad == (17, 0):
-            return ControllerEvent.RELEASED
-        elif dpad == (16, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 304 and dpad == (304, 1):
-            return ControllerEvent.CROSS_PRESSED
-        elif button_id == 304 and dpad == (304, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 308 and dpad == (308, 1):
-            return ControllerEvent.SQUARE_PRESSED
-        elif button_id == 308 and dpad == (308, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 307 and dpad == (307, 1):
-            return ControllerEvent.TRIANGLE_PRESSED
-        elif button_id == 307 and dpad == (307, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 305 and dpad == (305, 1):
-            return ControllerEvent.CIRCLE_PRESSED
-        elif button_id == 305 and dpad == (305, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 315 and dpad == (315, 1):
-            return ControllerEvent.MENU_PRESSED
-        elif button_id == 315 and dpad == (315, 0):
-            return ControllerEvent.RELEASED
-        elif button_id == 312 and dpad == (312, 1):
-            return ControllerEvent.L2_PRESSED    
-        elif button_id == 312 and dpad == (312, 0):
-            return ControllerEvent.RELEASED            
-        elif button_id == 313 and dpad == (313, 1):
-            return ControllerEvent.R2_PRESSED
-        elif button_id == 313 and dpad == (313, 0):
-            return ControllerEvent.RELEASED 
-        elif button_id == 314 and dpad == (314, 1):
-            return ControllerEvent.PS_SHARE   
-        elif button_id == 314 and dpad == (314, 0):
-            return ControllerEvent.RELEASED   
-        elif button_id == 316 and dpad == (316, 1):
-            return ControllerEvent.PS_HOME    
-        elif button_id == 316 and dpad == (316, 0):
-            return ControllerEvent.RELEASED          
-        elif button_id == 6: # todo
-            return ControllerEvent.NO_EVENT
-        else:
-            return ControllerEvent.NO_EVENT
+    def is_controller(self, device):
+        '''
+            This function checks whether the input device is the game controller of the profile.
+        '''
+        return self._profile.identifies(device)
+
+    def open_device(self, path):
+        '''
+            This function opens the device path and returns the device when it is the game controller.
+        '''
+        try:
+            device = self._evdev.InputDevice(path)
+        except OSError:
+            return None
+
+        if self.is_controller(device):
+            return device
+
+        device.close()
+        return None
+
+    def discover(self):
+        '''
+            This function returns the game controller device, trying the cached path first.
+        '''
+        if self._injected_device is not None:
+            return self._injected_device
+
+        if self._device_path is not None:
+            device = self.open_device(self._device_path)
+            if device is not None:
+                return device
+
+        for path in self._evdev.list_devices(Ps4GameController.INPUT_PATH):
+            if path == self._device_path:
+                continue
+
+            device = self.open_device(path)
+            if device is not None:
+                return device
+
+        return None
 
     def connect(self):
         '''
-            This function connects the first controller found. It should be a PS4 controller.
+            This function connects the first controller found. It should be a PS4 controller. Returns whether the
+            controller is connected, it does not wait for a controller to appear.
+        '''
+        if self._connected:
+            return True
+
+        device = self.discover()
+        if device is None:
+            logger.info("No game controller found, waiting for it to connect...")
+            return False
+
+        try:
+            device.grab()
+        except OSError as exception:
+            logger.info("Cannot grab game controller: %s", exception)
+            device.close()
+            return False
+
+        self._device = device
+        self._connected = True
+        self._analog.configure(device)
+
+        if device is not self._injected_device and device.path != self._device_path:
+            self._device_path = device.path
+            self.write_cached_path(device.path)
+
+        logger.info("Connected %s Controller Successfully!", self._profile.name)
+        logger.info("Use 'Options' to gracefully shutdown the robot!\n")
+        logger.info(self._device)
+        return True
+
+    async def wait_for_device(self):
         '''
-        while(not self._connected and self._retries < Ps4GameController.RETRIES):
+            This function waits until an input device is added or changed. Without inotify it waits for the retry
+            interval.
+        '''
+        if self._watcher is None:
             try:
-                self._device = InputDevice('/dev/input/event2')
-                self._connected = True
-                self._retries = 0
-                self._device.grab()
-
-                logging.info("Connected PS4 Controller Successfully!")
-                logging.info("Use 'Options' to gracefully shutdown the robot!\n")
-                logging.info(self._device)
+                self._watcher = InotifyWatcher(Ps4GameController.INPUT_PATH)
             except OSError as exception:
-                self._retries += 1
-                logging.info(f"Connecting attempt[{self._retries}] to device failed... retrying in 5 sec!")
-                time.sleep(5)
+                logger.debug("Hotplug watching not available: %s", exception)
+                await asyncio.sleep(CONTROLLER_RETRY_INTERVAL)
+                return
 
-        if not self._connected:
-            raise NoJoystickConnectedException("Cannot connect game controller!")
+        await self._watcher.wait(CONTROLLER_RETRY_INTERVAL)
 
-    def rumble(self):
+    def connection_lost(self):
         '''
-            This function makes the controller rumble when its has the capability.
+            This function closes the device after the connection dropped and releases all pressed keys, so a
+            running gait stops.
         '''
+        self._connected = False
+        if self._device is not None:
+            try:
+                self._device.close()
+            except OSError:
+                pass
+            self._device = None
+
+        self._analog.reset()
+        return self._events.release_all(time.time())
+
+    async def rumble(self, duration_ms = 1000):
+        '''
+            This function makes the controller rumble when its has the capability. The effect runs as a task on the
+            event loop, so the caller is not blocked for the duration of the effect.
+        '''
+        ff = self._evdev.ff
+        if ff is None:
+            return
+
         rumble = ff.Rumble(strong_magnitude=0x0000, weak_magnitude=0xffff)
-        ff.EffectType(ff_rumble_effect=rumble)
-        duration_ms = 1000
 
         effect = ff.Effect(
-            ecodes.FF_RUMBLE, -1, 0,  # pylint: disable=no-member
+            self._evdev.ecodes.FF_RUMBLE, -1, 0,
             ff.Trigger(0, 0),
             ff.Replay(duration_ms, 0),
             ff.EffectType(ff_rumble_effect=rumble)
         )
 
         repeat_count = 1
-        effect_id = self._device.upload_effect(effect)
-        self._device.write(ecodes.EV_FF, effect_id, repeat_count) # pylint: disable=no-member
-        time.sleep(1)
-        self._device.erase_effect(effect_id)
+        if not self._connected:
+            return
+
+        try:
+            effect_id = self._device.upload_effect(effect)
+            self._device.write(self._evdev.ecodes.EV_FF, effect_id, repeat_count)
+            await asyncio.sleep(duration_ms / 1000)
+            self._device.erase_effect(effect_id)
+        except OSError as exception:
+            logger.debug("Rumble failed: %s", exception)
 
     def disconnect(self):
         '''
             This function correctly disconnects the controller
         '''
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
         if self._connected and self._device is not None:
-            logging.info("Joystick disconnected")
+            logger.info("Joystick disconnected")
             self._device.ungrab()
             self._connected = False
             self._device.close()
@@ -177,43 +230,73 @@ class Ps4GameController():
         '''
         return self._connected
 
-    def get_last_event(self):
+    def get_statistics(self):
         '''
-            This function reads event last read from the game controller and resets it. This function is used by other 
-            modules to get the last event fired.
+            This function returns the counters of the event queue.
         '''
-        event = self._event
-        self._event = None
-        return event
+        return {'queued': self._events.queued, 'dropped': self._events.dropped, 'coalesced': self._events.coalesced,
+                'depth': len(self._events)}
 
-    def get_event(self):
+    def get_next_event(self):
         '''
-            This function reads event report from the controller. It is the event handled in a different thread 
-            than the main thread.
+            This function removes and returns the oldest pending event of the game controller, or None when there is
+            no event. This function is used by other modules to get the events fired in order.
         '''
-        try:
-            for event in self._device.read_loop():
-                if event.type == ecodes.EV_KEY: # pylint: disable=no-member
-                    profile_event = self._event_profile((event.code,event.value), event.code)
-                    if profile_event != ControllerEvent.NO_EVENT:
-                        self._event = profile_event
-                        logging.info(f"GC::Last event: {self._event}")
-                        if self._event == ControllerEvent.MENU_PRESSED:
-                            self.disconnect()
-                            return
-                        elif profile_event == ControllerEvent.RELEASED:
-                            self._released = True
-
-                elif event.type == ecodes.EV_ABS: # pylint: disable=no-member
-                    profile_event = self._event_profile((event.code,event.value), event.code)
-                    if profile_event != ControllerEvent.NO_EVENT:
-                        self._event = profile_event
-                        logging.info(f"GC::Last event: {self._event}")
-                        if profile_event == ControllerEvent.RELEASED:
-                            self._released = True
+        return self._events.get()
 
-        except OSError as exception:
-            logging.debug(exception)
-            raise JoystickDisconnectedException("Game Controller disconnected!") from exception
+    def get_stick_state(self):
+        '''
+            This function returns the latest filtered stick state of the analog axes.
+        '''
+        return self._analog.get_state()
 
-        return None
+    def handle_event(self, event):
+        '''
+            This function translates a raw input event with the controller profile and queues it. The analog axes
+            of the profile go to the analog input stage instead of the queue and are not logged.
+            Returns the profile event or None when the event is not mapped.
+        '''
+        if event.code in self._analog and event.type == self._abs_type:
+            self._analog.update(event.code, event.value, event.timestamp())
+            return None
+
+        profile_event = self._profile.lookup(event.type, event.code, event.value)
+        if profile_event is None:
+            return None
+
+        self._released = False
+
+        self._events.put(profile_event, event.code, event.timestamp())
+        logger.debug("GC::Last event: %s", profile_event)
+
+        if profile_event == ControllerEvent.RELEASED:
+            self._released = True
+
+        return profile_event
+
+    async def read_events(self):
+        '''
+            This function reads the event reports from the controller on the event loop and yields every mapped
+            profile event. It connects the controller when it appears and reconnects after the connection dropped.
+        '''
+        while True:
+            if not self.connect():
+                await self.wait_for_device()
+                continue
+
+            try:
+                async for event in self._device.async_read_loop():
+                    profile_event = self.handle_event(event)
+                    if profile_event is None:
+                        continue
+
+                    yield profile_event
+
+                    if profile_event == ControllerEvent.MENU_PRESSED:
+                        self.disconnect()
+                        return
+
+            except OSError as exception:
+                logger.info("Game controller connection lost: %s", exception)
+                if self.connection_lost():
+                    yield ControllerEvent.RELEASED
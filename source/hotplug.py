@@ -0,0 +1,92 @@
+'''
+    This module watches a directory with inotify, used to detect input devices that are plugged in or removed.
+
+    The inotify calls are done through ctypes on the C library, so no additional package is required.
+'''
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyWatcher():
+    '''
+        This class watches one directory for created, deleted and changed entries.
+    '''
+    def __init__(self, path, mask = IN_CREATE | IN_ATTRIB | IN_DELETE):
+        '''
+            This function initializes this class. Raises OSError when inotify is not available.
+        '''
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error), path)
+
+    def fileno(self):
+        '''
+            This function returns the file descriptor of the watcher.
+        '''
+        return self._fd
+
+    def read(self):
+        '''
+            This function returns the pending events as list of (mask, name) without blocking.
+        '''
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode()
+            offset += length
+            events.append((mask, name))
+
+        return events
+
+    async def wait(self, timeout):
+        '''
+            This function waits on the event loop until an entry changed or the timeout expired, and returns the
+            events.
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def readable():
+            if not future.done():
+                future.set_result(None)
+
+        loop.add_reader(self._fd, readable)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(self._fd)
+
+        return self.read()
+
+    def close(self):
+        '''
+            This function closes the watcher.
+        '''
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
@@ -0,0 +1,72 @@
+'''
+    This module is the stand-in of the evdev module when evdev is not installed or no input is used.
+
+    It has the input event codes that the controller profiles use, with the values of the Linux input event codes,
+    and no input devices. Events are still injected with the fake input device of the event injector.
+'''
+class ecodes(): # pylint: disable=invalid-name
+    '''
+        This class holds the Linux input event codes, like evdev.ecodes.
+    '''
+    EV_SYN = 0x00
+    EV_KEY = 0x01
+    EV_REL = 0x02
+    EV_ABS = 0x03
+    EV_FF = 0x15
+
+    ABS_X = 0x00
+    ABS_Y = 0x01
+    ABS_Z = 0x02
+    ABS_RX = 0x03
+    ABS_RY = 0x04
+    ABS_RZ = 0x05
+    ABS_HAT0X = 0x10
+    ABS_HAT0Y = 0x11
+
+    BTN_SOUTH = 0x130
+    BTN_EAST = 0x131
+    BTN_C = 0x132
+    BTN_NORTH = 0x133
+    BTN_WEST = 0x134
+    BTN_Z = 0x135
+    BTN_TL = 0x136
+    BTN_TR = 0x137
+    BTN_TL2 = 0x138
+    BTN_TR2 = 0x139
+    BTN_SELECT = 0x13a
+    BTN_START = 0x13b
+    BTN_MODE = 0x13c
+    BTN_THUMBL = 0x13d
+    BTN_THUMBR = 0x13e
+
+    KEY_ESC = 1
+    KEY_1 = 2
+    KEY_2 = 3
+    KEY_MINUS = 12
+    KEY_EQUAL = 13
+    KEY_W = 17
+    KEY_R = 19
+    KEY_S = 31
+    KEY_C = 46
+    KEY_UP = 103
+    KEY_LEFT = 105
+    KEY_RIGHT = 106
+    KEY_DOWN = 108
+
+    FF_RUMBLE = 0x50
+
+# force feedback is not available without evdev
+ff = None
+
+def list_devices(input_device_dir = '/dev/input'): # pylint: disable=unused-argument
+    '''
+        This function returns no input devices.
+    '''
+    return []
+
+class InputDevice():
+    '''
+        This class cannot open input devices without evdev.
+    '''
+    def __init__(self, dev):
+        raise OSError(f"No input backend to open {dev}")
@@ -0,0 +1,70 @@
+'''
+    This module contains the transformation of the joint angles of the inverse kinematics to the servo angles.
+
+    The servos of the legs are mounted mirrored on the body corners, so per leg the joint angles are mirrored and
+    shifted. The transformation is a sign and an offset per joint, servo = sign * angle + offset, where the offset
+    holds the mounting shift and the calibration error. The signs and offsets of all joints are stored in arrays of
+    4x3 doubles in leg order alpha,beta,gamma, like the joint angle frame, so no per leg branches are needed.
+'''
+from array import array
+
+from leg_state import LEG_COUNT, AXES, LEG_STATE_SIZE
+
+# sign and shift of alpha, beta and gamma per leg: (alpha sign, alpha shift, beta sign, ..., gamma shift)
+LEG_LAYOUT = (
+    (-1, 90, 1, 0, 1, 90),      # right front: alpha = 90 - alpha, gamma += 90
+    (1, 90, -1, 180, -1, 90),   # right back: alpha += 90, beta = 180 - beta, gamma = 90 - gamma
+    (1, 90, -1, 180, -1, 90),   # left front: alpha += 90, beta = 180 - beta, gamma = 90 - gamma
+    (-1, 90, 1, 0, 1, 90),      # left back: alpha = 90 - alpha, gamma += 90
+)
+
+class JointTransform():
+    '''
+        This class holds the signs and offsets of all joints and transforms joint angle frames to servo angles.
+    '''
+    __slots__ = ('sign', 'shift', 'error', 'offset')
+
+    def __init__(self, layout = LEG_LAYOUT):
+        self.sign = array('d', [layout[leg][axis * 2] for leg in range(LEG_COUNT) for axis in range(AXES)])
+        self.shift = array('d', [layout[leg][axis * 2 + 1] for leg in range(LEG_COUNT) for axis in range(AXES)])
+        self.error = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.offset = array('d', self.shift)
+
+    def set_error(self, leg_index, alpha_error, beta_error, gamma_error):
+        '''
+            This function sets the calibration error of the joints of a leg and precomputes their offsets.
+        '''
+        base = leg_index * AXES
+        error = self.error
+        error[base] = alpha_error
+        error[base + 1] = beta_error
+        error[base + 2] = gamma_error
+
+        for joint in range(base, base + AXES):
+            self.offset[joint] = self.sign[joint] * error[joint] + self.shift[joint]
+
+    def apply(self, angles, servo_angles, leg_index = None):
+        '''
+            This function transforms the joint angles of one leg, or of all legs when no index is given, to the
+            servo angles. Both frames are arrays of 4x3 values.
+        '''
+        sign = self.sign
+        offset = self.offset
+
+        if leg_index is None:
+            joints = range(LEG_STATE_SIZE)
+        else:
+            joints = range(leg_index * AXES, leg_index * AXES + AXES)
+
+        for joint in joints:
+            servo_angles[joint] = sign[joint] * angles[joint] + offset[joint]
+
+    def to_servo(self, leg_index, alpha, beta, gamma):
+        '''
+            This function returns the servo angles of the joint angles of a leg.
+        '''
+        base = leg_index * AXES
+        sign = self.sign
+        offset = self.offset
+        return (sign[base] * alpha + offset[base], sign[base + 1] * beta + offset[base + 1],
+                sign[base + 2] * gamma + offset[base + 2])
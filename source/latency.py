@@ -0,0 +1,152 @@
+'''
+    This module contains the input to servo latency tracing.
+
+    Every input event carries the kernel timestamp of evdev. The trace of an event marks the stages it passes:
+    - dispatch: the event is taken from the queue and processed by the action controller
+    - start: the action of the event is started
+    - set_legs: the action sets its first leg target
+    - frame: the first servo frame that moves a leg to that target is written
+    The latency between two stages is added to the histogram of the later stage, so the histograms show whether
+    the input thread, the action dispatch or the servo path has to be optimized.
+'''
+import time
+from log_pipeline import get_logger
+
+logger = get_logger('actions')
+
+class Histogram():
+    '''
+        This class is a fixed bucket histogram of latencies in milliseconds.
+    '''
+    BOUNDS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+    def __init__(self, bounds = BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        '''
+            This function adds a latency value in milliseconds.
+        '''
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percentage):
+        '''
+            This function returns the upper bound of the bucket that holds the given percentile.
+        '''
+        if self.count == 0:
+            return 0.0
+
+        threshold = self.count * percentage / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(self.bounds[index], self.maximum)
+        return self.maximum
+
+    def mean(self):
+        '''
+            This function returns the mean latency.
+        '''
+        return self.total / self.count if self.count else 0.0
+
+class LatencyTrace():
+    '''
+        This class holds the stage timestamps of one input event.
+    '''
+    __slots__ = ('origin', 'last', 'stages')
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.last = origin
+        self.stages = set()
+
+class LatencyTracer():
+    '''
+        This class traces input events through the stages and keeps a histogram per stage.
+    '''
+    STAGES = ('dispatch', 'start', 'set_legs', 'frame')
+
+    def __init__(self):
+        self.histograms = {stage: Histogram() for stage in LatencyTracer.STAGES}
+        self.total = Histogram()
+        self._active = None
+        self._frame = None
+
+    def begin(self, origin):
+        '''
+            This function starts the trace of an input event with its kernel timestamp in seconds.
+        '''
+        if origin is None:
+            return None
+        return LatencyTrace(origin)
+
+    def mark(self, trace, stage):
+        '''
+            This function marks the first time the trace passes a stage.
+        '''
+        if trace is None or stage in trace.stages:
+            return
+
+        now = time.time()
+        trace.stages.add(stage)
+        self.histograms[stage].add((now - trace.last) * 1000)
+        trace.last = now
+
+        if stage == 'frame':
+            self.total.add((now - trace.origin) * 1000)
+
+    def activate(self, trace):
+        '''
+            This function makes the trace the one of the running motion, so the leg and servo stages are marked
+            on it.
+        '''
+        self._active = trace
+        self._frame = None
+
+    def mark_set_legs(self):
+        '''
+            This function marks the first leg target of the running motion and arms the servo frame stage.
+        '''
+        trace = self._active
+        if trace is not None and 'set_legs' not in trace.stages:
+            self.mark(trace, 'set_legs')
+            self._frame = trace
+
+    def mark_frame(self):
+        '''
+            This function marks the first servo frame written after the first leg target. It is called from the
+            servo ticker thread.
+        '''
+        trace = self._frame
+        if trace is not None:
+            self._frame = None
+            self._active = None
+            self.mark(trace, 'frame')
+
+    def report(self):
+        '''
+            This function logs the latency histograms.
+        '''
+        for stage in LatencyTracer.STAGES:
+            self.log_histogram(stage, self.histograms[stage])
+        self.log_histogram('total', self.total)
+
+    def log_histogram(self, name, histogram):
+        '''
+            This function logs the statistics of one histogram.
+        '''
+        logger.info("Latency %-9s: n %s mean %0.2f ms p50 %0.2f ms p99 %0.2f ms max %0.2f ms", name, histogram.count,
+                    histogram.mean(), histogram.percentile(50), histogram.percentile(99), histogram.maximum)
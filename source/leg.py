@@ -4,6 +4,8 @@
 from movement import Movement
 from position import Position
 from servo import Servo
+from leg_state import LegState, AXES
+from joint_transform import JointTransform
 from constants import MOVE_SPEED
 
 class Leg():
@@ -19,6 +21,9 @@ class Leg():
     FEMUR = 1
     TIBIA = 2
 
+    TARGET_DEFAULT = (62, 62, -28)
+    SPEED_DEFAULT = (MOVE_SPEED, MOVE_SPEED, MOVE_SPEED)
+
     @property
     def index(self):
         '''
@@ -31,11 +36,16 @@ class Leg():
         self._index = index
 
     # initialize leg endpoint x,y,z
-    def __init__(self, index, servo_controller, x, y, z):
+    def __init__(self, index, servo_controller, x, y, z, state = None, joints = None):
         '''
-            This function initializes this class.
+            This function initializes this class. The position and movement of the leg are views on the leg state
+            of the body and the servo angles come from the joint transform of the body, a leg without body gets its
+            own.
         '''
         self.index = index
+        self.state = state if state is not None else LegState()
+        self.joints = joints if joints is not None else JointTransform()
+        offset = index * AXES
 
         # initialize servo for the leg parts
         self._servo_coxa = Servo(Leg.COXA + (self._index*3), servo_controller)
@@ -43,9 +53,9 @@ class Leg():
         self._servo_tibia = Servo(Leg.TIBIA + (self._index*3), servo_controller)
 
         # set defaults
-        self.current_position = Position(x, y, z)
-        self.target_position = Position(62, 62, -28)
-        self.movement = Movement(MOVE_SPEED, MOVE_SPEED, MOVE_SPEED)
+        self.current_position = Position(x, y, z, self.state.current, offset)
+        self.target_position = Position(*Leg.TARGET_DEFAULT, self.state.target, offset)
+        self.movement = Movement(*Leg.SPEED_DEFAULT, self.state.speed, offset)
 
         self.alpha_error = 0
         self.beta_error = 0
@@ -55,40 +65,36 @@ class Leg():
         self.alpha_error = alpha_error
         self.beta_error = beta_error
         self.gamma_error = gamma_error
+        self.joints.set_error(self._index, alpha_error, beta_error, gamma_error)
+
+    def is_reached(self):
+        '''
+            This function returns whether the leg endpoint reached its target position.
+        '''
+        return self.state.is_reached(self._index)
 
     def polar_to_servo(self, alpha, beta, gamma):
         '''
             This function returns the angle values with respect to the leg position on the body.
         '''
-        alpha += self.alpha_error
-        beta += self.beta_error
-        gamma += self.gamma_error
-
-        if self._index == 0:
-            alpha = 90 - alpha
-            gamma += 90
-        if self._index == 1:
-            alpha += 90
-            beta = 180 - beta
-            gamma = 90 - gamma
-        if self._index == 2:
-            alpha += 90
-            beta = 180 - beta
-            gamma = 90 - gamma
-        if self._index == 3:
-            alpha = 90 - alpha
-            gamma += 90
-
-        return alpha, beta, gamma
+        return self.joints.to_servo(self._index, alpha, beta, gamma)
 
     def set(self, alpha, beta, gamma):
         '''
             This function writes the actual angle data to the appropiate servo.
         '''
-        #if(self._index == 0): logging.debug(f"leg index {self.index} Alpha: {alpha} Beta: {beta} Gamma: {gamma}")
-
         alpha_servo, beta_servo, gamma_servo = self.polar_to_servo(alpha, beta, gamma)
 
         self._servo_coxa.write(gamma_servo)
         self._servo_femur.write(alpha_servo)
         self._servo_tibia.write(beta_servo)
+
+    def write(self, servo_angles):
+        '''
+            This function writes the servo angles of this leg from a servo angle frame of the body.
+        '''
+        base = self._index * AXES
+
+        self._servo_coxa.write(servo_angles[base + 2])
+        self._servo_femur.write(servo_angles[base])
+        self._servo_tibia.write(servo_angles[base + 1])
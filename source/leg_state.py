@@ -0,0 +1,71 @@
+'''
+    This module contains the leg state of the body as struct of arrays.
+
+    The current position, the target position and the speed of the four leg endpoints are stored in one array of
+    4x3 doubles per quantity, in leg order x,y,z. The Position and Movement objects of the legs are views on these
+    arrays, and the interpolation step works on the arrays directly, without attribute lookups or allocations.
+'''
+from array import array
+
+LEG_COUNT = 4
+AXES = 3
+LEG_STATE_SIZE = LEG_COUNT * AXES
+
+class LegState():
+    '''
+        This class holds the current positions, target positions and speeds of all leg endpoints.
+    '''
+    __slots__ = ('current', 'target', 'speed')
+
+    def __init__(self):
+        self.current = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.target = array('d', bytes(8 * LEG_STATE_SIZE))
+        self.speed = array('d', bytes(8 * LEG_STATE_SIZE))
+
+    def reset(self, position, target, speed):
+        '''
+            This function sets the current position, target position and speed x,y,z of all legs in place.
+        '''
+        for axis in range(LEG_STATE_SIZE):
+            self.current[axis] = position[axis % AXES]
+            self.target[axis] = target[axis % AXES]
+            self.speed[axis] = speed[axis % AXES]
+
+    def step(self, leg_index = None):
+        '''
+            This function moves the endpoint of one leg, or of all legs when no index is given, one step towards
+            its target. An axis that is closer to its target than its speed is set to the target.
+        '''
+        current = self.current
+        target = self.target
+        speed = self.speed
+
+        if leg_index is None:
+            axes = range(LEG_STATE_SIZE)
+        else:
+            axes = range(leg_index * AXES, leg_index * AXES + AXES)
+
+        for axis in axes:
+            axis_speed = speed[axis]
+            if abs(current[axis] - target[axis]) >= abs(axis_speed):
+                current[axis] += axis_speed
+            else:
+                current[axis] = target[axis]
+
+    def is_reached(self, leg_index):
+        '''
+            This function returns whether the endpoint of a leg reached its target position.
+        '''
+        base = leg_index * AXES
+        current = self.current
+        target = self.target
+        return (current[base] == target[base] and current[base + 1] == target[base + 1] and
+                current[base + 2] == target[base + 2])
+
+    def get_current(self, leg_index):
+        '''
+            This function returns the current position of a leg endpoint as x,y,z.
+        '''
+        base = leg_index * AXES
+        current = self.current
+        return current[base], current[base + 1], current[base + 2]
@@ -0,0 +1,155 @@
+'''
+    This module contains the non-blocking logging pipeline.
+
+    The control threads, like the servo ticker and the event loop, only put the log records in a queue. A listener
+    thread formats the records and writes them to the console, so slow console or journald I/O never delays a servo
+    tick. When the queue is full the records are dropped and counted instead of blocking the caller.
+
+    Every subsystem logs to its own logger below 't_trex', like 't_trex.actions' or 't_trex.input', so the level of
+    a subsystem can be set on its own, from LOG_LEVELS or on the command line:
+
+        python3 t_trex.py LOG=INFO,actions:DEBUG,input:WARNING
+
+    Log calls on the hot path use lazy %-formatting, so the message is only formatted when the level is enabled,
+    and then on the listener thread.
+'''
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from constants import LOG_LEVEL, LOG_LEVELS, LOG_LIBRARY_LEVELS, LOG_QUEUE_SIZE, LOG_FORMAT
+
+LOGGER_ROOT = 't_trex'
+
+def get_logger(subsystem):
+    '''
+        This function returns the logger of a subsystem.
+    '''
+    return logging.getLogger(f"{LOGGER_ROOT}.{subsystem}")
+
+logger = get_logger('startup')
+
+def parse_levels(argument):
+    '''
+        This function parses a level argument like "INFO,actions:DEBUG" into the root level, or None, and the
+        levels per subsystem.
+    '''
+    level = None
+    levels = {}
+    for item in filter(None, argument.split(',')):
+        if ':' in item:
+            subsystem, subsystem_level = item.split(':', 1)
+            levels[subsystem] = subsystem_level.upper()
+        else:
+            level = item.upper()
+    return level, levels
+
+class DroppingQueueHandler(QueueHandler):
+    '''
+        This class puts the log records in the queue without formatting them, and drops them when the queue is full.
+    '''
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        '''
+            This function keeps the record as it is, the message is formatted by the listener thread.
+        '''
+        return record
+
+    def enqueue(self, record):
+        '''
+            This function puts the record in the queue, or drops it when the queue is full.
+        '''
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogListener(QueueListener):
+    '''
+        This class writes the queued log records on its own thread.
+    '''
+    def enqueue_sentinel(self):
+        '''
+            This function waits for room in the queue for the stop marker, so the queued records are written first.
+        '''
+        self.queue.put(self._sentinel)
+
+class LogPipeline():
+    '''
+        This class sets up the queue based logging and the levels of the subsystems.
+    '''
+    def __init__(self, level = LOG_LEVEL, levels = None, queue_size = LOG_QUEUE_SIZE, log_format = LOG_FORMAT):
+        '''
+            This function initializes this class.
+
+            : level - the level of the root logger
+            : levels - the levels per subsystem, the subsystem name without the 't_trex.' prefix
+            : queue_size - the maximum number of queued records before records are dropped
+            : log_format - the format of the written records
+        '''
+        self._level = level
+        self._levels = dict(LOG_LEVELS, **(levels or {}))
+        self._queue = queue.Queue(queue_size)
+        self._formatter = logging.Formatter(log_format)
+        self._handler = None
+        self._output = None
+        self._listener = None
+
+    @property
+    def dropped(self):
+        '''
+            This property returns the number of dropped records.
+        '''
+        return self._handler.dropped if self._handler is not None else 0
+
+    def collect_metrics(self, writer):
+        '''
+            This function writes the logging metrics. It is called from the metrics thread.
+        '''
+        writer.add('queue_depth', 'gauge', "Pending items per queue.", self._queue.qsize(), {'queue': 'log'})
+        writer.add('log_records_dropped_total', 'counter', "Log records dropped because the queue was full.",
+                   self.dropped)
+
+    def start(self):
+        '''
+            This function replaces the handlers of the root logger by the queue, sets the levels of the subsystems
+            and libraries and starts the listener thread.
+        '''
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+
+        self._output = logging.StreamHandler()
+        self._output.setFormatter(self._formatter)
+        self._handler = DroppingQueueHandler(self._queue)
+        root.addHandler(self._handler)
+        root.setLevel(self._level)
+
+        for subsystem, level in self._levels.items():
+            get_logger(subsystem).setLevel(level)
+        for library, level in LOG_LIBRARY_LEVELS.items():
+            logging.getLogger(library).setLevel(level)
+
+        self._listener = LogListener(self._queue, self._output)
+        self._listener.start()
+
+    def stop(self):
+        '''
+            This function writes the queued records and stops the listener thread. Later records are written
+            directly.
+        '''
+        if self._listener is None:
+            return
+
+        self._listener.stop()
+        self._listener = None
+
+        root = logging.getLogger()
+        root.removeHandler(self._handler)
+        root.addHandler(self._output)
+
+        if self._handler.dropped:
+            logger.info("Log records dropped: %s", self._handler.dropped)
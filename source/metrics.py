@@ -0,0 +1,212 @@
+'''
+    This module contains the local metrics endpoint in the Prometheus text format.
+
+    A small HTTP server on its own thread answers GET /metrics. On every request the registered collectors write
+    their metrics to a metrics writer, reading the plain counters that the servo loop, the action loop and the
+    workers keep anyway, so the control path does no work for the endpoint. The counters are only written by one
+    thread each and read without locking, a scrape may see them a tick apart. For example:
+
+        curl http://127.0.0.1:9105/metrics
+
+        # HELP t_trex_servo_ticks_total Servo ticks since the start.
+        # TYPE t_trex_servo_ticks_total counter
+        t_trex_servo_ticks_total 48211
+'''
+import math
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from constants import METRICS_HOST, METRICS_PORT, CPU_TEMPERATURE_FILE
+from log_pipeline import get_logger
+
+logger = get_logger('remote')
+
+METRICS_PREFIX = 't_trex_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def format_value(value):
+    '''
+        This function formats a sample value in the Prometheus text format.
+    '''
+    if value is None:
+        return 'NaN'
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+
+def format_labels(labels):
+    '''
+        This function formats the labels of a sample, or returns an empty string without labels.
+    '''
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+def read_cpu_temperature(path = CPU_TEMPERATURE_FILE):
+    '''
+        This function returns the CPU temperature in degrees Celsius, or None when it cannot be read.
+    '''
+    try:
+        with open(path, encoding='ascii') as temperature_file:
+            return int(temperature_file.read().strip()) / 1000
+    except (OSError, ValueError):
+        return None
+
+class MetricsWriter():
+    '''
+        This class collects the metric samples of one scrape and formats them, grouped per metric.
+    '''
+    def __init__(self, prefix = METRICS_PREFIX):
+        self._prefix = prefix
+        self._metrics = {}
+
+    def add(self, name, kind, help_text, value, labels = None, suffix = ''):
+        '''
+            This function adds a sample. The help and type of a metric are taken from its first sample.
+
+            : kind - counter, gauge, histogram or summary
+            : suffix - the sample suffix of histograms and summaries, like _sum or _count
+        '''
+        name = self._prefix + name
+        lines = self._metrics.get(name)
+        if lines is None:
+            lines = self._metrics[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines.append(f"{name}{suffix}{format_labels(labels)} {format_value(value)}")
+
+    def histogram(self, name, help_text, histogram, scale = 1.0):
+        '''
+            This function adds a fixed bucket histogram of latency.Histogram, the bounds are multiplied by scale.
+        '''
+        counts = list(histogram.counts)
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, counts):
+            cumulative += count
+            upper = '+Inf' if math.isinf(bound) else format_value(bound * scale)
+            self.add(name, 'histogram', help_text, cumulative, {'le': upper}, '_bucket')
+        self.add(name, 'histogram', help_text, histogram.total * scale, None, '_sum')
+        self.add(name, 'histogram', help_text, cumulative, None, '_count')
+
+    def text(self):
+        '''
+            This function returns the samples in the Prometheus text format.
+        '''
+        return ''.join(line + '\n' for lines in self._metrics.values() for line in lines)
+
+class Rate():
+    '''
+        This class turns a counter into a rate per second between two scrapes.
+    '''
+    def __init__(self):
+        self._value = None
+        self._time = None
+        self.rate = 0.0
+
+    def update(self, value, now = None):
+        '''
+            This function returns the rate of the counter since the previous update.
+        '''
+        now = time.monotonic() if now is None else now
+        if self._time is not None and now > self._time:
+            self.rate = (value - self._value) / (now - self._time)
+        self._value = value
+        self._time = now
+        return self.rate
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    '''
+        This class answers the metrics requests.
+    '''
+    def do_GET(self): # pylint: disable=invalid-name
+        '''
+            This function returns the metrics on /metrics.
+        '''
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.collect().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        logger.debug("Metrics request: %s", format % args)
+
+class MetricsServer():
+    '''
+        This class serves the metrics of the registered collectors from its own thread.
+    '''
+    def __init__(self, host = METRICS_HOST, port = METRICS_PORT):
+        '''
+            This function initializes this class.
+
+            : host, port - the address to listen on, the endpoint is local by default
+        '''
+        self._host = host
+        self._port = port
+        self._collectors = []
+        self._server = None
+        self._thread = None
+        self.scrapes = 0
+        self.errors = 0
+
+    @property
+    def address(self):
+        '''
+            This function returns the address the server is listening on.
+        '''
+        return self._server.server_address if self._server is not None else None
+
+    def register(self, collector):
+        '''
+            This function registers a collector, a function that is called with the metrics writer on every scrape.
+        '''
+        self._collectors.append(collector)
+
+    def collect(self):
+        '''
+            This function calls the collectors and returns the metrics text. A failing collector is skipped.
+        '''
+        self.scrapes += 1
+        writer = MetricsWriter()
+        for collector in self._collectors:
+            try:
+                collector(writer)
+            except Exception as exception: # pylint: disable=broad-except
+                self.errors += 1
+                logger.debug("Metrics collector failed: %s", exception)
+
+        writer.add('metrics_scrapes_total', 'counter', "Metrics requests served.", self.scrapes)
+        writer.add('metrics_errors_total', 'counter', "Metrics collectors that failed.", self.errors)
+        writer.add('cpu_temperature_celsius', 'gauge', "CPU temperature.", read_cpu_temperature())
+        return writer.text()
+
+    def start(self):
+        '''
+            This function opens the socket and starts the server thread.
+        '''
+        self._server = HTTPServer((self._host, self._port), MetricsHandler)
+        self._server.metrics = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        logger.info("Metrics served on http://%s:%s/metrics", self.address[0], self.address[1])
+
+    def stop(self):
+        '''
+            This function stops the server thread and closes the socket.
+        '''
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
@@ -1,38 +1,47 @@
 '''
     This module contains the movement class.
 '''
+from array import array
+
 class Movement():
     '''
-        This class contains the movement information.
+        This class contains the movement information. A movement is a view on three values of an array, by default
+        its own array, or the leg state of the body.
     '''
+    __slots__ = ('_values', '_offset')
+
     @property
     def x_speed(self):
         ''' This is the speed value along the x-axis. '''
-        return self._x_speed
+        return self._values[self._offset]
 
     @x_speed.setter
     def x_speed(self, x_speed):
-        self._x_speed = x_speed
+        self._values[self._offset] = x_speed
 
     @property
     def y_speed(self):
         ''' This is the speed value along the y-axis. '''
-        return self._y_speed
+        return self._values[self._offset + 1]
 
     @y_speed.setter
     def y_speed(self, y_speed):
-        self._y_speed = y_speed
+        self._values[self._offset + 1] = y_speed
 
     @property
     def z_speed(self):
         ''' This is the speed value along the z-axis. '''
-        return self._z_speed
+        return self._values[self._offset + 2]
 
     @z_speed.setter
     def z_speed(self, z_speed):
-        self._z_speed = z_speed
+        self._values[self._offset + 2] = z_speed
 
-    def __init__(self,x_speed, y_speed, z_speed):
-        self._x_speed = x_speed
-        self._y_speed = y_speed
-        self._z_speed = z_speed
+    def __init__(self,x_speed, y_speed, z_speed, values = None, offset = 0):
+        if values is None:
+            values = array('d', bytes(24))
+        self._values = values
+        self._offset = offset
+        values[offset] = x_speed
+        values[offset + 1] = y_speed
+        values[offset + 2] = z_speed
@@ -0,0 +1,230 @@
+'''
+    This module contains the runtime parameter store of the gait geometry and speeds.
+
+    The parameters start with the values of constants.py and can be changed while the robot runs, from the game
+    controller or over the network. Every change increments the version of the store and invalidates the derived
+    caches, like the turn sites of the gait geometry. The caches are rebuilt on a background thread from a consistent
+    copy of the parameters and swapped in at once, so a gait never sees half of a change. Until the rebuild is done
+    the previous caches stay in use. A gait reads the geometry once when it starts a step:
+
+        geometry = parameters.geometry
+        quadruped.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+'''
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from calculations import turn_sites
+from exceptions import ParameterException
+from constants import x_range, x_offset, y_start, y_step, z_up, z_range, z_ground, length_side
+from constants import MOVE_SPEED, TURN_SPEED, PARAMETER_HISTORY
+from log_pipeline import get_logger
+
+logger = get_logger('motion')
+
+PARAMETERS = {
+    'x_range': x_range,
+    'x_offset': x_offset,
+    'y_start': y_start,
+    'y_step': y_step,
+    'z_up': z_up,
+    'z_range': z_range,
+    'z_ground': z_ground,
+    'length_side': length_side,
+    'move_speed': MOVE_SPEED,
+    'turn_speed': TURN_SPEED,
+}
+
+# lowest and highest value of each parameter, in millimeters or speed units
+PARAMETER_LIMITS = {
+    'x_range': (20, 120),
+    'x_offset': (-40, 40),
+    'y_start': (-40, 40),
+    'y_step': (0, 90),
+    'z_up': (-80, 0),
+    'z_range': (-100, 0),
+    'z_ground': (-80, 0),
+    'length_side': (40, 120),
+    'move_speed': (0.1, 20),
+    'turn_speed': (0.1, 20),
+}
+
+class GaitGeometry():
+    '''
+        This class holds one consistent version of the parameters and the turn sites derived from them.
+    '''
+    __slots__ = tuple(PARAMETERS) + ('version', 'turn_x0', 'turn_y0', 'turn_x1', 'turn_y1')
+
+    def __init__(self, values, version):
+        for name, value in values.items():
+            setattr(self, name, value)
+        self.version = version
+        self.turn_x0, self.turn_y0, self.turn_x1, self.turn_y1 = turn_sites(
+            self.x_range, self.y_start, self.y_step, self.length_side)
+
+class ParameterStore():
+    '''
+        This class holds the versioned parameters and rebuilds the derived caches when they change.
+    '''
+    def __init__(self, values = None):
+        '''
+            This function initializes this class and builds the caches of the initial parameters.
+
+            : values - parameters that differ from the defaults
+        '''
+        self._values = dict(PARAMETERS)
+        self._lock = threading.Lock()
+        self._builders = {}
+        self._caches = {}
+        self._executor = None
+        self.version = 0
+        self.built_version = 0
+        self.rebuilds = 0
+        self.changes = deque(maxlen=PARAMETER_HISTORY)
+
+        for name, value in (values or {}).items():
+            self._values[name] = self.check_value(name, value)
+
+        self.register_cache('geometry', GaitGeometry)
+
+    def check_name(self, name):
+        '''
+            This function returns the name when it is a known parameter.
+        '''
+        if name not in self._values:
+            raise ParameterException(f"Unknown parameter: {name}")
+        return name
+
+    def check_value(self, name, value):
+        '''
+            This function returns the value as float when it is a finite number within the limits of the parameter.
+        '''
+        self.check_name(name)
+        try:
+            value = float(value)
+        except (TypeError, ValueError) as exception:
+            raise ParameterException(f"Invalid value for {name}: {value!r}") from exception
+
+        low, high = PARAMETER_LIMITS[name]
+        if not math.isfinite(value) or not low <= value <= high:
+            raise ParameterException(f"Value of {name} out of range [{low}, {high}]: {value}")
+        return value
+
+    def register_cache(self, name, build):
+        '''
+            This function registers a derived cache. The build function is called with a copy of the parameters
+            and their version, and returns the cache.
+        '''
+        with self._lock:
+            self._builders[name] = build
+            self._caches = dict(self._caches, **{name: build(dict(self._values), self.version)})
+
+    def get(self, name):
+        '''
+            This function returns the current value of a parameter.
+        '''
+        return self._values[self.check_name(name)]
+
+    def set(self, name, value):
+        '''
+            This function changes a parameter, invalidates the caches and returns the new version. It is safe to
+            call from any thread. A value that is out of range or gives no valid gait geometry is rejected with
+            a ParameterException and the parameters stay unchanged.
+        '''
+        value = self.check_value(name, value)
+
+        with self._lock:
+            if self._values[name] == value:
+                return self.version
+            values = dict(self._values, **{name: value})
+            try:
+                GaitGeometry(values, self.version + 1)
+            except (ValueError, ZeroDivisionError) as exception:
+                raise ParameterException(f"No gait geometry for {name} = {value}: {exception}") from exception
+            self._values = values
+            self.version += 1
+            version = self.version
+            self.changes.append((time.time(), version, name, value))
+
+        logger.info("Parameter %s = %s (version %s)", name, value, version)
+        self.invalidate()
+        return version
+
+    def adjust(self, name, delta):
+        '''
+            This function changes a parameter by delta and returns the new version.
+        '''
+        return self.set(name, self.get(name) + delta)
+
+    def invalidate(self):
+        '''
+            This function schedules the rebuild of the caches on the background thread.
+        '''
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='parameters')
+        self._executor.submit(self.rebuild)
+
+    def rebuild(self):
+        '''
+            This function rebuilds all caches from a copy of the parameters, when they are not up to date, and
+            swaps them in at once. Changes that arrive during a rebuild are picked up by the next one.
+        '''
+        with self._lock:
+            values = dict(self._values)
+            version = self.version
+            if version <= self.built_version:
+                return
+            builders = dict(self._builders)
+
+        started = time.monotonic()
+        try:
+            caches = {name: build(values, version) for name, build in builders.items()}
+        except Exception: # pylint: disable=broad-except
+            # the previous caches stay in use, the next change triggers a new rebuild
+            logger.exception("Parameter caches rebuild failed for version %s", version)
+            return
+
+        with self._lock:
+            if version > self.built_version:
+                self._caches = caches
+                self.built_version = version
+                self.rebuilds += 1
+
+        logger.info("Parameter caches rebuilt for version %s in %0.2f ms", version, (time.monotonic() - started) * 1000)
+
+    def cache(self, name):
+        '''
+            This function returns the latest built version of a cache.
+        '''
+        return self._caches[name]
+
+    @property
+    def geometry(self) -> GaitGeometry:
+        '''
+            This property returns the latest built gait geometry.
+        '''
+        return self._caches['geometry']
+
+    def is_stale(self):
+        '''
+            This function returns whether the caches are still being rebuilt after a change.
+        '''
+        return self.built_version != self.version
+
+    def close(self):
+        '''
+            This function stops the background thread after the pending rebuild.
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def log_report(self):
+        '''
+            This function logs the parameters and their version.
+        '''
+        logger.info("Parameters     :version %s built %s rebuilds %s changes %s", self.version, self.built_version,
+                    self.rebuilds, len(self.changes))
+        logger.info("Parameters     :%s", ", ".join(f"{name} {value:g}" for name, value in self._values.items()))
@@ -0,0 +1,71 @@
+'''
+    This module is the stand-in of the PiJuice interface, used in STUB mode and without a PiJuice HAT.
+
+    Every call succeeds with the values of a healthy, charged battery, so the power governor does not limit the
+    motion.
+'''
+def result(data):
+    '''
+        This function returns a PiJuice result without error.
+    '''
+    return {'data': data, 'error': 'NO_ERROR'}
+
+class PiJuiceStatusStub():
+    '''
+        This class is the stand-in of the PiJuice status interface.
+    '''
+    def __init__(self):
+        self.led = {}
+
+    def GetStatus(self): # pylint: disable=invalid-name
+        return result({'isFault': False, 'isButton': False, 'battery': 'NORMAL', 'powerInput': 'NOT_PRESENT',
+                       'powerInput5vIo': 'NOT_PRESENT'})
+
+    def GetFaultStatus(self): # pylint: disable=invalid-name
+        return result({})
+
+    def GetChargeLevel(self): # pylint: disable=invalid-name
+        return result(100)
+
+    def GetBatteryTemperature(self): # pylint: disable=invalid-name
+        return result(25)
+
+    def GetBatteryVoltage(self): # pylint: disable=invalid-name
+        return result(4100)
+
+    def GetBatteryCurrent(self): # pylint: disable=invalid-name
+        return result(0)
+
+    def GetIoVoltage(self): # pylint: disable=invalid-name
+        return result(5000)
+
+    def GetIoCurrent(self): # pylint: disable=invalid-name
+        return result(0)
+
+    def SetLedState(self, led, rgb): # pylint: disable=invalid-name
+        self.led[led] = list(rgb)
+        return result(None)
+
+class PiJuiceConfigStub():
+    '''
+        This class is the stand-in of the PiJuice config interface.
+    '''
+    def GetAddress(self, slot): # pylint: disable=invalid-name, unused-argument
+        return result('14')
+
+    def GetIdEepromWriteProtect(self): # pylint: disable=invalid-name
+        return result(False)
+
+    def GetIdEepromAddress(self): # pylint: disable=invalid-name
+        return result('50')
+
+    def GetFirmwareVersion(self): # pylint: disable=invalid-name
+        return result({'version': 'stub', 'variant': 'stub'})
+
+class PiJuiceStub():
+    '''
+        This class is the stand-in of the PiJuice interface.
+    '''
+    def __init__(self):
+        self.status = PiJuiceStatusStub()
+        self.config = PiJuiceConfigStub()
@@ -1,36 +1,45 @@
 '''
     This module contains the Position class.
 '''
+from array import array
+
 class Position():
-    ''' This class contains the x,y,z positions.'''
+    ''' This class contains the x,y,z positions. A position is a view on three values of an array, by default its
+        own array, or the leg state of the body.'''
+    __slots__ = ('_values', '_offset')
+
     @property
     def x(self):
         ''' This is the x position.'''
-        return self._x
+        return self._values[self._offset]
 
     @x.setter
     def x(self, x):
-        self._x = x
+        self._values[self._offset] = x
 
     @property
     def y(self):
         ''' This is the y position.'''
-        return self._y
+        return self._values[self._offset + 1]
 
     @y.setter
     def y(self, y):
-        self._y = y
+        self._values[self._offset + 1] = y
 
     @property
     def z(self):
         ''' This is the z position.'''
-        return self._z
+        return self._values[self._offset + 2]
 
     @z.setter
     def z(self, z):
-        self._z = z
+        self._values[self._offset + 2] = z
 
-    def __init__(self,x, y, z):
-        self._x = x
-        self._y = y
-        self._z = z
+    def __init__(self, x, y, z, values = None, offset = 0):
+        if values is None:
+            values = array('d', bytes(24))
+        self._values = values
+        self._offset = offset
+        values[offset] = x
+        values[offset + 1] = y
+        values[offset + 2] = z
@@ -0,0 +1,154 @@
+'''
+    This module contains the power governor, which limits the motion to the power state of the battery.
+
+    Heavy gaits at a high move speed draw peak currents that can brown out the servo rail, and drain the battery
+    faster. The governor reads the cached telemetry snapshots and selects a power level from the charge and the
+    battery voltage. A level caps the move speed, the acceleration of the legs and the number of legs that move at
+    the same time. The speed cap steps down smoothly and the level only steps up again with a margin, so the robot
+    does not toggle between levels. Every intervention is recorded.
+'''
+import time
+from collections import deque
+
+from constants import POWER_LEVELS, POWER_SPEED_STEP, POWER_HYSTERESIS, POWER_IDLE_TIME, POWER_INTERVENTIONS
+from log_pipeline import get_logger
+
+logger = get_logger('power')
+
+class PowerLevel():
+    '''
+        This class holds the thresholds and motion limits of one power level.
+    '''
+    __slots__ = ('name', 'charge', 'voltage', 'speed', 'acceleration', 'legs')
+
+    def __init__(self, name, charge, voltage, speed, acceleration, legs):
+        self.name = name
+        self.charge = charge
+        self.voltage = voltage
+        self.speed = speed
+        self.acceleration = acceleration
+        self.legs = legs
+
+class PowerGovernor():
+    '''
+        This class selects the power level from the telemetry and applies its motion limits.
+    '''
+    def __init__(self, levels = POWER_LEVELS, speed_step = POWER_SPEED_STEP, hysteresis = POWER_HYSTERESIS):
+        '''
+            This function initializes this class.
+
+            : levels - the power levels as (name, minimum charge, minimum voltage, speed cap, acceleration, legs),
+              from the highest to the lowest level
+            : speed_step - the maximum change of the speed cap per telemetry snapshot
+            : hysteresis - the charge margin in percent above a threshold before the level steps up
+        '''
+        self._levels = [PowerLevel(*level) for level in levels]
+        self._speed_step = speed_step
+        self._hysteresis = hysteresis
+        self._index = 0
+        self.level = self._levels[0]
+        self.speed_cap = self.level.speed
+        self._leg_speeds = [0.0] * 4
+        self._leg_times = [0.0] * 4
+        self._moving_legs = set()
+        self.interventions = deque(maxlen=POWER_INTERVENTIONS)
+        self.speed_limited = 0
+        self.acceleration_limited = 0
+        self.legs_deferred = 0
+
+    def record(self, reason):
+        '''
+            This function records and logs an intervention.
+        '''
+        self.interventions.append((time.time(), self.level.name, reason))
+        logger.info("Power governor: %s", reason)
+
+    def select_level(self, charge, voltage):
+        '''
+            This function returns the index of the level for the charge and voltage. A higher level is only selected
+            when the charge is the hysteresis margin above its threshold.
+        '''
+        for index, level in enumerate(self._levels):
+            margin = self._hysteresis if index < self._index else 0
+            if charge >= level.charge + margin and voltage >= level.voltage:
+                return index
+        return len(self._levels) - 1
+
+    def update(self, snapshot):
+        '''
+            This function updates the power level and the speed cap from a telemetry snapshot. The level steps one
+            level at a time and the speed cap moves at most one speed step towards the cap of the level.
+        '''
+        charge = snapshot.charge
+        voltage = snapshot.battery_voltage
+        if not isinstance(charge, (int, float)) or not isinstance(voltage, (int, float)):
+            return
+
+        index = self.select_level(charge, voltage)
+        if index != self._index:
+            self._index += 1 if index > self._index else -1
+            self.level = self._levels[self._index]
+            self.record(f"level {self.level.name} at charge {charge} %, battery {voltage} mV")
+
+        target = self.level.speed
+        if self.speed_cap != target:
+            previous = self.speed_cap
+            if self.speed_cap > target:
+                self.speed_cap = max(target, self.speed_cap - self._speed_step)
+            else:
+                self.speed_cap = min(target, self.speed_cap + self._speed_step)
+            self.record(f"speed cap {previous:0.1f} -> {self.speed_cap:0.1f}")
+
+    def limit_speed(self, leg_index, speed):
+        '''
+            This function returns the move speed of a leg within the speed cap and the acceleration of the level.
+            The acceleration limits the speed increase between two moves of a leg, a leg that was idle starts from
+            standstill.
+        '''
+        now = time.monotonic()
+        if now - self._leg_times[leg_index] > POWER_IDLE_TIME:
+            self._leg_speeds[leg_index] = 0.0
+        self._leg_times[leg_index] = now
+
+        allowed = speed
+        if allowed > self.speed_cap:
+            allowed = self.speed_cap
+            self.speed_limited += 1
+
+        acceleration = self.level.acceleration
+        if acceleration is not None and allowed > self._leg_speeds[leg_index] + acceleration:
+            allowed = self._leg_speeds[leg_index] + acceleration
+            self.acceleration_limited += 1
+
+        self._leg_speeds[leg_index] = allowed
+        return allowed
+
+    def may_move(self, leg_index):
+        '''
+            This function checks whether a leg may start or continue moving, within the moving legs of the level.
+            It is called from the servo ticker thread.
+        '''
+        moving_legs = self._moving_legs
+        if leg_index in moving_legs:
+            return True
+
+        if len(moving_legs) >= self.level.legs:
+            self.legs_deferred += 1
+            return False
+
+        moving_legs.add(leg_index)
+        return True
+
+    def leg_reached(self, leg_index):
+        '''
+            This function frees the moving slot of a leg that reached its target.
+        '''
+        self._moving_legs.discard(leg_index)
+
+    def log_report(self):
+        '''
+            This function logs the state of the governor.
+        '''
+        logger.info("Power governor :level %s speed cap %0.1f speed limited %s acceleration limited %s "
+                    "legs deferred %s interventions %s", self.level.name, self.speed_cap, self.speed_limited,
+                    self.acceleration_limited, self.legs_deferred, len(self.interventions))
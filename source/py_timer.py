@@ -2,9 +2,11 @@
     This module contains a simple timer class.
 '''
 import time
-import logging
 
 from exceptions import TimerError
+from log_pipeline import get_logger
+
+logger = get_logger('control')
 
 class PyTimer():
     '''
@@ -32,12 +34,12 @@ class PyTimer():
 
         elapsed_time = time.time() - self._start_time
         self._start_time = None
-        logging.debug(f"{self._tag} Elapsed time: {elapsed_time:0.4f} seconds")
+        logger.debug("%s Elapsed time: %0.4f seconds", self._tag, elapsed_time)
 
     def update(self):
         """Update the count down timer"""
         elapsed_time = time.time() - self._start_time
-        #logging.info(f"{self._tag} Elapsed time: {elapsed_time:0.4f} seconds")
+        #logger.info("%s Elapsed time: %0.4f seconds", self._tag, elapsed_time)
 
         if(elapsed_time > self._count_down_time):
             self._start_time = time.time()
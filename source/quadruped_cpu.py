@@ -1,18 +1,33 @@
 '''
     This module contains the central processing class for the quadruped.
 '''
-import logging, time
+import time
+import asyncio
 import math
 import os
-from constants import x_range, z_range, z_ground, BODY_MOVE_SPEED, MOVE_SPEED, LEG_INDEX, x_offset
-from constants import TURN_SPEED, z_up, LEG_MOVE_SPEED, y_start, y_step
-from calculations import cartesian_to_polar, turn_x1, turn_y1, turn_x0, turn_y0
+from concurrent.futures import ThreadPoolExecutor
+from constants import LEG_INDEX
+from constants import CALIBRATION_STEP, CALIBRATION_LIMIT_STEP, PARAMETER_STEP, ANALOG_SPEED_MIN
+from calculations import cartesian_to_polar
 from leg import Leg
+from leg_state import LEG_STATE_SIZE
 from body import Body
-from action_controller import Action, ActionController
-from game_controller import ControllerEvent
-from exceptions import ProgramKilled, PiJuiceInitializeException
-from pijuice import PiJuice 
+from action import Action, ActionClass
+from action_controller import ActionController
+from feedback import FeedbackService
+from telemetry import TelemetryPoller
+from power_governor import PowerGovernor
+from parameters import ParameterStore
+from trace_recorder import TraceRecorder
+from span_tracer import spans
+from telemetry_stream import TelemetryStreamer, FLAG_CALIBRATE
+from metrics import Rate
+from controller_event import ControllerEvent
+from exceptions import ProgramKilled, PiJuiceInitializeException, ParameterException
+from backends import backends
+from log_pipeline import get_logger
+
+logger = get_logger('motion')
 
 class QuadrupedCpu():
     '''
@@ -28,20 +43,38 @@ class QuadrupedCpu():
         self._body = None
         self._action_controller = None
         self._reached = False
-        self._move_speed = MOVE_SPEED
-        self._custom_move_speed = MOVE_SPEED
+        self._speed_offset = 0.0
+        self._turning = False
+        self._stick_states = []
         self._current_leg = 0
         self._is_sleeping = False
         self._game_controller = None
         self._mode_1 = False
         self._mode_2 = False 
         self._calibrate_mode = False     
+        self._calibration_joint = 0
+        self._loop = None
+        self._legs_reached = None
+        self._control_process = None
+        self._recorder = None
+        self._streamer = None
+        self._bus_rates = (Rate(), Rate())
+        self._batch_started = 0
+        self._phase = 0
+        self._phase_action = None
+        # PiJuice I2C calls are blocking, run them off the event loop in one dedicated thread
+        self._power_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pijuice')
+        self._feedback = FeedbackService(self._power_executor, self.write_status_led)
 
         try:
-            self._pijuice = PiJuice(1, 0x14) # Instantiate PiJuice interface object          
+            self._pijuice = backends.load('power') # Instantiate PiJuice interface object
         except:
             raise PiJuiceInitializeException("PiJuice initialization failed!")
 
+        self._governor = PowerGovernor()
+        self._parameters = ParameterStore()
+        self._telemetry = TelemetryPoller(self._pijuice, self._power_executor, on_snapshot=self._governor.update)
+
     def set_mode_1(self):
         '''
             This function sets the mode to set secondary action active
@@ -50,7 +83,7 @@ class QuadrupedCpu():
 
         self._action_controller.end_action() 
 
-        logging.debug(f"mode 1: {self._mode_1}")
+        logger.debug("mode 1: %s", self._mode_1)
 
     def set_mode_2(self):
         '''
@@ -60,90 +93,140 @@ class QuadrupedCpu():
 
         self._action_controller.end_action()   
 
-        logging.debug(f"mode 2: {self._mode_2}")
+        logger.debug("mode 2: %s", self._mode_2)
 
     def set_status_led(self, red, green, blue):
         '''
-            This function set the led status of the PiJuice
+            This function set the led status of the PiJuice. The led is written by the feedback service, so this
+            function does not block.
             rgb_color - example [r,g,b] -> green = [0,200,100]
         '''
-        self._pijuice.status.SetLedState('D2', [red, green, blue])
+        self._feedback.set_led(red, green, blue)
+
+    def write_status_led(self, rgb_color):
+        '''
+            This function writes the led status to the PiJuice. It runs on the PiJuice worker thread.
+        '''
+        with spans.span('led', 'pijuice'):
+            self._pijuice.status.SetLedState('D2', rgb_color)
     
     def set_error_state(self):
         '''
             This function sets the error state
         '''
-        self._pijuice.status.SetLedState('D2', [200, 0, 0])
-
-    def check_value(self, value):
-        '''
-            This function checks the returned value of pijuice communication.
-        '''  
-        value = value['data'] if value['error'] == 'NO_ERROR' else value['error']
-        return value
+        self._feedback.set_led(200, 0, 0)
 
     def get_system_report(self):   
         '''
-            This function returns a full system report.
+            This function returns a full system report. The PiJuice values are served from the telemetry cache.
         '''   
-        status = self.check_value(self._pijuice.status.GetStatus())
-        fault =  self.check_value(self._pijuice.status.GetFaultStatus())
-        charge = self.check_value(self._pijuice.status.GetChargeLevel())
-        temp = self.check_value(self._pijuice.status.GetBatteryTemperature())
-        vbat = self.check_value(self._pijuice.status.GetBatteryVoltage())
-        ibat = self.check_value(self._pijuice.status.GetBatteryCurrent())
-        vio =  self.check_value(self._pijuice.status.GetIoVoltage())
-        iio = self.check_value(self._pijuice.status.GetIoCurrent())
-        pjaddr = self.check_value(self._pijuice.config.GetAddress(1))
-        eepromwrprot = self.check_value(self._pijuice.config.GetIdEepromWriteProtect())
-        eepromaddr = self.check_value(self._pijuice.config.GetIdEepromAddress())
-        fwver = self.check_value(self._pijuice.config.GetFirmwareVersion())
-
-        logging.info("---------- Pi-Juice Report --------------------")
-        logging.info(f"Status: {status}")
-        logging.info(f"Fault State: {fault}")
-        logging.info(f'PiJuice I2C address = {pjaddr} (hex)')
-        logging.info(f'HAT eeprom write protect = {eepromwrprot}')
-        logging.info(f'HAT eeprom address = {eepromaddr} (hex)')
-        logging.info(f'Firmware Version = {fwver}')
-        logging.info(f'Charge ={charge} %, T = {temp} Celsius')
-        logging.info(f'Vbat = {vbat} mV, Ibat = {ibat} mA, Vio = {vio} mV, Iio ={iio} mA')
-        logging.info("---------- Pi-Juice Report --------------------")         
-        logging.info("---------- States Report --------------------")      
-        logging.info(f"Mode 1         :{self._mode_1}      Mode 2      :{self._mode_2}")             
-        logging.info(f"Calibrate mode :{self._calibrate_mode}")         
-        logging.info(f"Sleeping mode  :{self._is_sleeping}      Body Online :{self._body._online}")                    
-        logging.info("---------- States Report --------------------")             
+        self._telemetry.log_report()
+        logger.info("---------- States Report --------------------")      
+        logger.info("Mode 1         :%s      Mode 2      :%s", self._mode_1, self._mode_2)             
+        logger.info("Calibrate mode :%s", self._calibrate_mode)         
+        logger.info("Sleeping mode  :%s      Body Online :%s", self._is_sleeping, self._body._online)                    
+        if self._control_process is not None:
+            telemetry = self._control_process.get_telemetry()
+            logger.info("Control loop   :ticks %s tick %0.2f ms max %0.2f ms overruns %s", telemetry['ticks'],
+                        telemetry['tick_time'] * 1000, telemetry['max_tick_time'] * 1000, telemetry['overruns'])
+        logger.info("Feedback       :led writes %s coalesced %s rumbles %s dropped %s", self._feedback.led_writes,
+                    self._feedback.led_coalesced, self._feedback.rumbles, self._feedback.rumbles_dropped)
+        self._governor.log_report()
+        self._parameters.log_report()
+        self._action_controller.tracer.report()
+        logger.info("---------- States Report --------------------")
+
+        if spans.enabled:
+            spans.export(wait=False)             
+
+    def collect_metrics(self, writer):
+        '''
+            This function writes the bus, action, queue and power metrics. It is called from the metrics thread and
+            only reads counters.
+        '''
+        if self._control_process is not None:
+            telemetry = self._control_process.get_telemetry()
+            transactions, errors = telemetry['bus_transactions'], telemetry['bus_errors']
+            writer.add('control_ticks_total', 'counter', "Servo ticks of the control process.", telemetry['ticks'])
+            writer.add('control_overruns_total', 'counter', "Servo ticks of the control process that missed their "
+                       "deadline.", telemetry['overruns'])
+            writer.add('control_tick_max_seconds', 'gauge', "Duration of the longest servo tick of the control "
+                       "process.", telemetry['max_tick_time'])
+        elif self._body is not None:
+            transactions, errors = self._body.get_bus_statistics()
+        else:
+            transactions, errors = 0, 0
+
+        transaction_rate, error_rate = self._bus_rates
+        writer.add('i2c_transactions_total', 'counter', "I2C transactions of the servo controller.", transactions)
+        writer.add('i2c_errors_total', 'counter', "Failed I2C transactions of the servo controller.", errors)
+        writer.add('i2c_transactions_per_second', 'gauge', "I2C transactions per second since the previous scrape.",
+                   transaction_rate.update(transactions))
+        writer.add('i2c_errors_per_second', 'gauge', "Failed I2C transactions per second since the previous scrape.",
+                   error_rate.update(errors))
+        writer.add('servo_writes_suppressed_total', 'counter', "Leg updates deferred by the power governor.",
+                   self._governor.legs_deferred)
+
+        action_controller = self._action_controller
+        if action_controller is not None:
+            for result in ('started', 'merged', 'replaced', 'preempted'):
+                writer.add('actions_total', 'counter', "Motion and posture actions by scheduling result.",
+                           getattr(action_controller, result), {'result': result})
+            runs = dict(action_controller.action_runs)
+            seconds = dict(action_controller.action_seconds)
+            for name, count in runs.items():
+                writer.add('action_duration_seconds', 'summary', "Duration of the finished actions.",
+                           seconds.get(name, 0.0), {'action': name}, '_sum')
+                writer.add('action_duration_seconds', 'summary', "Duration of the finished actions.",
+                           count, {'action': name}, '_count')
+            writer.add('queue_depth', 'gauge', "Pending items per queue.", action_controller.pending_count(),
+                       {'queue': 'actions'})
+
+        if self._game_controller is not None:
+            writer.add('queue_depth', 'gauge', "Pending items per queue.",
+                       self._game_controller.get_statistics()['depth'], {'queue': 'controller'})
+
+        snapshot = self._telemetry.latest
+        if snapshot is not None:
+            voltage, current = snapshot.battery_voltage, snapshot.battery_current
+            writer.add('battery_voltage_volts', 'gauge', "Battery voltage of the PiJuice.",
+                       voltage / 1000 if isinstance(voltage, int) else None)
+            writer.add('battery_current_amperes', 'gauge', "Battery current of the PiJuice.",
+                       current / 1000 if isinstance(current, int) else None)
+            writer.add('battery_charge_percent', 'gauge', "Battery charge level of the PiJuice.",
+                       snapshot.charge if isinstance(snapshot.charge, int) else None)
 
     def register_movements(self): # todo add status report
         '''
             This function registers all wanted action to a function in relations to
-            controller events
+            controller events. Gaits are motion actions, stances are posture actions which start before a pending
+            gait, all other actions are system actions which also run while the legs are moving. Sit and stand
+            preempt a running gait, so the robot can always be brought to rest in the middle of a step.
         '''
         self._action_controller.register(Action.MODE_1,
                                          self.set_mode_1, ControllerEvent.L2_PRESSED) 
         self._action_controller.register(Action.MODE_2,
                                          self.set_mode_2, ControllerEvent.R2_PRESSED)                                                 
         self._action_controller.register(Action.SIT,
-                                         self.sit, ControllerEvent.CROSS_PRESSED)
+                                         self.sit, ControllerEvent.CROSS_PRESSED, ActionClass.POSTURE, 2, True)
         self._action_controller.register(Action.SPEED_UP,
                                          self.speed_up, ControllerEvent.CIRCLE_PRESSED)
         self._action_controller.register(Action.SPEED_DOWN,
                                          self.speed_down, ControllerEvent.SQUARE_PRESSED)
         self._action_controller.register(Action.STAND,
-                                         self.stand, ControllerEvent.TRIANGLE_PRESSED)
+                                         self.stand, ControllerEvent.TRIANGLE_PRESSED, ActionClass.POSTURE, 2, True)
         self._action_controller.register(Action.FORWARD,
-                                         self.step_forward, ControllerEvent.UP_PRESSED)
+                                         self.step_forward, ControllerEvent.UP_PRESSED, ActionClass.MOTION, 1)
         self._action_controller.register(Action.BACKWARD,
-                                         self.step_backward, ControllerEvent.DOWN_PRESSED)
+                                         self.step_backward, ControllerEvent.DOWN_PRESSED, ActionClass.MOTION, 1)
         self._action_controller.register(Action.TURN_RIGHT,
-                                         self.turn_right, ControllerEvent.RIGHT_PRESSED)
+                                         self.turn_right, ControllerEvent.RIGHT_PRESSED, ActionClass.MOTION, 1)
         self._action_controller.register(Action.TURN_LEFT,
-                                         self.turn_left, ControllerEvent.LEFT_PRESSED)
+                                         self.turn_left, ControllerEvent.LEFT_PRESSED, ActionClass.MOTION, 1)
         self._action_controller.register(Action.SHUTDOWN,
                                          self.shutdown, ControllerEvent.MENU_PRESSED)                                        
         self._action_controller.register(Action.CALIBRATE,
-                                         self.calibrate, ControllerEvent.PS_SHARE)   
+                                         self.calibrate, ControllerEvent.PS_SHARE, ActionClass.POSTURE, 2)   
         self._action_controller.register(Action.REPORT,
                                          self.print_system_report, ControllerEvent.PS_HOME)
         self._action_controller.register(Action.RELEASED,
@@ -175,22 +258,101 @@ class QuadrupedCpu():
         '''
             This function executes the action to speed up the movement.
         '''
-        if self._custom_move_speed <= MOVE_SPEED*3:
-            self._custom_move_speed += 0.1
+        if self._mode_1 or self._mode_2:
+            self.tune_parameter(1)
+            return
+
+        move_speed = self._parameters.get('move_speed')
+        if move_speed + self._speed_offset <= move_speed*3:
+            self._speed_offset += 0.1
         self._action_controller.end_action()
-        logging.debug(f"Speed {self._custom_move_speed}")
+        logger.debug("Speed %s", self.move_speed())
 
     def speed_down(self):
         '''
             This function executes the action to slow down the movement.
         '''
-        if self._custom_move_speed > 0.1:
-            self._custom_move_speed -= 0.1
+        if self._mode_1 or self._mode_2:
+            self.tune_parameter(-1)
+            return
+
+        move_speed = self._parameters.get('move_speed')
+        if move_speed + self._speed_offset > 0.1:
+            self._speed_offset -= 0.1
         else:
-            self._custom_move_speed = 0.1
+            self._speed_offset = 0.1 - move_speed
+
+        self._action_controller.end_action()
+        logger.debug("Speed %s", self.move_speed())
+
+    def register_stick_state(self, function):
+        '''
+            This function registers the function that returns the latest stick state of an input source, like the
+            game controller or the remote control. The deflection of the sticks scales the speed of the legs.
+        '''
+        self._stick_states.append(function)
+
+    def stick_deflection(self):
+        '''
+            This function returns the largest stick deflection of the input sources, of the forward axis while
+            walking and of the sideways axes while turning, or 0 when the sticks are centered.
+        '''
+        deflection = 0.0
+        for get_stick_state in self._stick_states:
+            state = get_stick_state()
+            if self._turning:
+                deflection = max(deflection, abs(state.left_x), abs(state.right_x))
+            else:
+                deflection = max(deflection, abs(state.left_y))
+        return deflection
+
+    def move_speed(self):
+        '''
+            This function returns the speed of the legs: the move speed parameter, or the turn speed parameter
+            while turning, changed by speed up and down. While a stick is deflected the speed scales with the
+            deflection, with centered sticks the directions move at the full speed.
+        '''
+        geometry = self._parameters.geometry
+        speed = (geometry.turn_speed if self._turning else geometry.move_speed) + self._speed_offset
+
+        deflection = self.stick_deflection()
+        if deflection > 0:
+            speed *= ANALOG_SPEED_MIN + (1 - ANALOG_SPEED_MIN) * deflection
+
+        return max(speed, 0.1)
+
+    def tune_parameter(self, direction):
+        '''
+            This function tunes the gait geometry: with mode 1 held speed up and down change the stance width,
+            with mode 2 held the step length.
+        '''
+        if not self._action_controller.is_repeating():
+            try:
+                self._parameters.adjust('x_range' if self._mode_1 else 'y_step', direction * PARAMETER_STEP)
+            except ParameterException as exception:
+                logger.info("Parameter not changed: %s", exception)
 
         self._action_controller.end_action()
-        logging.debug(f"Speed {self._custom_move_speed}")
+
+    def set_parameter(self, name, value):
+        '''
+            This function changes a runtime parameter, for example from the remote control. Returns the new version.
+        '''
+        return self._parameters.set(name, value)
+
+    def start_trace(self, path):
+        '''
+            This function records every servo tick of the servo loop in this process to the trace file.
+        '''
+        self._recorder = TraceRecorder(path).open()
+
+    def create_streamer(self, host, port):
+        '''
+            This function creates the live telemetry streamer, which is sampled by the servo service. The runtime
+            starts it with the servo ticker.
+        '''
+        self._streamer = TelemetryStreamer(self._telemetry, host, port)
+        return self._streamer
 
     def calibrate(self):
         if not self._action_controller.is_repeating():
@@ -199,16 +361,43 @@ class QuadrupedCpu():
                     self._calibrate_mode = True
                 else:
                     self._calibrate_mode = False
+                    self._body.calibration.save()
             else:
                 self._body.default_stance()
 
             self._action_controller.end_action()
-            logging.debug(f"Calibrate mode {self._calibrate_mode}")
+            logger.debug("Calibrate mode %s", self._calibrate_mode)
+
+    def calibrate_joint(self, select, direction):
+        '''
+            This function adjusts the calibration in calibrate mode. Left and right select the joint, up and down
+            change the error of the selected joint, with mode 1 held its high pulse limit and with mode 2 held its
+            low pulse limit. The calibration is saved when calibrate mode is left.
+        '''
+        if not self._action_controller.is_repeating():
+            joint = self._calibration_joint
+            if select:
+                self._calibration_joint = (joint + select) % LEG_STATE_SIZE
+                logger.info("Calibrate joint %s servo %s", self._calibration_joint, self._body.joint_channel(self._calibration_joint))
+            elif self._mode_1:
+                low_limit, high_limit = self._body.adjust_limits(joint, 0, direction * CALIBRATION_LIMIT_STEP)
+                logger.info("Calibrate joint %s limits %0.2f - %0.2f ms", joint, low_limit, high_limit)
+            elif self._mode_2:
+                low_limit, high_limit = self._body.adjust_limits(joint, direction * CALIBRATION_LIMIT_STEP, 0)
+                logger.info("Calibrate joint %s limits %0.2f - %0.2f ms", joint, low_limit, high_limit)
+            else:
+                error = self._body.adjust_error(joint, direction * CALIBRATION_STEP)
+                logger.info("Calibrate joint %s error %0.1f degrees", joint, error)
+
+        self._action_controller.end_action()
 
     def set_legs(self, leg_index, x, y, z):
         '''
            This function sets the target position of one leg endpoint x,y,x!
         '''
+        self._action_controller.tracer.mark_set_legs()
+        if not self._batch_started:
+            self._batch_started = spans.begin()
 
         leg = self._body.get_leg(leg_index)
 
@@ -227,9 +416,11 @@ class QuadrupedCpu():
         length = math.sqrt(pow(length_x, 2) + pow(length_y, 2) + pow(length_z, 2))
 
         if length != 0: # ignore if already in position
-            leg.movement.x_speed = length_x / length * self._custom_move_speed
-            leg.movement.y_speed = length_y / length * self._custom_move_speed
-            leg.movement.z_speed = length_z / length * self._custom_move_speed
+            # the power governor caps the speed and acceleration to the power state of the battery
+            speed = self._governor.limit_speed(leg_index, self.move_speed())
+            leg.movement.x_speed = length_x / length * speed
+            leg.movement.y_speed = length_y / length * speed
+            leg.movement.z_speed = length_z / length * speed
 
         if x != QuadrupedCpu.STAY:
             leg.target_position.x = x
@@ -246,198 +437,254 @@ class QuadrupedCpu():
         else:
             leg.target_position.z = leg.current_position.z
 
-    def wait_reach(self, leg_index):
+    async def wait_reach(self, leg_index):
         '''
-            This function wait for a leg to reach its final position.
+            This function waits for a leg to reach its final position. The servo service signals every leg that
+            reaches its target, so no polling is needed.
         '''
         leg = self._body.get_leg(leg_index)
-        while True:
-            if (leg.current_position.x == leg.target_position.x) and (leg.current_position.y == leg.target_position.y) and (leg.current_position.z == leg.target_position.z):
-                #if(leg.index == LEG_INDEX): logging.info("Leg {} reached position!".format(leg.index))
-                #logging.debug("Leg {} reached position!".format(leg.index))
-                self._reached = True
-                break
+        while not leg.is_reached():
+            self._legs_reached.clear()
+            await self._legs_reached.wait()
 
-    def wait_all_reach(self):
+        #if(leg.index == LEG_INDEX): logger.info("Leg {} reached position!".format(leg.index))
+        self._reached = True
+
+    async def wait_all_reach(self):
         '''
-            This function checks all leg to reach their end position.
+            This function checks all leg to reach their end position. The set_legs calls before and the wait
+            are traced as one gait phase.
         '''
+        batch_started = self._batch_started
+        self._batch_started = 0
+        spans.end('set_legs', 'gait', batch_started)
+
+        waited = spans.begin()
         for leg in range(0, 4):
-            self.wait_reach(leg)
+            await self.wait_reach(leg)
+
+        if waited:
+            self.end_phase(batch_started or waited, waited)
 
         self._action_controller.update()
 
-    def turn_right(self):
+    def end_phase(self, started, waited):
         '''
-            This function executes the action to turn right sequence.
+            This function records the span of the wait and of the gait phase. The phases are numbered per action.
+        '''
+        if self._phase_action != self._action_controller.started:
+            self._phase_action = self._action_controller.started
+            self._phase = 0
+
+        spans.end('wait_all_reach', 'gait', waited)
+        spans.end(f"phase {self._phase}", 'gait', started)
+        self._phase += 1
+
+    async def turn_right(self):
         '''
+            This function executes the action to turn right at the turn speed.
+        '''
+        await self.turn(self.turn_right_sequence)
+
+    async def turn_left(self):
+        '''
+            This function executes the action to turn left at the turn speed.
+        '''
+        await self.turn(self.turn_left_sequence)
+
+    async def turn(self, sequence):
+        '''
+            This function runs a turn sequence with the legs moving at the turn speed.
+        '''
+        self._turning = True
+        try:
+            await sequence()
+        finally:
+            self._turning = False
+
+    async def turn_right_sequence(self):
+        '''
+            This function executes the turn right sequence.
+        '''
+        if self._calibrate_mode:
+            self.calibrate_joint(1, 0)
+            return
+
+        geometry = self._parameters.geometry
         n_step = 1 # not necessary
         while n_step > 0:
             n_step -= 1
-            if self._body.left_front_leg.target_position.y == y_start:
+            if self._body.left_front_leg.target_position.y == geometry.y_start:
                 # leg 2 & 0 move
-                self.set_legs(2, x_range, y_start, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_range)
-                self.set_legs(1, turn_x1, turn_y1, z_range)
-                self.set_legs(2, turn_x0, turn_y0, z_up)
-                self.set_legs(3, turn_x1, turn_y1, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(2, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_range)
-                self.set_legs(1, turn_x1, turn_y1, z_range)
-                self.set_legs(2, turn_x0, turn_y0, z_range)
-                self.set_legs(3, turn_x1, turn_y1, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, x_range, y_start, z_up)
-                self.set_legs(1, x_range, y_start, z_range)
-                self.set_legs(2, x_range, y_start + y_step, z_range)
-                self.set_legs(3, x_range, y_start + y_step, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, x_range, y_start, z_range)
-                self.wait_all_reach()
+                self.set_legs(2, geometry.x_range, geometry.y_start, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(1, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                self.set_legs(3, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(1, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(3, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.x_range, geometry.y_start, geometry.z_up)
+                self.set_legs(1, geometry.x_range, geometry.y_start, geometry.z_range)
+                self.set_legs(2, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(3, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.x_range, geometry.y_start, geometry.z_range)
+                await self.wait_all_reach()
             else:
                 # leg 1 & 3 move
-                self.set_legs(1, x_range, y_start, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x1, turn_y1, z_range)
-                self.set_legs(1, turn_x0, turn_y0, z_up)
-                self.set_legs(2, turn_x1, turn_y1, z_range)
-                self.set_legs(3, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(1, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x1, turn_y1, z_range)
-                self.set_legs(1, turn_x0, turn_y0, z_range)
-                self.set_legs(2, turn_x1, turn_y1, z_range)
-                self.set_legs(3, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(3, turn_x0, turn_y0, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, x_range, y_start + y_step, z_range)
-                self.set_legs(1, x_range, y_start + y_step, z_range)
-                self.set_legs(2, x_range, y_start, z_range)
-                self.set_legs(3, x_range, y_start, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(3, x_range, y_start, z_range)
-                self.wait_all_reach()
+                self.set_legs(1, geometry.x_range, geometry.y_start, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                self.set_legs(2, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(2, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(1, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(2, geometry.x_range, geometry.y_start, geometry.z_range)
+                self.set_legs(3, geometry.x_range, geometry.y_start, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(3, geometry.x_range, geometry.y_start, geometry.z_range)
+                await self.wait_all_reach()
         self._action_controller.end_action(True)
 
-    def turn_left(self):
+    async def turn_left_sequence(self):
         '''
-            This function executes the action to turn left sequence.
+            This function executes the turn left sequence.
         '''
+        if self._calibrate_mode:
+            self.calibrate_joint(-1, 0)
+            return
+
+        geometry = self._parameters.geometry
         n_step = 1 # not necessary
         while n_step > 0:
             n_step -= 1
-            if self._body.left_back_leg.target_position.y == y_start:
+            if self._body.left_back_leg.target_position.y == geometry.y_start:
                 # leg 3&1 move
-                self.set_legs(3, x_range, y_start, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x1, turn_y1, z_range)
-                self.set_legs(1, turn_x0, turn_y0, z_range)
-                self.set_legs(2, turn_x1, turn_y1, z_range)
-                self.set_legs(3, turn_x0, turn_y0, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(3, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x1, turn_y1, z_range)
-                self.set_legs(1, turn_x0, turn_y0, z_range)
-                self.set_legs(2, turn_x1, turn_y1, z_range)
-                self.set_legs(3, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(1, turn_x0, turn_y0, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, x_range, y_start, z_range)
-                self.set_legs(1, x_range, y_start, z_up)
-                self.set_legs(2, x_range, y_start + y_step, z_range)
-                self.set_legs(3, x_range, y_start + y_step, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(1, x_range, y_start, z_range)
-                self.wait_all_reach()
+                self.set_legs(3, geometry.x_range, geometry.y_start, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(2, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(2, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(3, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(1, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.x_range, geometry.y_start, geometry.z_range)
+                self.set_legs(1, geometry.x_range, geometry.y_start, geometry.z_up)
+                self.set_legs(2, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(3, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(1, geometry.x_range, geometry.y_start, geometry.z_range)
+                await self.wait_all_reach()
             else:
                 # // leg 0 & 2 move
-                self.set_legs(0, x_range, y_start, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_up)
-                self.set_legs(1, turn_x1, turn_y1, z_range)
-                self.set_legs(2, turn_x0, turn_y0, z_range)
-                self.set_legs(3, turn_x1, turn_y1, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(0, turn_x0, turn_y0, z_range)
-                self.set_legs(1, turn_x1, turn_y1, z_range)
-                self.set_legs(2, turn_x0, turn_y0, z_range)
-                self.set_legs(3, turn_x1, turn_y1, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(2, turn_x0, turn_y0, z_up)
-                self.wait_all_reach()
-
-                self.set_legs(0, x_range, y_start + y_step, z_range)
-                self.set_legs(1, x_range, y_start + y_step, z_range)
-                self.set_legs(2, x_range, y_start, z_up)
-                self.set_legs(3, x_range, y_start, z_range)
-                self.wait_all_reach()
-
-                self.set_legs(2, x_range, y_start, z_range)
-                self.wait_all_reach()
+                self.set_legs(0, geometry.x_range, geometry.y_start, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                self.set_legs(1, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(3, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(1, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_range)
+                self.set_legs(3, geometry.turn_x1, geometry.turn_y1, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(2, geometry.turn_x0, geometry.turn_y0, geometry.z_up)
+                await self.wait_all_reach()
+
+                self.set_legs(0, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(1, geometry.x_range, geometry.y_start + geometry.y_step, geometry.z_range)
+                self.set_legs(2, geometry.x_range, geometry.y_start, geometry.z_up)
+                self.set_legs(3, geometry.x_range, geometry.y_start, geometry.z_range)
+                await self.wait_all_reach()
+
+                self.set_legs(2, geometry.x_range, geometry.y_start, geometry.z_range)
+                await self.wait_all_reach()
         self._action_controller.end_action(True)
 
-    def sit(self):
+    async def sit(self):
         '''
             This function executes the action for the sit sequence.
         '''
+        geometry = self._parameters.geometry
         if not self._mode_1:
             for leg in range(0, 4):
-                self.set_legs(leg, QuadrupedCpu.STAY, QuadrupedCpu.STAY, z_ground)
-            self.wait_all_reach()
+                self.set_legs(leg, QuadrupedCpu.STAY, QuadrupedCpu.STAY, geometry.z_ground)
+            await self.wait_all_reach()
         else:
-            self.head_down()
+            await self.head_down()
             self._mode_1 = False
 
         self._action_controller.end_action()    
 
-    def stand(self):
+    async def stand(self):
         '''
             This function executes the action for the stand sequence.
         '''
+        geometry = self._parameters.geometry
         if not self._mode_1:        
             for leg in range(0, 4):
-                self.set_legs(leg, QuadrupedCpu.STAY, QuadrupedCpu.STAY, z_range)
-            self.wait_all_reach()
+                self.set_legs(leg, QuadrupedCpu.STAY, QuadrupedCpu.STAY, geometry.z_range)
+            await self.wait_all_reach()
         else:
-            self.head_up()
+            await self.head_up()
             self._mode_1 = False
 
         self._action_controller.end_action()
 
-    def head_up(self):
+    async def head_up(self):
         '''
             This function executes the action for the head up sequence.
         '''
@@ -445,10 +692,10 @@ class QuadrupedCpu():
         self.set_legs(1, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(1).target_position.z + 10)
         self.set_legs(2, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(2).target_position.z - 10)
         self.set_legs(3, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(3).target_position.z + 10)
-        self.wait_all_reach()
+        await self.wait_all_reach()
         #self._action_controller.end_action()
 
-    def head_down(self):
+    async def head_down(self):
         '''
             This function executes the action for the head down sequence.
         '''
@@ -456,137 +703,155 @@ class QuadrupedCpu():
         self.set_legs(1, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(1).target_position.z - 10)
         self.set_legs(2, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(2).target_position.z + 10)
         self.set_legs(3, QuadrupedCpu.STAY, QuadrupedCpu.STAY, self._body.get_leg(3).target_position.z - 10)
-        self.wait_all_reach()
+        await self.wait_all_reach()
         #self._action_controller.end_action()
 
-    def step_forward(self):
+    async def step_forward(self):
         '''
             This function executes the action for the forward sequence.
         '''
+        if self._calibrate_mode:
+            self.calibrate_joint(0, 1)
+            return
+
+        geometry = self._parameters.geometry
        # self._fstep = 5
-        self._move_speed = LEG_MOVE_SPEED
         #while self._fstep > 0:
             #self._fstep -= 1
-        if self._body.left_front_leg.target_position.y == y_start:
+        if self._body.left_front_leg.target_position.y == geometry.y_start:
             # // leg 2 & 1 move
-            self.set_legs(2, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(2, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(2, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = BODY_MOVE_SPEED
-            self.set_legs(0, x_range + x_offset, y_start, z_range)
-            self.set_legs(1, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.set_legs(2, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(3, x_range - x_offset, y_start + y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = LEG_MOVE_SPEED
-            self.set_legs(1, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(1, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(1, x_range + x_offset, y_start, z_range)
-            self.wait_all_reach()
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            self.set_legs(2, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(3, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            await self.wait_all_reach()
         else:
             # // leg 0 & 3 move
-            self.set_legs(0, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(0, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(0, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = BODY_MOVE_SPEED
-            self.set_legs(0, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(1, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(2, x_range + x_offset, y_start, z_range)
-            self.set_legs(3, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = LEG_MOVE_SPEED
-
-            self.set_legs(3, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(3, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(3, x_range + x_offset, y_start, z_range)
-            self.wait_all_reach()
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(0, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(1, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            await self.wait_all_reach()
         
         self._action_controller.end_action(True)
 
-    def step_backward(self):
+    async def step_backward(self):
         '''
             This function executes the action for the backward sequence.
         '''
+        if self._calibrate_mode:
+            self.calibrate_joint(0, -1)
+            return
+
+        geometry = self._parameters.geometry
         #step = 5
-        self._move_speed = LEG_MOVE_SPEED
         #while step > 0:
         #    step -= 1
-        if self._body.left_back_leg.target_position.y == y_start:
+        if self._body.left_back_leg.target_position.y == geometry.y_start:
             # // leg 3 & 0 move
-            self.set_legs(3, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(3, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(3, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = BODY_MOVE_SPEED
-            self.set_legs(0, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.set_legs(1, x_range + x_offset, y_start, z_range)
-            self.set_legs(2, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(3, x_range - x_offset, y_start + y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = LEG_MOVE_SPEED
-            self.set_legs(0, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(0, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(0, x_range + x_offset, y_start, z_range)
-            self.wait_all_reach()
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            self.set_legs(2, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(3, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(0, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            await self.wait_all_reach()
         else:
             # // leg 1 & 2 move
-            self.set_legs(1, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(1, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(1, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = BODY_MOVE_SPEED
-            self.set_legs(0, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(1, x_range - x_offset, y_start + y_step, z_range)
-            self.set_legs(2, x_range + x_offset, y_start + 2 * y_step, z_range)
-            self.set_legs(3, x_range + x_offset, y_start, z_range)
-            self.wait_all_reach()
-
-            self._move_speed = LEG_MOVE_SPEED
-
-            self.set_legs(2, x_range + x_offset, y_start + 2 * y_step, z_up)
-            self.wait_all_reach()
-            self.set_legs(2, x_range + x_offset, y_start, z_up)
-            self.wait_all_reach()
-            self.set_legs(2, x_range + x_offset, y_start, z_range)
-            self.wait_all_reach()
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(1, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            await self.wait_all_reach()
+
+            self.set_legs(0, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(1, geometry.x_range - geometry.x_offset, geometry.y_start + geometry.y_step, geometry.z_range)
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_range)
+            self.set_legs(3, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            await self.wait_all_reach()
+
+
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start + 2 * geometry.y_step, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_up)
+            await self.wait_all_reach()
+            self.set_legs(2, geometry.x_range + geometry.x_offset, geometry.y_start, geometry.z_range)
+            await self.wait_all_reach()
 
         self._action_controller.end_action(True)
 
-    def initialize(self, action_controller:ActionController, game_controller, is_stubbed):
+    def initialize_body(self, is_stubbed, control_process=None):
         '''
-            This function additionally initializes this class.
+            This function initializes the body and its servo controller. It blocks for the servo controller reset,
+            so it runs in a startup stage in parallel to the other stages.
+            With a control process the servos are driven by that process, and the body of this process is a
+            stubbed model which mirrors the leg state.
         '''
-        self._body = Body(is_stubbed)
+        self._control_process = control_process
+        self._body = Body(is_stubbed or control_process is not None)
+
+    def initialize(self, action_controller:ActionController, game_controller, is_stubbed, control_process=None):
+        '''
+            This function additionally initializes this class. It must be called from the running event loop.
+            The body is initialized first when it was not initialized in a startup stage.
+        '''
+        if self._body is None:
+            self.initialize_body(is_stubbed, control_process)
+
         self._action_controller = action_controller
         self.register_movements()
         self._reached = False
         self._game_controller = game_controller
+        self._loop = asyncio.get_running_loop()
+        self._legs_reached = asyncio.Event()
 
-        if self._body._online and not self._calibrate_mode:
-            self._game_controller.rumble()
+        self._feedback.attach(self._loop, game_controller)
+
+        online = self._body._online or (control_process is not None and not is_stubbed)
+        if online and not self._calibrate_mode:
+            self._feedback.rumble()
 
     def sleep(self):
         '''
@@ -596,15 +861,18 @@ class QuadrupedCpu():
             self._body.sleep_mode()
             self._is_sleeping = True
 
+        if self._control_process is not None:
+            self._control_process.stop()
+
     def shutdown(self):
         '''
             This function executes the shutdown sequence.
         '''
         if self._mode_1 and self._mode_2:
-            logging.info("Hard shutdown initiated...")
+            logger.info("Hard shutdown initiated...")
             os.system("sudo shutdown -h now")
         else:
-            logging.info("Soft shutdown initiated...")
+            logger.info("Soft shutdown initiated...")
 
         raise ProgramKilled
 
@@ -620,6 +888,17 @@ class QuadrupedCpu():
         if self._action_controller is not None:
             self._action_controller.end_action()
 
+        # wait for the worker, so the last led state is written
+        self._feedback.close()
+        self._power_executor.shutdown(wait=True)
+        self._parameters.close()
+
+        if self._recorder is not None:
+            self._recorder.close()
+
+        if spans.enabled:
+            spans.export()
+
     def awake(self):
         '''
             This function executes the wake up sequence.
@@ -627,30 +906,49 @@ class QuadrupedCpu():
         self._body.wake_up_mode()
         self._is_sleeping = False
 
-        if self._game_controller is not None:
-            self._game_controller.rumble()
+        self._feedback.rumble()
 
-    def run(self):
+    async def run(self):
         '''
-            This function starts the event loop.
+            This function runs the action loop.
         '''
-        self._action_controller.execute()
+        await self._action_controller.run()
+
+    async def poll_telemetry(self):
+        '''
+            This function polls the PiJuice telemetry in the background.
+        '''
+        await self._telemetry.run()
+
+    async def refresh_telemetry(self):
+        '''
+            This function reads a new telemetry snapshot, for example before the first report.
+        '''
+        await self._telemetry.refresh()
 
     def servo_service(self):
         '''
             This function is used to validate the x,y,z leg positions and update the legs. This function should be called
             in a steady (interrupt like) interval with high priority. Returns false if in sleeping state.
         '''
-        #logging.info(f"update servo positions")
+        #logger.info("update servo positions")
+
+        if self._is_sleeping:
+            return False
+
+        if self._streamer is not None:
+            self._streamer.sample(self._body, FLAG_CALIBRATE if self._calibrate_mode else 0)
+
+        if self._control_process is not None:
+            self.mirror(self._control_process.exchange(self._body, self._calibrate_mode))
+            return True
+
+        leg = self._body.get_leg(self._current_leg)
+        if leg is not None:
+            self.validate(leg)
 
-        if self._current_leg == self._body.right_front_leg.index:
-            self.validate(self._body.right_front_leg)
-        elif self._current_leg == self._body.right_back_leg.index:
-            self.validate(self._body.right_back_leg)
-        elif self._current_leg == self._body.left_front_leg.index:
-            self.validate(self._body.left_front_leg)
-        elif self._current_leg == self._body.left_back_leg.index:
-            self.validate(self._body.left_back_leg)
+        if self._recorder is not None:
+            self._recorder.record(self._body, self._current_leg if leg is not None else -1, self._calibrate_mode)
 
         if self._current_leg < 4:
             self._current_leg += 1
@@ -660,36 +958,40 @@ class QuadrupedCpu():
         return not self._is_sleeping
 
 
+    def mirror(self, moved):
+        '''
+            This function signals the waiting action when one of the legs moved by the control process reached its
+            target position.
+        '''
+        if moved:
+            self._action_controller.tracer.mark_frame()
+
+        for index in range(0, 4):
+            if moved & (1 << index) and self._body.get_leg(index).is_reached():
+                self._loop.call_soon_threadsafe(self._legs_reached.set)
+                break
+
     def validate(self, leg: Leg): # todo only validate, create new servo write
         '''
             This function checks whether the position x,y,z is reached.
         '''
-        if abs(leg.current_position.x - leg.target_position.x) >= abs(leg.movement.x_speed):
-            leg.current_position.x = leg.current_position.x + leg.movement.x_speed
-            #logging.debug("Target X leg: {} current {}".format(leg.index, leg.current_position.x))
-        else:
-            leg.current_position.x = leg.target_position.x
-            #if(leg.index == LEG_INDEX): logging.debug("Target X leg: {} reached: {}".format(leg.index, leg.target_position.x))
+        state = self._body.state
+        index = leg.index
+        was_reached = state.is_reached(index)
+        position = state.get_current(index)
 
-        if abs(leg.current_position.y - leg.target_position.y) >= abs(leg.movement.y_speed):
-            leg.current_position.y = leg.current_position.y + leg.movement.y_speed
-            #logging.debug("Target Y leg: {} current {}".format(leg.index, leg.current_position.y))
-        else:
-            leg.current_position.y = leg.target_position.y
-            #if(leg.index == LEG_INDEX): logging.debug("Target Y leg: {} reached: {}".format(leg.index, leg.target_position.y))
+        # the power governor limits the number of legs that move at the same time
+        if not was_reached and not self._governor.may_move(index):
+            return
 
-        if abs(leg.current_position.z - leg.target_position.z) >= abs(leg.movement.z_speed):
-            leg.current_position.z = leg.current_position.z + leg.movement.z_speed
-            #logging.debug("Target Z leg: {} current {}".format(leg.index, leg.current_position.z))
-        else:
-            leg.current_position.z = leg.target_position.z
-            #if(leg.index == LEG_INDEX): logging.debug("Target Z leg: {} reached: {}".format(leg.index, leg.target_position.z))
+        self._body.update_leg(leg, self._calibrate_mode)
+        is_reached = state.is_reached(index)
+        if is_reached:
+            self._governor.leg_reached(index)
 
-        if self._calibrate_mode:
-            alpha, beta, gamma = cartesian_to_polar(100, 80, 28)
-        else:
-            alpha, beta, gamma = cartesian_to_polar(leg.current_position.x, leg.current_position.y, leg.current_position.z)
-        
-        self._body.get_leg(leg.index).set(alpha, beta, gamma)
+        if not was_reached:
+            self._action_controller.tracer.mark_frame()
 
-        
+        # signal the waiting action, also when the target changed while this leg was validated
+        if is_reached and (not was_reached or position != state.get_current(index)):
+            self._loop.call_soon_threadsafe(self._legs_reached.set)
@@ -0,0 +1,381 @@
+'''
+    This module contains the remote control server, which drives the robot over UDP from the local network.
+
+    A remote control packet has a fixed layout of 16 bytes, little endian:
+
+        magic     2s  b'TR'
+        version   B   1
+        posture   B   0 keep, 1 sit, 2 stand
+        sequence  I   incremented by the client for every packet
+        velocity  3h  forward, sideways and turn velocity, scaled from -1..1 to -32767..32767
+        buttons   H   bitmap of REMOTE_BUTTONS
+
+    The server turns the buttons, the posture and the velocity into controller events, so the remote control drives
+    the same actions as the game controller. The velocity is also published as stick state. The first host that
+    sends a packet becomes the client, packets of other hosts are rejected until the client is released by the
+    dead-man timeout. Packets with a sequence number that is not newer than the last one are dropped. When no
+    packet arrives within the dead-man timeout, all pressed buttons are released and the stick state is centered,
+    so the robot stops and another host can take over.
+
+    A parameter packet changes a runtime parameter of the gait, for tuning on the floor. It is only accepted from
+    the client that is driving the robot and shares its sequence numbers, so other hosts and replayed packets are
+    rejected. It has 31 bytes:
+
+        magic     2s  b'TP'
+        version   B   1
+        sequence  I   incremented by the client for every packet
+        name      16s parameter name, utf-8, zero padded
+        value     d   new value
+'''
+import asyncio
+import socket
+import struct
+import time
+
+from analog_input import StickState
+from constants import REMOTE_HOST, REMOTE_PORT, REMOTE_TIMEOUT, REMOTE_DIRECTION_THRESHOLD
+from controller_event import ControllerEvent, DIRECTION_EVENTS, PROTECTED_EVENTS
+from event_queue import EventQueue
+from exceptions import ParameterException
+from log_pipeline import get_logger
+
+logger = get_logger('remote')
+
+PACKET = struct.Struct('<2sBBI3hH')
+PACKET_MAGIC = b'TR'
+PACKET_VERSION = 1
+VELOCITY_SCALE = 32767
+
+PARAMETER_PACKET = struct.Struct('<2sBI16sd')
+PARAMETER_MAGIC = b'TP'
+
+POSTURE_KEEP = 0
+POSTURE_SIT = 1
+POSTURE_STAND = 2
+
+# bit n of the buttons bitmap presses REMOTE_BUTTONS[n]
+REMOTE_BUTTONS = (ControllerEvent.UP_PRESSED, ControllerEvent.DOWN_PRESSED, ControllerEvent.LEFT_PRESSED,
+                  ControllerEvent.RIGHT_PRESSED, ControllerEvent.TRIANGLE_PRESSED, ControllerEvent.CROSS_PRESSED,
+                  ControllerEvent.SQUARE_PRESSED, ControllerEvent.CIRCLE_PRESSED, ControllerEvent.L2_PRESSED,
+                  ControllerEvent.R2_PRESSED, ControllerEvent.PS_HOME, ControllerEvent.PS_SHARE,
+                  ControllerEvent.MENU_PRESSED)
+BUTTON_BITS = {event: 1 << bit for bit, event in enumerate(REMOTE_BUTTONS)}
+
+# the codes of the remote buttons, distinct from the evdev codes of the game controller
+REMOTE_CODE_BASE = 0x1000
+
+def pack_packet(sequence, forward = 0.0, sideways = 0.0, turn = 0.0, posture = POSTURE_KEEP, buttons = 0):
+    '''
+        This function packs a remote control packet. The velocities are in the range -1 to 1.
+    '''
+    def scale(value):
+        return int(max(-1.0, min(1.0, value)) * VELOCITY_SCALE)
+
+    return PACKET.pack(PACKET_MAGIC, PACKET_VERSION, posture, sequence & 0xffffffff,
+                       scale(forward), scale(sideways), scale(turn), buttons)
+
+def unpack_packet(data):
+    '''
+        This function unpacks a remote control packet into (sequence, forward, sideways, turn, posture, buttons),
+        or returns None when the packet is invalid.
+    '''
+    if len(data) != PACKET.size:
+        return None
+
+    magic, version, posture, sequence, forward, sideways, turn, buttons = PACKET.unpack(data)
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        return None
+
+    return (sequence, forward / VELOCITY_SCALE, sideways / VELOCITY_SCALE, turn / VELOCITY_SCALE, posture, buttons)
+
+def pack_parameter(sequence, name, value):
+    '''
+        This function packs a parameter packet.
+    '''
+    return PARAMETER_PACKET.pack(PARAMETER_MAGIC, PACKET_VERSION, sequence & 0xffffffff, name.encode('utf-8'),
+                                 float(value))
+
+def unpack_parameter(data):
+    '''
+        This function unpacks a parameter packet into (sequence, name, value), or returns None when the packet is
+        invalid.
+    '''
+    if len(data) != PARAMETER_PACKET.size:
+        return None
+
+    magic, version, sequence, name, value = PARAMETER_PACKET.unpack(data)
+    if magic != PARAMETER_MAGIC or version != PACKET_VERSION:
+        return None
+
+    try:
+        return (sequence, name.rstrip(b'\0').decode('utf-8'), value)
+    except UnicodeDecodeError:
+        return None
+
+class RemoteControlProtocol(asyncio.DatagramProtocol):
+    '''
+        This class passes the received datagrams to the remote control server.
+    '''
+    def __init__(self, server):
+        self._server = server
+
+    def datagram_received(self, data, addr):
+        self._server.handle_packet(data, addr)
+
+    def error_received(self, exc):
+        logger.debug("Remote control socket error: %s", exc)
+
+class RemoteControlServer():
+    '''
+        This class receives the remote control packets and queues their controller events.
+    '''
+    def __init__(self, notify, host = REMOTE_HOST, port = REMOTE_PORT, timeout = REMOTE_TIMEOUT,
+                 on_parameter = None):
+        '''
+            This function initializes this class.
+
+            : notify - the function that is called when new events are queued
+            : host, port - the address to listen on
+            : timeout - the dead-man timeout in seconds
+            : on_parameter - the function that is called with the name and value of a parameter packet
+        '''
+        self._notify = notify
+        self._on_parameter = on_parameter
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._transport = None
+        self._events = EventQueue(ControllerEvent.RELEASED, DIRECTION_EVENTS, PROTECTED_EVENTS)
+        self._stick_state = StickState()
+        self._client = None
+        self._sequence = None
+        self._buttons = 0
+        self._last_packet = 0.0
+        self.received = 0
+        self.stale = 0
+        self.invalid = 0
+        self.timeouts = 0
+        self.parameters = 0
+        self.rejected = 0
+
+    @property
+    def address(self):
+        '''
+            This function returns the address the server is listening on.
+        '''
+        return self._transport.get_extra_info('sockname') if self._transport is not None else None
+
+    async def start(self):
+        '''
+            This function opens the UDP socket on the event loop.
+        '''
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: RemoteControlProtocol(self),
+                                                                 local_addr=(self._host, self._port))
+        logger.info("Remote control listening on %s", self.address)
+
+    def close(self):
+        '''
+            This function closes the UDP socket.
+        '''
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def run(self):
+        '''
+            This function runs the server and releases the buttons when the client stops sending packets.
+        '''
+        await self.start()
+        try:
+            while True:
+                await asyncio.sleep(self._timeout / 4)
+                self.check_timeout(time.time())
+        finally:
+            self.close()
+
+    def is_newer(self, sequence):
+        '''
+            This function checks whether the sequence number is newer than the last one, with wrap around.
+        '''
+        if self._sequence is None:
+            return True
+        return 0 < ((sequence - self._sequence) & 0xffffffff) < 0x80000000
+
+    def handle_packet(self, data, addr):
+        '''
+            This function handles a received packet. Returns whether the packet was accepted.
+        '''
+        if data[:2] == PARAMETER_MAGIC:
+            return self.handle_parameter(data, addr)
+
+        packet = unpack_packet(data)
+        if packet is None:
+            self.invalid += 1
+            return False
+
+        sequence, forward, sideways, turn, posture, buttons = packet
+
+        if self._client is None:
+            # a new client starts its own sequence
+            logger.info("Remote control client %s connected", addr)
+            self._client = addr
+            self._sequence = None
+        elif addr != self._client:
+            # the robot is driven by another host until the dead-man timeout releases it
+            self.rejected += 1
+            logger.debug("Remote control packet from %s rejected", addr)
+            return False
+
+        if not self.is_newer(sequence):
+            self.stale += 1
+            return False
+
+        now = time.time()
+        self._sequence = sequence
+        self._last_packet = now
+        self.received += 1
+
+        state = self._stick_state
+        state.left_x = sideways
+        state.left_y = -forward
+        state.right_x = turn
+        state.sequence += 1
+        state.timestamp = now
+
+        if forward > REMOTE_DIRECTION_THRESHOLD:
+            buttons |= BUTTON_BITS[ControllerEvent.UP_PRESSED]
+        elif forward < -REMOTE_DIRECTION_THRESHOLD:
+            buttons |= BUTTON_BITS[ControllerEvent.DOWN_PRESSED]
+        if turn > REMOTE_DIRECTION_THRESHOLD:
+            buttons |= BUTTON_BITS[ControllerEvent.RIGHT_PRESSED]
+        elif turn < -REMOTE_DIRECTION_THRESHOLD:
+            buttons |= BUTTON_BITS[ControllerEvent.LEFT_PRESSED]
+        if posture == POSTURE_SIT:
+            buttons |= BUTTON_BITS[ControllerEvent.CROSS_PRESSED]
+        elif posture == POSTURE_STAND:
+            buttons |= BUTTON_BITS[ControllerEvent.TRIANGLE_PRESSED]
+
+        self.update_buttons(buttons, now)
+        return True
+
+    def handle_parameter(self, data, addr):
+        '''
+            This function handles a received parameter packet. Returns whether the parameter was changed.
+        '''
+        packet = unpack_parameter(data)
+        if packet is None or self._on_parameter is None:
+            self.invalid += 1
+            return False
+
+        sequence, name, value = packet
+
+        if addr != self._client or not self.is_newer(sequence):
+            # only the driving client may tune, and only with a packet that is not replayed
+            self.rejected += 1
+            logger.debug("Remote control parameter packet from %s rejected", addr)
+            return False
+        self._sequence = sequence
+
+        try:
+            self._on_parameter(name, value)
+        except ParameterException as exception:
+            logger.info("Remote control parameter rejected: %s", exception)
+            self.invalid += 1
+            return False
+
+        self.parameters += 1
+        return True
+
+    def update_buttons(self, buttons, timestamp):
+        '''
+            This function queues a press for every button that is pressed and a release for every button that is
+            released since the last packet.
+        '''
+        changed = buttons ^ self._buttons
+        if not changed:
+            return
+
+        for bit, event in enumerate(REMOTE_BUTTONS):
+            mask = 1 << bit
+            if changed & mask:
+                self._events.put(event if buttons & mask else ControllerEvent.RELEASED, REMOTE_CODE_BASE + bit,
+                                 timestamp)
+
+        self._buttons = buttons
+        self._notify()
+
+    def check_timeout(self, now):
+        '''
+            This function releases all buttons and centers the stick state when the dead-man timeout expired.
+            Returns whether the timeout expired.
+        '''
+        if self._client is None or now - self._last_packet < self._timeout:
+            return False
+
+        logger.info("Remote control timeout, robot stopped")
+        self.timeouts += 1
+        self._client = None
+        self._sequence = None
+
+        state = self._stick_state
+        state.left_x = 0.0
+        state.left_y = 0.0
+        state.right_x = 0.0
+        state.sequence += 1
+        state.timestamp = now
+
+        self.update_buttons(0, now)
+        return True
+
+    def get_next_event(self):
+        '''
+            This function removes and returns the oldest pending event of the remote control, or None.
+        '''
+        return self._events.get()
+
+    def get_stick_state(self):
+        '''
+            This function returns the latest stick state of the remote control.
+        '''
+        return self._stick_state
+
+    def get_statistics(self):
+        '''
+            This function returns the packet counters and the number of pending events.
+        '''
+        return {'received': self.received, 'stale': self.stale, 'invalid': self.invalid, 'timeouts': self.timeouts,
+                'parameters': self.parameters, 'rejected': self.rejected, 'depth': len(self._events)}
+
+class RemoteControlClient():
+    '''
+        This class sends remote control packets, for example from a laptop or a load test on loopback.
+    '''
+    def __init__(self, host = '127.0.0.1', port = REMOTE_PORT):
+        self._address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sequence = 0
+
+    def send(self, forward = 0.0, sideways = 0.0, turn = 0.0, posture = POSTURE_KEEP, buttons = ()):
+        '''
+            This function sends one packet. The buttons are controller events of REMOTE_BUTTONS.
+        '''
+        bitmap = 0
+        for event in buttons:
+            bitmap |= BUTTON_BITS[event]
+
+        self.sequence = (self.sequence + 1) & 0xffffffff
+        self._socket.sendto(pack_packet(self.sequence, forward, sideways, turn, posture, bitmap), self._address)
+
+    def set_parameter(self, name, value):
+        '''
+            This function sends a parameter packet. The server accepts it after a drive packet of this client.
+        '''
+        self.sequence = (self.sequence + 1) & 0xffffffff
+        self._socket.sendto(pack_parameter(self.sequence, name, value), self._address)
+
+    def close(self):
+        '''
+            This function closes the socket.
+        '''
+        self._socket.close()
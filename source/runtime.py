@@ -0,0 +1,148 @@
+'''
+    This module contains the asyncio based runtime of the t-trex robot.
+
+    The controller input, the action sequences and the PiJuice telemetry polling run as tasks on one event loop.
+    The servo frames are updated by the servo ticker in its own thread, because the I2C writes are blocking.
+'''
+import asyncio
+import signal
+
+from constants import SERVO_TICK_INTERVAL
+from exceptions import ProgramKilled
+from servo_ticker import ServoTicker
+from metrics import Rate
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+class Runtime():
+    '''
+        This class runs the event loop tasks of the robot and stops them all when one of them fails.
+    '''
+    def __init__(self, quadruped, action_controller, game_controller=None, remote_control=None, streamer=None,
+                 metrics=None):
+        '''
+            This function initializes this class.
+        '''
+        self._quadruped = quadruped
+        self._action_controller = action_controller
+        self._game_controller = game_controller
+        self._remote_control = remote_control
+        self._streamer = streamer
+        self._metrics = metrics
+        self._tick_rate = Rate()
+        self._loop = None
+        self._stopped = None
+        self._error = None
+        self._ticker = None
+
+    def stop(self):
+        '''
+            This function requests the runtime to stop. It is used as signal handler.
+        '''
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def fail(self, exception):
+        '''
+            This function stops the runtime due to an exception. It is safe to call from any thread.
+        '''
+        def _fail():
+            self._error = exception
+            self._stopped.set()
+
+        self._loop.call_soon_threadsafe(_fail)
+
+    def collect_metrics(self, writer):
+        '''
+            This function writes the servo loop metrics. It is called from the metrics thread.
+        '''
+        ticker = self._ticker
+        if ticker is None:
+            return
+
+        writer.add('servo_ticks_total', 'counter', "Servo ticks since the start.", ticker.ticks)
+        writer.add('servo_tick_rate_hz', 'gauge', "Servo ticks per second since the previous scrape.",
+                   self._tick_rate.update(ticker.ticks))
+        writer.add('servo_overruns_total', 'counter', "Servo ticks that missed their deadline.", ticker.overruns)
+        writer.add('servo_tick_seconds', 'gauge', "Duration of the last servo tick.", ticker.tick_time)
+        writer.add('servo_tick_max_seconds', 'gauge', "Duration of the longest servo tick.", ticker.max_tick_time)
+        writer.histogram('servo_jitter_seconds', "Delay of the servo tick start behind its deadline.", ticker.jitter,
+                         0.001)
+        for quantile in (0.5, 0.9, 0.99):
+            writer.add('servo_jitter_quantile_seconds', 'gauge', "Upper bucket bound of a servo jitter percentile.",
+                       ticker.jitter.percentile(quantile * 100) / 1000, {'quantile': quantile})
+
+        if self._remote_control is not None:
+            writer.add('queue_depth', 'gauge', "Pending items per queue.",
+                       self._remote_control.get_statistics()['depth'], {'queue': 'remote'})
+
+    async def _read_input(self):
+        '''
+            This function reads the game controller events and wakes up the action controller.
+        '''
+        async for _ in self._game_controller.read_events():
+            self._action_controller.notify()
+
+    async def run(self):
+        '''
+            This function runs the robot until it is stopped or one of the tasks fails.
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self._loop.add_signal_handler(signum, self.stop)
+
+        self._ticker = ServoTicker(self._quadruped.servo_service, SERVO_TICK_INTERVAL, self.fail)
+        self._ticker.start()
+
+        if self._streamer is not None:
+            self._streamer.start(self._ticker)
+
+        if self._metrics is not None:
+            self._metrics.register(self.collect_metrics)
+            self._metrics.start()
+
+        tasks = {
+            asyncio.create_task(self._quadruped.run(), name='actions'),
+            asyncio.create_task(self._quadruped.poll_telemetry(), name='telemetry'),
+        }
+        if self._game_controller is not None:
+            tasks.add(asyncio.create_task(self._read_input(), name='input'))
+        if self._remote_control is not None:
+            tasks.add(asyncio.create_task(self._remote_control.run(), name='remote'))
+
+        stop_task = asyncio.create_task(self._stopped.wait(), name='stop')
+        pending = tasks | {stop_task}
+
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task is stop_task:
+                        if self._error is not None:
+                            raise self._error
+                        raise ProgramKilled
+
+                    exception = task.exception()
+                    if exception is not None:
+                        raise exception
+
+                    logger.debug("Runtime task finished: %s", task.get_name())
+        finally:
+            self._ticker.stop()
+
+            if self._streamer is not None:
+                self._streamer.stop()
+
+            if self._metrics is not None:
+                self._metrics.stop()
+
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                self._loop.remove_signal_handler(signum)
@@ -1,9 +1,11 @@
 '''
     This module contains the servo implementation.
 '''
-import logging
 
-from constants import INIT_LEGS, LEG_INDEX
+from constants import INIT_LEGS, LEG_INDEX, SERVO_STEPS
+from log_pipeline import get_logger
+
+logger = get_logger('servo')
 
 MIN_PULSE_WIDTH = 544        # the shortest pulse sent to a servo
 MAX_PULSE_WIDTH = 2400       # the longest pulse sent to a servo
@@ -14,21 +16,21 @@ class Servo():
         The servo class defines a part of a leg.
     '''
     def __init__(self, index, servo_controller):
-        logging.debug(f"initialize servo leg part:{index} ")
+        logger.debug("initialize servo leg part:%s ", index)
         self._index = index
         self._servo_controller = servo_controller
 
         if INIT_LEGS > 0:
-            logging.info(f"Warning: Fixed position! Angle {INIT_LEGS}")
+            logger.info("Warning: Fixed position! Angle %s", INIT_LEGS)
 
     def write(self, angle):
         '''
             This functions writes the actual angle values to the servo for the given index.
         '''
         if INIT_LEGS > 0:
-            self._servo_controller.move(self._index, INIT_LEGS, 180)
+            self._servo_controller.move(self._index, INIT_LEGS, SERVO_STEPS)
         else:
-            self._servo_controller.move(self._index, angle, 180)
+            self._servo_controller.move(self._index, angle, SERVO_STEPS)
 
     def translate(self, value, left_min, left_max, right_min, right_max):
         '''
@@ -141,9 +141,11 @@ class PWM(object):
         :return: IOError
         :rtype: IOError
         """
+        self.transactions += 1
         try:
             self.__bus.write_byte_data(self.__address, reg, value)
         except IOError as err:
+            self.errors += 1
             return err
 
     def __read(self, reg):
@@ -153,10 +155,12 @@ class PWM(object):
         :return: IOError
         :rtype: IOError
         """
+        self.transactions += 1
         try:
             result = self.__bus.read_byte_data(self.__address, reg)
             return result
         except IOError as err:
+            self.errors += 1
             return err
 
     # public methods
@@ -173,6 +177,9 @@ class PWM(object):
         """
         self.__address = address
         self.__bus = self.__get_smbus(bus)
+        # bus counters
+        self.transactions = 0
+        self.errors = 0
         self.__write(self.__MODE1, self.__mode1_default)
         self.__write(self.__MODE2, self.__mode2_default)
         GPIO.setwarnings(False)
@@ -749,4 +756,13 @@ class ServoController(object):
         """
         Check the sleep status of the device
         """
-        return self.__pwm.is_sleeping()
\ No newline at end of file
+        return self.__pwm.is_sleeping()
+
+    def get_bus_statistics(self):
+        """
+        Get the bus counters of the device
+
+        :return: number of I2C transactions and failed transactions
+        :rtype: tuple
+        """
+        return self.__pwm.transactions, self.__pwm.errors
\ No newline at end of file
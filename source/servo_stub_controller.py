@@ -10,6 +10,7 @@ class ServoStubController(object):
     __useoffset = False
     __offset = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
     __frequency = 50
+    transactions = 0
 
     # local methods
 
@@ -69,7 +70,8 @@ class ServoStubController(object):
         :raises ValueError: move: steps out of range
         :raises ValueError: move: position out of range
         """
-        pass
+        # the PCA9685 needs four register writes per channel
+        self.transactions += 4
 
     def get_position(self, channel, steps=250):
         """
@@ -180,4 +182,10 @@ class ServoStubController(object):
         pass
 
     def is_sleeping(self):
-        pass
\ No newline at end of file
+        pass
+
+    def get_bus_statistics(self):
+        """
+        Get the bus counters of the device
+        """
+        return self.transactions, 0
@@ -0,0 +1,97 @@
+'''
+    This module contains the servo frame ticker, which replaces the SIGALRM based heart beat.
+'''
+import threading
+import time
+from latency import Histogram
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+# bucket bounds in milliseconds of the tick start behind its deadline
+JITTER_BOUNDS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, float('inf'))
+
+class ServoTicker():
+    '''
+        This class calls the servo service in a steady interval from its own thread. The ticker stops when the
+        service returns false (sleeping state) or raises an exception.
+    '''
+    def __init__(self, service, interval, on_error=None):
+        '''
+            This function initializes this class.
+
+            : service - function called every tick, returns false to stop the ticker
+            : interval - tick interval in seconds
+            : on_error - optional function called with the exception when the service fails
+        '''
+        self._service = service
+        self._interval = interval
+        self._on_error = on_error
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.ticks = 0
+        self.overruns = 0
+        self.tick_time = 0.0
+        self.max_tick_time = 0.0
+        self.jitter = Histogram(JITTER_BOUNDS)
+
+    def start(self):
+        '''
+            This function starts the ticker thread.
+        '''
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='servo_ticker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+            This function stops the ticker thread and waits for the running tick to finish.
+        '''
+        self._stop_event.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        '''
+            This function returns whether the ticker thread is alive.
+        '''
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self):
+        '''
+            This function is the ticker loop, it runs in the calling thread until the ticker is stopped. The next
+            tick is scheduled against a fixed deadline, so the time spent in the service is not added to the
+            interval. After an overrun the deadline is resynchronized. The tick counters are plain attributes, so
+            other threads read them without locking.
+        '''
+        deadline = time.monotonic()
+
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self.jitter.add((started - deadline) * 1000)
+            try:
+                if not self._service():
+                    break
+            except Exception as exception: # pylint: disable=broad-except
+                logger.info("Servo ticker stopped due to exception: %s", exception)
+                if self._on_error is not None:
+                    self._on_error(exception)
+                break
+
+            finished = time.monotonic()
+            tick_time = finished - started
+            self.ticks += 1
+            self.tick_time = tick_time
+            if tick_time > self.max_tick_time:
+                self.max_tick_time = tick_time
+
+            deadline += self._interval
+            delay = deadline - finished
+
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                self.overruns += 1
+                deadline = time.monotonic()
@@ -0,0 +1,80 @@
+'''
+    This module contains the shared memory blocks used to exchange state between processes without pickling.
+'''
+from multiprocessing import shared_memory
+
+class SeqLockBlock():
+    '''
+        This class holds a block of doubles in shared memory guarded by a sequence lock. There is one writer and
+        any number of readers. The writer makes the sequence number odd while writing, a reader retries as long as
+        the sequence number is odd or changed during its copy. A reader gives up after a number of retries, so a
+        writer that stopped in the middle of a write cannot hang it.
+    '''
+    HEADER_SIZE = 8
+    READ_RETRIES = 10000
+
+    def __init__(self, size):
+        '''
+            This function initializes this class.
+
+            : size - number of doubles in the block
+        '''
+        self.size = size
+        self._shm = shared_memory.SharedMemory(create=True, size=SeqLockBlock.HEADER_SIZE + size * 8)
+        self._sequence = self._shm.buf[:SeqLockBlock.HEADER_SIZE].cast('Q')
+        self._values = self._shm.buf[SeqLockBlock.HEADER_SIZE:SeqLockBlock.HEADER_SIZE + size * 8].cast('d')
+        self._sequence[0] = 0
+        self._read_sequence = 0
+        self.stalls = 0
+
+    @property
+    def sequence(self):
+        '''
+            This property returns the current sequence number, it changes with every write.
+        '''
+        return self._sequence[0]
+
+    def write(self, values):
+        '''
+            This function writes all values to the block.
+
+            : values - array('d') or memoryview of doubles with the size of the block
+        '''
+        sequence = self._sequence[0]
+        self._sequence[0] = sequence + 1
+        self._values[:] = memoryview(values)
+        self._sequence[0] = sequence + 2
+
+    def read(self, values):
+        '''
+            This function copies a consistent snapshot of the block into values and returns its sequence number.
+            When no consistent snapshot is read within the retries, the stall is counted and the sequence number of
+            the previous snapshot is returned, so the caller sees no new data.
+
+            : values - writable array('d') with the size of the block
+        '''
+        with memoryview(values) as target:
+            for _ in range(SeqLockBlock.READ_RETRIES):
+                sequence = self._sequence[0]
+                if sequence & 1:
+                    continue
+
+                target[:] = self._values
+
+                if self._sequence[0] == sequence:
+                    self._read_sequence = sequence
+                    return sequence
+
+        self.stalls += 1
+        return self._read_sequence
+
+    def close(self, unlink = False):
+        '''
+            This function releases the shared memory, the owner also unlinks it.
+        '''
+        self._sequence.release()
+        self._values.release()
+        self._shm.close()
+
+        if unlink:
+            self._shm.unlink()
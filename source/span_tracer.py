@@ -0,0 +1,170 @@
+'''
+    This module contains the span tracing of the actions, gait phases and servo writes.
+
+    A span is the name, category, thread and start and end time of a piece of work, like an action, a gait phase
+    between two wait_all_reach barriers, a set_legs batch, an inverse kinematics solve, a servo bus write or a
+    PiJuice call. The spans are appended as tuples to an in memory ring, which is a few hundred nanoseconds, and
+    exported on demand as Chrome trace json, which opens in chrome://tracing or https://ui.perfetto.dev. While the
+    tracer is disabled a span costs one attribute check.
+
+    The code times a span with begin and end, or add when it has both times already:
+
+        started = spans.begin()
+        solve()
+        spans.end('ik', 'servo', started)
+
+    or on paths that are not hot with the span context manager:
+
+        with spans.span('snapshot', 'pijuice'):
+            read()
+'''
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from constants import SPAN_FILE, SPAN_BUFFER
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+class Span():
+    '''
+        This class is the context manager of one span.
+    '''
+    __slots__ = ('_tracer', '_name', '_category', '_started')
+
+    def __init__(self, tracer, name, category):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._started = 0
+
+    def __enter__(self):
+        self._started = self._tracer.begin()
+        return self
+
+    def __exit__(self, *exception):
+        self._tracer.end(self._name, self._category, self._started)
+        return False
+
+class SpanTracer():
+    '''
+        This class buffers the spans in memory and exports them in the Chrome trace format.
+    '''
+    def __init__(self, capacity = SPAN_BUFFER):
+        '''
+            This function initializes this class. The tracer starts disabled.
+
+            : capacity - the number of spans kept, the oldest spans are dropped first
+        '''
+        self.enabled = False
+        self.path = SPAN_FILE
+        self._spans = deque(maxlen=capacity)
+        self._thread_names = {}
+        self._export_lock = threading.Lock()
+
+    def enable(self, path = SPAN_FILE):
+        '''
+            This function starts recording spans, which are exported to the given file.
+        '''
+        self.path = path
+        self.enabled = True
+        logger.info("Span tracing to %s, %s spans buffered", path, self._spans.maxlen)
+
+    def begin(self):
+        '''
+            This function returns the start time of a span in nanoseconds, or 0 when the tracer is disabled.
+        '''
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def end(self, name, category, started, args = None):
+        '''
+            This function records a span that started at the time returned by begin.
+        '''
+        if started:
+            self._spans.append((name, category, threading.get_ident(), started, time.perf_counter_ns(), args))
+
+    def add(self, name, category, started, finished, args = None):
+        '''
+            This function records a span with its start and end time in nanoseconds of time.perf_counter_ns.
+        '''
+        if self.enabled:
+            self._spans.append((name, category, threading.get_ident(), started, finished, args))
+
+    def span(self, name, category):
+        '''
+            This function returns a context manager that records a span around its block.
+        '''
+        return Span(self, name, category)
+
+    def clear(self):
+        '''
+            This function drops the buffered spans.
+        '''
+        self._spans.clear()
+
+    def __len__(self):
+        return len(self._spans)
+
+    def to_chrome_trace(self, spans = None):
+        '''
+            This function returns the spans, by default the buffered ones, as Chrome trace events with the thread
+            names as metadata.
+        '''
+        if spans is None:
+            spans = self._spans.copy()
+
+        for thread in threading.enumerate():
+            self._thread_names[thread.ident] = thread.name
+
+        pid = os.getpid()
+        events = []
+        threads = set()
+        for name, category, thread, started, finished, args in spans:
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread,
+                     'ts': started / 1000, 'dur': (finished - started) / 1000}
+            if args:
+                event['args'] = args
+            events.append(event)
+            threads.add(thread)
+
+        for thread in threads:
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread,
+                           'args': {'name': self._thread_names.get(thread, str(thread))}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path = None, wait = True):
+        '''
+            This function writes the buffered spans to a Chrome trace json file. The spans stay buffered. Without
+            wait the file is written on a background thread, so the caller is not delayed by a large trace.
+        '''
+        # the copy of a deque is done at once, so spans appended by other threads meanwhile are not mixed in
+        spans = self._spans.copy()
+        path = path or self.path
+
+        if wait:
+            self.write(spans, path)
+        else:
+            threading.Thread(target=self.write, args=(spans, path), name='span_export').start()
+
+    def write(self, spans, path):
+        '''
+            This function writes the spans to a Chrome trace json file. One export is written at a time.
+        '''
+        with self._export_lock:
+            trace = self.to_chrome_trace(spans)
+
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path + '.tmp', 'w', encoding='utf-8') as trace_file:
+                    json.dump(trace, trace_file)
+                os.replace(path + '.tmp', path)
+                logger.info("Exported %s trace events to %s", len(trace['traceEvents']), path)
+            except OSError as exception:
+                logger.info("Cannot export spans: %s", exception)
+
+# the tracer of the process, the modules record their spans on it
+spans = SpanTracer()
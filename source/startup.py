@@ -0,0 +1,101 @@
+'''
+    This module contains the staged startup of the t-trex robot.
+
+    The startup is split in stages, like the servo controller initialization, the game controller discovery and
+    the first telemetry reading. Independent stages run concurrently, blocking stages in worker threads. Every stage
+    is timed, and the startup report shows the stage times and the time since the process was started, which
+    includes the interpreter start and the imports after a systemd start.
+'''
+import asyncio
+import os
+import time
+from log_pipeline import get_logger
+
+logger = get_logger('startup')
+
+def process_age():
+    '''
+        This function returns the seconds since the process was started, or None when it is not known.
+    '''
+    try:
+        with open('/proc/self/stat', encoding='utf-8') as stat_file:
+            # the process name can contain spaces, the fields after it are separated by single spaces
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', encoding='utf-8') as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    # field 22 of the stat file, the start time in clock ticks after boot
+    return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+
+class StartupStage():
+    '''
+        This class holds the timing of one startup stage.
+    '''
+    __slots__ = ('name', 'started', 'duration', 'error')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+        self.duration = None
+        self.error = None
+
+class Startup():
+    '''
+        This class runs and times the startup stages.
+    '''
+    def __init__(self):
+        self._started = time.monotonic()
+        self._age = process_age()
+        self.stages = []
+
+    async def stage(self, name, function, *args):
+        '''
+            This function runs one stage and returns its result. A coroutine function runs on the event loop, any
+            other function in a worker thread, so the event loop keeps running the other stages.
+        '''
+        stage = StartupStage(name)
+        self.stages.append(stage)
+        stage.started = time.monotonic()
+
+        try:
+            if asyncio.iscoroutinefunction(function):
+                return await function(*args)
+            return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+        except Exception as exception:
+            stage.error = exception
+            raise
+        finally:
+            stage.duration = time.monotonic() - stage.started
+
+    async def parallel(self, *stages):
+        '''
+            This function runs stages concurrently and returns their results. A stage is (name, function, *args).
+            The first error is raised after all stages are finished.
+        '''
+        results = await asyncio.gather(*(self.stage(*stage) for stage in stages), return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return results
+
+    def report(self):
+        '''
+            This function logs the startup report.
+        '''
+        elapsed = time.monotonic() - self._started
+
+        logger.info("---------- Startup Report --------------------")
+        for stage in self.stages:
+            status = f" failed: {stage.error}" if stage.error is not None else ""
+            logger.info("Stage %-12s: start %7.1f ms duration %7.1f ms%s", stage.name,
+                        (stage.started - self._started) * 1000, stage.duration * 1000, status)
+
+        if self._age is not None:
+            logger.info("Ready after %0.3f s of startup, %0.3f s after process start", elapsed, self._age + elapsed)
+        else:
+            logger.info("Ready after %0.3f s of startup", elapsed)
+        logger.info("---------- Startup Report --------------------")
@@ -5,30 +5,60 @@
 
 # default modules
 import sys
+import asyncio
 import logging
-import signal
 from exceptions import NoJoystickConnectedException, JoystickDisconnectedException, ProgramKilled, ServoControllerInitializeException
 from exceptions import PiJuiceInitializeException
-from threading import Thread
 
 # user modules
+from backends import backends
 from quadruped_cpu import QuadrupedCpu
 from game_controller import Ps4GameController
+from controller_profile import ControllerProfile
+from remote_control import RemoteControlServer
+from event_injector import EventScript, FakeInputDevice, log_injection_report
+from constants import CONTROLLER_PROFILE
 from action_controller import ActionController
+from runtime import Runtime
+from startup import Startup
+from control_process import ControlProcess
+from log_pipeline import LogPipeline, parse_levels, get_logger
+from span_tracer import spans
+from metrics import MetricsServer
+from constants import LOG_LEVEL, TRACE_FILE, SPAN_FILE, STREAM_PORT, METRICS_HOST, METRICS_PORT
 
 for handler in logging.root.handlers[:]:
     logging.root.removeHandler(handler)
 
-# Log to console
+# Log to console, until the logging pipeline is started
 logging.basicConfig(format='%(asctime)s - %(message)s', level=logging.DEBUG)
+logger = get_logger('startup')
 
 # Log to file
 #logging.basicConfig(filename='app.log', filemode='a', format='%(name)s - %(levelname)s - %(message)s', level=logging.DEBUG)
 
 # command line arguments
 #   usage: python3 t-trex.py STUB
+#          python3 t-trex.py PROCESS (servo and kinematics loop in a separate process)
+#          python3 t-trex.py PROFILE=xbox (controller profile in source/profiles)
+#          python3 t-trex.py REMOTE (udp remote control server)
+#          python3 t-trex.py INJECT=<seed or script.json> (synthetic controller events instead of the controller)
+#          python3 t-trex.py LOG=INFO,actions:DEBUG (root level and levels per subsystem)
+#          python3 t-trex.py TRACE[=path] (record every servo tick, decode with trace_analyzer.py)
+#          python3 t-trex.py SPANS[=path] (span tracing, exported as chrome trace json on the report and at exit)
+#          python3 t-trex.py STREAM=host[:port] (live telemetry over udp, received with telemetry_stream.py)
+#          python3 t-trex.py METRICS[=host:port] (prometheus metrics on http://127.0.0.1:9105/metrics)
 STUB = False
 CONTROLLER = True
+CONTROL_PROCESS = False
+PROFILE = None
+REMOTE = False
+INJECT = None
+LOG_LEVELS = None
+TRACE = None
+SPANS = None
+STREAM = None
+METRICS = None
 
 if len(sys.argv) > 1:
     for argument in sys.argv:
@@ -36,74 +66,137 @@ if len(sys.argv) > 1:
             STUB = True
         elif argument == "NO_CONTROLLER":
             CONTROLLER = False
+        elif argument == "PROCESS":
+            CONTROL_PROCESS = True
+        elif argument.startswith("PROFILE="):
+            PROFILE = argument.split("=", 1)[1]
+        elif argument == "REMOTE":
+            REMOTE = True
+        elif argument.startswith("INJECT"):
+            INJECT = argument.split("=", 1)[1] if "=" in argument else "0"
+        elif argument.startswith("LOG="):
+            LOG_LEVELS = argument.split("=", 1)[1]
+        elif argument.startswith("TRACE"):
+            TRACE = argument.split("=", 1)[1] if "=" in argument else TRACE_FILE
+        elif argument.startswith("SPANS"):
+            SPANS = argument.split("=", 1)[1] if "=" in argument else SPAN_FILE
+        elif argument.startswith("STREAM="):
+            STREAM = argument.split("=", 1)[1]
+        elif argument.startswith("METRICS"):
+            METRICS = argument.split("=", 1)[1] if "=" in argument else f"{METRICS_HOST}:{METRICS_PORT}"
+
+# hardware backends, the stand-ins run without the hardware and its packages
+backends.select('power', 'stub' if STUB else 'pijuice')
+backends.select('servo', 'stub' if STUB else 'pca9685')
+backends.select('input', 'evdev' if CONTROLLER or INJECT is not None else 'none', fallback='none')
 
 quadruped = QuadrupedCpu()
 
-# Signal Handlers
-# Each signal may have a signal handler, which is a function that gets called when the process receives that signal. The function is called in
-# "asynchronous mode", meaning that no where in your program you have code that calls this function directly. Instead, when the signal is sent to the process,
-# the operating system stops the execution of the process, and "forces" it to call the signal handler function. When that signal handler function returns,
-# the process continues execution from wherever it happened to be before the signal was received, as if this interruption never occurred.
-def kill_program_handler(signum, frame):
-    ''' This handler is called when the kill signal is received'''
-    raise ProgramKilled
-
-# When a signal arrives during an I/O operation, it is possible that the I/O operation raises an exception after the signal handler returns.
-# This is dependent on the underlying Unix system’s semantics regarding interrupted system calls.
-def heart_beat(signum, frame): # pylint: disable=unused-argument
-    '''
-        This function is the heart beat for updating the I/O service. It may not interrupt other I/O operations. All I/O should be handled from this handler,
-        which will be executed in the main thread.
-    '''
-    #time_started = time.time()
-    if quadruped.servo_service(): # timing on RPi Zero W 2: 0.03 seconds @ alarm 0.02 seconds @ 100kHz i2c
-        #logging.debug(f"Elapsed: {time.time() - time_started} seconds")
-        signal.setitimer(signal.ITIMER_REAL, 0.002) #correct time by substracting the time in this handler from the default alarm time interval. @200 kHz i2c
+log_level, log_levels = parse_levels(LOG_LEVELS) if LOG_LEVELS else (None, None)
+log_pipeline = LogPipeline(log_level or LOG_LEVEL, log_levels)
+
+if SPANS:
+    spans.enable(SPANS)
 
 def shut_down():
     '''
         This function is meant for gracefully shutting down the system.
     '''
     quadruped.release()
+    log_pipeline.stop()
     logging.shutdown()    
     sys.exit(0)
 
-def main():
+def create_controller():
     '''
-        Main entry point of the t-trex program.
+        This function creates the game controller, or the injected one, and discovers it. Returns the controller
+        and the injected device, both None without controller.
     '''
-    try:
-        quadruped.set_status_led(0,255,255)       
-        action_controller = ActionController()
+    if INJECT is not None:
+        profile = ControllerProfile.load(PROFILE or CONTROLLER_PROFILE)
+        script = EventScript.load(INJECT) if INJECT.endswith('.json') else EventScript.generate(profile, int(INJECT))
+        injected_device = FakeInputDevice(script, profile)
+        return Ps4GameController(profile, injected_device), injected_device
+
+    if CONTROLLER:
+        return Ps4GameController(ControllerProfile.load(PROFILE) if PROFILE else None), None
 
-        if CONTROLLER:
-            controller = Ps4GameController()
-            action_controller.register_event_handler(controller.get_last_event)
-            event_thread = Thread(target=controller.get_event, name='event_handler', daemon=True)
-            event_thread.start()            
+    return None, None
 
-        quadruped.initialize(action_controller, controller, STUB)
-        quadruped.get_system_report()
-        
-        signal.signal(signal.SIGTERM, kill_program_handler)
-        signal.signal(signal.SIGINT, kill_program_handler)
-        signal.signal(signal.SIGALRM, heart_beat)
+async def run(control_process):
+    '''
+        This function initializes the robot and runs it on the asyncio runtime until it is stopped.
+    '''
+    startup = Startup()
+    quadruped.set_status_led(0,255,255)       
+    action_controller = ActionController()
+    remote_control = None
+    streamer = None
+    metrics = None
+
+    # the servo controller reset, the controller discovery and the first telemetry reading are independent
+    _, (controller, injected_device), _ = await startup.parallel(
+        ('servo', quadruped.initialize_body, STUB, control_process),
+        ('controller', create_controller),
+        ('telemetry', quadruped.refresh_telemetry))
+
+    if controller is not None:
+        action_controller.register_event_handler(controller.get_next_event)
+        quadruped.register_stick_state(controller.get_stick_state)
+
+    if REMOTE:
+        remote_control = RemoteControlServer(action_controller.notify, on_parameter=quadruped.set_parameter)
+        action_controller.register_event_handler(remote_control.get_next_event)
+        quadruped.register_stick_state(remote_control.get_stick_state)
+
+    quadruped.initialize(action_controller, controller, STUB, control_process)
+    if TRACE and control_process is None:
+        quadruped.start_trace(TRACE)
+    if STREAM:
+        host, _, port = STREAM.partition(':')
+        streamer = quadruped.create_streamer(host, int(port) if port else STREAM_PORT)
+    if METRICS:
+        host, _, port = METRICS.rpartition(':')
+        metrics = MetricsServer(host or METRICS_HOST, int(port) if port else METRICS_PORT)
+        metrics.register(quadruped.collect_metrics)
+        metrics.register(log_pipeline.collect_metrics)
+        if streamer is not None:
+            metrics.register(streamer.collect_metrics)
+    quadruped.get_system_report()
+
+    quadruped.set_status_led(0,50,25)
+    startup.report()
 
-        signal.setitimer(signal.ITIMER_REAL, 0.02)
+    try:
+        await Runtime(quadruped, action_controller, controller, remote_control, streamer, metrics).run()
+    finally:
+        if injected_device is not None:
+            log_injection_report(injected_device, controller, action_controller)
+
+def main():
+    '''
+        Main entry point of the t-trex program.
+    '''
+    try:
+        control_process = None
+        if CONTROL_PROCESS:
+            # fork the control process before any thread is started
+            control_process = ControlProcess(STUB, trace_path=TRACE)
+            control_process.start()
 
-        quadruped.set_status_led(0,50,25)
+        # the listener thread starts after the fork, the control process logs to the console directly
+        log_pipeline.start()
 
-        while True:
-            quadruped.run()
+        asyncio.run(run(control_process))
     except PiJuiceInitializeException as exception:
         quadruped.set_error_state()
-        logging.info(f"Program killed due to initialization exception: running cleanup code...\n Exception Message: {exception}")
+        logger.info("Program killed due to initialization exception: running cleanup code...\n Exception Message: %s", exception)
     except ProgramKilled as exception:
         quadruped.set_status_led(0,0,0)
-        logging.info(f"Program killed due to program killed signal: running cleanup code...")
+        logger.info("Program killed due to program killed signal: running cleanup code...")
     except (Exception, JoystickDisconnectedException, NoJoystickConnectedException, ServoControllerInitializeException) as exception:
         quadruped.set_error_state()
-        logging.info(f"Program killed due to exception: running cleanup code...\n Exception Message: {exception}")
+        logger.info("Program killed due to exception: running cleanup code...\n Exception Message: %s", exception)
     finally:
         shut_down()
 
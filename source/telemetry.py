@@ -0,0 +1,136 @@
+'''
+    This module contains the background PiJuice telemetry poller.
+
+    The PiJuice I2C calls are blocking, so the poller runs them on the PiJuice worker thread at a fixed interval and
+    keeps the latest snapshot plus a history of snapshots. Reports and the motion code read the cached snapshot, so
+    they never wait for the PiJuice. The static configuration, like the firmware version, is read only once.
+'''
+import asyncio
+import time
+from collections import deque
+
+from constants import TELEMETRY_POLL_INTERVAL, TELEMETRY_HISTORY, LOW_CHARGE_LEVEL
+from span_tracer import spans
+from log_pipeline import get_logger
+
+logger = get_logger('power')
+
+def check_value(value):
+    '''
+        This function checks the returned value of pijuice communication.
+    '''
+    value = value['data'] if value['error'] == 'NO_ERROR' else value['error']
+    return value
+
+class TelemetrySnapshot():
+    '''
+        This class holds one reading of the PiJuice status and power values.
+    '''
+    __slots__ = ('timestamp', 'status', 'fault', 'charge', 'temperature', 'battery_voltage', 'battery_current',
+                 'io_voltage', 'io_current')
+
+    def __init__(self, pijuice):
+        '''
+            This function reads the snapshot from the PiJuice. It blocks for the I2C calls.
+        '''
+        status = pijuice.status
+        self.timestamp = time.time()
+        with spans.span('snapshot', 'pijuice'):
+            self.status = check_value(status.GetStatus())
+            self.fault = check_value(status.GetFaultStatus())
+            self.charge = check_value(status.GetChargeLevel())
+            self.temperature = check_value(status.GetBatteryTemperature())
+            self.battery_voltage = check_value(status.GetBatteryVoltage())
+            self.battery_current = check_value(status.GetBatteryCurrent())
+            self.io_voltage = check_value(status.GetIoVoltage())
+            self.io_current = check_value(status.GetIoCurrent())
+
+class TelemetryPoller():
+    '''
+        This class polls the PiJuice in the background and serves the latest snapshot and its history.
+    '''
+    def __init__(self, pijuice, executor, interval = TELEMETRY_POLL_INTERVAL, history = TELEMETRY_HISTORY,
+                 on_snapshot = None):
+        '''
+            This function initializes this class.
+
+            : pijuice - the PiJuice interface
+            : executor - the executor that runs the blocking PiJuice calls
+            : interval - the seconds between two snapshots
+            : history - the number of snapshots kept
+            : on_snapshot - the function that is called with every new snapshot
+        '''
+        self._pijuice = pijuice
+        self._executor = executor
+        self._on_snapshot = on_snapshot
+        self._interval = interval
+        self.config = None
+        self.latest = None
+        self.history = deque(maxlen=history)
+        self.polls = 0
+
+    def read_config(self):
+        '''
+            This function reads the static PiJuice configuration. It blocks for the I2C calls.
+        '''
+        config = self._pijuice.config
+        with spans.span('config', 'pijuice'):
+            return {
+                'address': check_value(config.GetAddress(1)),
+                'eeprom_write_protect': check_value(config.GetIdEepromWriteProtect()),
+                'eeprom_address': check_value(config.GetIdEepromAddress()),
+                'firmware_version': check_value(config.GetFirmwareVersion()),
+            }
+
+    async def refresh(self):
+        '''
+            This function reads a new snapshot on the worker thread, and the configuration the first time.
+        '''
+        loop = asyncio.get_running_loop()
+
+        if self.config is None:
+            self.config = await loop.run_in_executor(self._executor, self.read_config)
+
+        snapshot = await loop.run_in_executor(self._executor, TelemetrySnapshot, self._pijuice)
+        self.latest = snapshot
+        self.history.append(snapshot)
+        self.polls += 1
+
+        if isinstance(snapshot.charge, int) and snapshot.charge < LOW_CHARGE_LEVEL:
+            logger.info("Low battery: charge %s %%", snapshot.charge)
+
+        if self._on_snapshot is not None:
+            self._on_snapshot(snapshot)
+
+        return snapshot
+
+    async def run(self):
+        '''
+            This function polls the PiJuice until it is cancelled.
+        '''
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._interval)
+
+    def log_report(self):
+        '''
+            This function logs the PiJuice report from the cached configuration and snapshot.
+        '''
+        logger.info("---------- Pi-Juice Report --------------------")
+        snapshot = self.latest
+        if snapshot is None:
+            logger.info("No telemetry read yet")
+        else:
+            config = self.config
+            logger.info("Status: %s", snapshot.status)
+            logger.info("Fault State: %s", snapshot.fault)
+            logger.info("PiJuice I2C address = %s (hex)", config['address'])
+            logger.info("HAT eeprom write protect = %s", config['eeprom_write_protect'])
+            logger.info("HAT eeprom address = %s (hex)", config['eeprom_address'])
+            logger.info("Firmware Version = %s", config['firmware_version'])
+            logger.info("Charge =%s %%, T = %s Celsius", snapshot.charge, snapshot.temperature)
+            logger.info("Vbat = %s mV, Ibat = %s mA, Vio = %s mV, Iio =%s mA", snapshot.battery_voltage,
+                        snapshot.battery_current, snapshot.io_voltage, snapshot.io_current)
+            logger.info("Age = %0.1f s, %s snapshots in history, %s polls", time.time() - snapshot.timestamp,
+                        len(self.history), self.polls)
+        logger.info("---------- Pi-Juice Report --------------------")
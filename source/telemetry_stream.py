@@ -0,0 +1,237 @@
+'''
+    This module contains the live telemetry streamer, which sends the leg state, loop timing and battery data over
+    UDP, for watching the robot on a laptop while tuning on the floor.
+
+    The servo loop hands every n-th tick to the streamer, so the frames are sent at a fixed rate below the tick
+    rate. A frame is packed on the servo thread and put in a bounded queue, a sender thread writes the frames to the
+    socket. When the queue is full or the socket cannot take the frame, the frame is dropped and counted, so the
+    servo loop never waits for the network. A frame has 182 bytes, little endian:
+
+        magic            2s   b'TT'
+        version          B    1
+        flags            B    bit 0 calibrate mode
+        sequence         I    incremented for every frame, gaps are dropped frames
+        timestamp        d    seconds since the epoch
+        ticks            I    servo ticks since the start
+        overruns         I    servo ticks that missed their deadline
+        tick_time        f    seconds of the last servo tick
+        max_tick_time    f    seconds of the longest servo tick
+        current          12f  current leg positions, in leg order x,y,z
+        target           12f  target leg positions, in leg order x,y,z
+        angles           12f  joint angles, in leg order alpha,beta,gamma
+        battery_voltage  H    mV, 0 when unknown
+        battery_current  h    mA
+        charge           b    %, -1 when unknown
+        temperature      b    battery temperature in degrees Celsius
+
+    With the control process the joint angles are solved in that process and are not in the frames.
+'''
+import queue
+import socket
+import struct
+import threading
+import time
+
+from constants import SERVO_TICK_INTERVAL, STREAM_PORT, STREAM_RATE, STREAM_QUEUE_SIZE
+from log_pipeline import get_logger
+
+logger = get_logger('remote')
+
+FRAME = struct.Struct('<2sBBIdIIff12f12f12fHhbb')
+FRAME_MAGIC = b'TT'
+FRAME_VERSION = 1
+
+FLAG_CALIBRATE = 1
+
+def power_value(value, unknown):
+    '''
+        This function returns a PiJuice value, or the unknown value when the PiJuice returned an error.
+    '''
+    return value if isinstance(value, int) else unknown
+
+def pack_frame(sequence, flags, ticker, state, angles, snapshot):
+    '''
+        This function packs a telemetry frame from the servo ticker, the leg state, the joint angles and the latest
+        telemetry snapshot, which may be None.
+    '''
+    if snapshot is not None:
+        voltage = min(max(power_value(snapshot.battery_voltage, 0), 0), 0xffff)
+        current = min(max(power_value(snapshot.battery_current, 0), -0x8000), 0x7fff)
+        charge = min(max(power_value(snapshot.charge, -1), -1), 127)
+        temperature = min(max(power_value(snapshot.temperature, 0), -128), 127)
+    else:
+        voltage, current, charge, temperature = 0, 0, -1, 0
+
+    return FRAME.pack(FRAME_MAGIC, FRAME_VERSION, flags, sequence & 0xffffffff, time.time(),
+                      ticker.ticks & 0xffffffff, ticker.overruns & 0xffffffff, ticker.tick_time, ticker.max_tick_time,
+                      *state.current, *state.target, *angles, voltage, current, charge, temperature)
+
+def unpack_frame(data):
+    '''
+        This function unpacks a telemetry frame into a dictionary, or returns None when the frame is invalid.
+    '''
+    if len(data) != FRAME.size:
+        return None
+
+    values = FRAME.unpack(data)
+    if values[0] != FRAME_MAGIC or values[1] != FRAME_VERSION:
+        return None
+
+    return {
+        'flags': values[2],
+        'sequence': values[3],
+        'timestamp': values[4],
+        'ticks': values[5],
+        'overruns': values[6],
+        'tick_time': values[7],
+        'max_tick_time': values[8],
+        'current': values[9:21],
+        'target': values[21:33],
+        'angles': values[33:45],
+        'battery_voltage': values[45],
+        'battery_current': values[46],
+        'charge': values[47],
+        'temperature': values[48],
+    }
+
+class TelemetryStreamer():
+    '''
+        This class samples the servo loop at a decimated rate and sends the frames over UDP from its own thread.
+    '''
+    def __init__(self, telemetry, host, port = STREAM_PORT, rate = STREAM_RATE, queue_size = STREAM_QUEUE_SIZE,
+                 interval = SERVO_TICK_INTERVAL):
+        '''
+            This function initializes this class.
+
+            : telemetry - the telemetry poller with the latest battery snapshot
+            : host, port - the address the frames are sent to
+            : rate - the frames per second
+            : queue_size - the frames waiting for the sender before frames are dropped
+            : interval - the seconds between two servo ticks
+        '''
+        self._telemetry = telemetry
+        self._address = (host, port)
+        self._queue = queue.Queue(queue_size)
+        self._socket = None
+        self._thread = None
+        self._ticker = None
+        self.decimation = max(1, round(1 / (rate * interval)))
+        self._countdown = 0
+        self.sequence = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self, ticker):
+        '''
+            This function opens the socket and starts the sender thread. The frames hold the counters of the ticker.
+        '''
+        self._ticker = ticker
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._thread = threading.Thread(target=self.run, name='telemetry_stream', daemon=True)
+        self._thread.start()
+        logger.info("Telemetry streaming to %s:%s, every %s ticks", self._address[0], self._address[1], self.decimation)
+
+    def stop(self):
+        '''
+            This function sends the queued frames, stops the sender thread and closes the socket.
+        '''
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._socket.close()
+        self._socket = None
+        logger.info("Telemetry stream: sent %s dropped %s errors %s", self.sent, self.dropped, self.errors)
+
+    def collect_metrics(self, writer):
+        '''
+            This function writes the stream metrics. It is called from the metrics thread.
+        '''
+        writer.add('queue_depth', 'gauge', "Pending items per queue.", self._queue.qsize(), {'queue': 'stream'})
+        writer.add('stream_frames_sent_total', 'counter', "Telemetry frames sent.", self.sent)
+        writer.add('stream_frames_dropped_total', 'counter', "Telemetry frames dropped.", self.dropped)
+
+    def sample(self, body, flags):
+        '''
+            This function is called by the servo loop every tick. Every n-th tick a frame is packed and queued, or
+            dropped when the sender is behind.
+        '''
+        if self._countdown > 0:
+            self._countdown -= 1
+            return
+        self._countdown = self.decimation - 1
+
+        if self._ticker is None:
+            return
+
+        frame = pack_frame(self.sequence, flags, self._ticker, body.state, body.angles, self._telemetry.latest)
+        self.sequence += 1
+
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        '''
+            This function is the sender loop, it sends the queued frames until the stop marker.
+        '''
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+
+            try:
+                self._socket.sendto(frame, self._address)
+                self.sent += 1
+            except BlockingIOError:
+                # the socket buffer is full
+                self.dropped += 1
+            except OSError as exception:
+                self.errors += 1
+                logger.debug("Telemetry stream socket error: %s", exception)
+
+if __name__ == "__main__":
+    # usage: python3 telemetry_stream.py [port] [leg]
+    #   prints the received frames, for the robot started with STREAM=<address of this computer>
+    import sys
+
+    receiver_port = int(sys.argv[1]) if len(sys.argv) > 1 else STREAM_PORT
+    receiver_leg = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('0.0.0.0', receiver_port))
+    print(f"Receiving telemetry on port {receiver_port}, showing leg {receiver_leg}")
+
+    last_sequence = None
+    lost = 0
+    base = receiver_leg * 3
+    try:
+        while True:
+            received = unpack_frame(receiver.recv(FRAME.size + 1))
+            if received is None:
+                continue
+
+            if last_sequence is not None:
+                lost += max(0, ((received['sequence'] - last_sequence) & 0xffffffff) - 1)
+            last_sequence = received['sequence']
+
+            current = received['current'][base:base + 3]
+            target = received['target'][base:base + 3]
+            angles = received['angles'][base:base + 3]
+            print(f"#{received['sequence']:<7} ticks {received['ticks']:<8} "
+                  f"tick {received['tick_time'] * 1000:5.2f} ms max {received['max_tick_time'] * 1000:5.2f} ms "
+                  f"overruns {received['overruns']:<5} "
+                  f"leg {receiver_leg} at {current[0]:6.1f} {current[1]:6.1f} {current[2]:6.1f} "
+                  f"to {target[0]:6.1f} {target[1]:6.1f} {target[2]:6.1f} "
+                  f"angles {angles[0]:6.1f} {angles[1]:6.1f} {angles[2]:6.1f} "
+                  f"battery {received['battery_voltage']} mV {received['battery_current']} mA "
+                  f"{received['charge']} % lost {lost}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
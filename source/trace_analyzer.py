@@ -0,0 +1,189 @@
+'''
+    This module decodes the trace file of the servo loop, computes its statistics and exports it as csv.
+
+    usage: python3 trace_analyzer.py [trace file] [csv file]
+
+    The statistics are the tick rate and tick intervals, the bus time of the servo writes, and per leg the move
+    phases, from a new target until the target is reached, and the speed of the leg endpoint.
+'''
+import csv
+import logging
+import struct
+import sys
+
+from leg_state import LEG_COUNT, AXES
+from constants import TRACE_FILE, SERVO_TICK_INTERVAL
+from exceptions import TraceException
+from trace_recorder import TRACE_MAGIC, TRACE_VERSION, TRACE_HEADER, TRACE_HEADER_SIZE
+from trace_recorder import RECORD_TIMESTAMP, RECORD_TICK, RECORD_LEG, RECORD_FLAGS, RECORD_BUS_TIME
+from trace_recorder import RECORD_TARGET, RECORD_CURRENT, RECORD_ANGLES, RECORD_PWM, RECORD_SIZE
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+AXIS_NAMES = ('x', 'y', 'z')
+JOINT_NAMES = ('alpha', 'beta', 'gamma')
+
+def load_trace(path):
+    '''
+        This function reads a trace file and returns its start time and the records, oldest first.
+    '''
+    with open(path, 'rb') as trace_file:
+        data = trace_file.read()
+
+    if len(data) < TRACE_HEADER_SIZE:
+        raise TraceException(f"Trace file too short: {path}")
+
+    magic, version, record_size, capacity, count, start_time = TRACE_HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != RECORD_SIZE:
+        raise TraceException(f"Unsupported trace file: {path}")
+
+    record_format = struct.Struct(f'<{RECORD_SIZE}d')
+    records = list(record_format.iter_unpack(data[TRACE_HEADER_SIZE:TRACE_HEADER_SIZE + capacity * record_format.size]))
+
+    # the ring wrapped, the oldest record follows the newest one
+    if count > capacity:
+        oldest = count % capacity
+        records = records[oldest:] + records[:oldest]
+    else:
+        records = records[:count]
+
+    return start_time, records
+
+def percentile(values, part):
+    '''
+        This function returns the value below which the given part of the sorted values lies.
+    '''
+    if not values:
+        return 0.0
+    return values[min(int(part * len(values)), len(values) - 1)]
+
+def summarize(values):
+    '''
+        This function returns the mean, median, 99th percentile and maximum of the values.
+    '''
+    values = sorted(values)
+    mean = sum(values) / len(values) if values else 0.0
+    return mean, percentile(values, 0.5), percentile(values, 0.99), values[-1] if values else 0.0
+
+def tick_statistics(records, interval = SERVO_TICK_INTERVAL):
+    '''
+        This function returns the tick rate, the tick intervals, the overruns and the bus times of the records.
+    '''
+    timestamps = [record[RECORD_TIMESTAMP] for record in records]
+    intervals = [later - earlier for earlier, later in zip(timestamps, timestamps[1:])]
+    duration = timestamps[-1] - timestamps[0] if len(timestamps) > 1 else 0.0
+
+    return {
+        'ticks': len(records),
+        'duration': duration,
+        'rate': (len(records) - 1) / duration if duration > 0 else 0.0,
+        'intervals': summarize(intervals),
+        'overruns': sum(1 for value in intervals if value > 2 * interval),
+        'missed': int(records[-1][RECORD_TICK] - records[0][RECORD_TICK]) + 1 - len(records) if records else 0,
+        'bus_times': summarize([record[RECORD_BUS_TIME] for record in records if record[RECORD_LEG] >= 0]),
+        'calibrate': sum(1 for record in records if int(record[RECORD_FLAGS]) & 1),
+    }
+
+def leg_statistics(records, leg_index):
+    '''
+        This function returns the move phases and the endpoint speeds of a leg. A move phase starts at the tick
+        the leg gets a new target and ends at the tick it reaches the target.
+    '''
+    base = leg_index * AXES
+    target_slice = slice(RECORD_TARGET + base, RECORD_TARGET + base + AXES)
+    current_slice = slice(RECORD_CURRENT + base, RECORD_CURRENT + base + AXES)
+
+    phases = []
+    speeds = []
+    updates = 0
+    phase_start = None
+    previous_target = None
+    previous_update = None
+
+    for record in records:
+        target = record[target_slice]
+        current = record[current_slice]
+
+        if target != previous_target:
+            phase_start = record[RECORD_TIMESTAMP] if previous_target is not None else None
+            previous_target = target
+
+        if int(record[RECORD_LEG]) != leg_index:
+            continue
+        updates += 1
+
+        if previous_update is not None:
+            elapsed = record[RECORD_TIMESTAMP] - previous_update[0]
+            distance = sum((now - before) ** 2 for now, before in zip(current, previous_update[1])) ** 0.5
+            if elapsed > 0 and distance > 0:
+                speeds.append(distance / elapsed)
+        previous_update = (record[RECORD_TIMESTAMP], current)
+
+        if phase_start is not None and current == target:
+            phases.append(record[RECORD_TIMESTAMP] - phase_start)
+            phase_start = None
+
+    return {
+        'updates': updates,
+        'phases': len(phases),
+        'phase_durations': summarize(phases),
+        'speeds': summarize(speeds),
+    }
+
+def log_statistics(start_time, records):
+    '''
+        This function logs the statistics of the records.
+    '''
+    ticks = tick_statistics(records)
+    logger.info("---------- Trace Report --------------------")
+    logger.info("Records        :%s in %0.2f s, started at %0.3f", ticks['ticks'], ticks['duration'], start_time)
+    logger.info("Tick rate      :%0.1f Hz, missed records %s, calibrate ticks %s",
+                ticks['rate'], ticks['missed'], ticks['calibrate'])
+    logger.info("Tick interval  :mean %0.3f ms p50 %0.3f ms p99 %0.3f ms max %0.3f ms overruns %s",
+                *(value * 1000 for value in ticks['intervals']), ticks['overruns'])
+    logger.info("Bus time       :mean %0.3f ms p50 %0.3f ms p99 %0.3f ms max %0.3f ms",
+                *(value * 1000 for value in ticks['bus_times']))
+
+    for leg_index in range(LEG_COUNT):
+        leg = leg_statistics(records, leg_index)
+        logger.info("Leg %s          :updates %s move phases %s", leg_index, leg['updates'], leg['phases'])
+        logger.info("  phase        :mean %0.1f ms p50 %0.1f ms p99 %0.1f ms max %0.1f ms",
+                    *(value * 1000 for value in leg['phase_durations']))
+        logger.info("  speed        :mean %0.1f mm/s p50 %0.1f mm/s p99 %0.1f mm/s max %0.1f mm/s", *leg['speeds'])
+    logger.info("---------- Trace Report --------------------")
+
+def export_csv(records, path):
+    '''
+        This function writes the records to a csv file with one column per value.
+    '''
+    legs = range(LEG_COUNT)
+    header = ['timestamp', 'tick', 'leg', 'flags', 'bus_time']
+    header += [f'target_{leg}_{axis}' for leg in legs for axis in AXIS_NAMES]
+    header += [f'current_{leg}_{axis}' for leg in legs for axis in AXIS_NAMES]
+    header += [f'angle_{leg}_{joint}' for leg in legs for joint in JOINT_NAMES]
+    header += [f'pwm_{leg}_{joint}' for leg in legs for joint in JOINT_NAMES]
+
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        for record in records:
+            writer.writerow((record[RECORD_TIMESTAMP], int(record[RECORD_TICK]), int(record[RECORD_LEG]),
+                             int(record[RECORD_FLAGS]), record[RECORD_BUS_TIME])
+                            + record[RECORD_TARGET:RECORD_ANGLES] + record[RECORD_ANGLES:RECORD_PWM]
+                            + tuple(int(pwm) for pwm in record[RECORD_PWM:RECORD_SIZE]))
+
+    logger.info("Exported %s records to %s", len(records), path)
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
+    trace_path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    trace_start, trace_records = load_trace(trace_path)
+
+    if not trace_records:
+        logger.info("No records in %s", trace_path)
+        sys.exit(0)
+
+    log_statistics(trace_start, trace_records)
+    if len(sys.argv) > 2:
+        export_csv(trace_records, sys.argv[2])
@@ -0,0 +1,136 @@
+'''
+    This module contains the per tick trace recorder of the servo loop.
+
+    Every servo tick writes one fixed width record of doubles into a preallocated ring file, which is memory mapped,
+    so recording is a few slice copies into the page cache without system calls or allocations. The file survives a
+    crash of the program and is decoded afterwards by trace_analyzer.py. A record holds:
+
+        timestamp, tick, leg, flags, bus time, target[12], current[12], joint angles[12], pwm counts[12]
+
+    The leg is the index of the leg updated in the tick, or -1 for an idle tick, the flags have bit 0 set in
+    calibrate mode. The positions are in leg order x,y,z, the joint angles in leg order alpha,beta,gamma and the pwm
+    counts are the off times of the servo channels of the joints. The header holds the layout and the number of
+    written records, the ring wraps after the capacity.
+'''
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from leg_state import AXES, LEG_STATE_SIZE
+from constants import TRACE_FILE, TRACE_RECORDS
+from log_pipeline import get_logger
+
+logger = get_logger('control')
+
+TRACE_MAGIC = b'TTRC'
+TRACE_VERSION = 1
+
+# header: magic, version, doubles per record, capacity, written records, start time
+TRACE_HEADER = struct.Struct('<4sHHQQd')
+TRACE_HEADER_SIZE = 64
+TRACE_COUNT_OFFSET = 16
+
+# record layout in doubles
+RECORD_TIMESTAMP = 0
+RECORD_TICK = 1
+RECORD_LEG = 2
+RECORD_FLAGS = 3
+RECORD_BUS_TIME = 4
+RECORD_TARGET = 5
+RECORD_CURRENT = RECORD_TARGET + LEG_STATE_SIZE
+RECORD_ANGLES = RECORD_CURRENT + LEG_STATE_SIZE
+RECORD_PWM = RECORD_ANGLES + LEG_STATE_SIZE
+RECORD_SIZE = RECORD_PWM + LEG_STATE_SIZE
+
+FLAG_CALIBRATE = 1
+
+class TraceRecorder():
+    '''
+        This class writes the trace records of the servo ticks to the memory mapped ring file.
+    '''
+    def __init__(self, path = TRACE_FILE, capacity = TRACE_RECORDS):
+        '''
+            This function initializes this class.
+
+            : path - the trace file, it is replaced
+            : capacity - the number of records in the ring
+        '''
+        self.path = path
+        self.capacity = capacity
+        self.count = 0
+        self._file = None
+        self._map = None
+        self._count = None
+        self._records = None
+        self._pwm = array('d', bytes(8 * LEG_STATE_SIZE))
+
+    def open(self):
+        '''
+            This function creates the ring file at its full size and maps it.
+        '''
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        size = TRACE_HEADER_SIZE + self.capacity * RECORD_SIZE * 8
+
+        self._file = open(self.path, 'w+b')
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        TRACE_HEADER.pack_into(self._map, 0, TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE, self.capacity, 0, time.time())
+
+        view = memoryview(self._map)
+        self._count = view[TRACE_COUNT_OFFSET:TRACE_COUNT_OFFSET + 8].cast('Q')
+        self._records = view[TRACE_HEADER_SIZE:].cast('d')
+        logger.info("Trace recording to %s, %s records of %s bytes", self.path, self.capacity, RECORD_SIZE * 8)
+        return self
+
+    def record(self, body, leg_index, calibrate_mode):
+        '''
+            This function writes the record of a servo tick. The leg index is the updated leg or -1.
+        '''
+        records = self._records
+        if records is None:
+            return
+
+        pwm = self._pwm
+        if leg_index >= 0:
+            servo_angles = body.servo_angles
+            pwm_low = body.pwm_low
+            pwm_scale = body.pwm_scale
+            for joint in range(leg_index * AXES, leg_index * AXES + AXES):
+                pwm[joint] = int(pwm_scale[joint] * servo_angles[joint] + pwm_low[joint])
+
+        count = self.count
+        base = (count % self.capacity) * RECORD_SIZE
+        state = body.state
+
+        records[base] = time.monotonic()
+        records[base + RECORD_TICK] = count
+        records[base + RECORD_LEG] = leg_index
+        records[base + RECORD_FLAGS] = FLAG_CALIBRATE if calibrate_mode else 0
+        records[base + RECORD_BUS_TIME] = body.bus_time
+        records[base + RECORD_TARGET:base + RECORD_CURRENT] = state.target
+        records[base + RECORD_CURRENT:base + RECORD_ANGLES] = state.current
+        records[base + RECORD_ANGLES:base + RECORD_PWM] = body.angles
+        records[base + RECORD_PWM:base + RECORD_SIZE] = pwm
+
+        self.count = count + 1
+        self._count[0] = self.count
+
+    def close(self):
+        '''
+            This function writes the mapped records to the file and closes it.
+        '''
+        if self._map is None:
+            return
+
+        self._count.release()
+        self._records.release()
+        self._count = None
+        self._records = None
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        self._file.close()
+        self._file = None
+        logger.info("Trace recorded %s ticks to %s", self.count, self.path)